@@ -0,0 +1,55 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class AnalysisCache:
+    """Persistent cache of keyword-independent PDF analysis (visite, links...)
+
+    Entries are keyed by (idweb, extractor version), so changing the extraction
+    or analysis code only requires bumping the version to ignore stale rows.
+    The analysis fields are stored as JSON; the extracted text itself lives in
+    the TextStore under the same key.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Earlier versions kept the compressed text here too; drop that cache
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(pdf_analysis)")]
+        if 'text' in columns:
+            self.db.execute("DROP TABLE pdf_analysis")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pdf_analysis (
+                key TEXT NOT NULL,
+                version TEXT NOT NULL,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (key, version)
+            )
+        """)
+        self.db.commit()
+
+    def get(self, key: str, version: str) -> Optional[dict]:
+        """Return the cached analysis or None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT analysis FROM pdf_analysis WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, version: str, analysis: dict):
+        """Store an analysis dict"""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pdf_analysis (key, version, analysis, created_at) VALUES (?, ?, ?, ?)",
+                (key, version, json.dumps(analysis, ensure_ascii=False), time.time())
+            )
+            self.db.commit()
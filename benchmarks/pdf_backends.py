@@ -0,0 +1,115 @@
+"""Compare the PDF text extraction backends on a local corpus of BOAMP PDFs
+
+Usage:
+    python benchmarks/pdf_backends.py CORPUS_DIR [--backends pymupdf,pypdf2,pdfplumber] [--repeat 3] [--json report.json]
+
+For every backend this reports throughput (documents, pages and MB per second)
+and how close its output is to the first backend's (word-set overlap), so a
+faster backend can be checked for lost text before switching deployments.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_text import PDF_TEXT_BACKENDS, get_backend  # noqa: E402
+
+WORD_RE = re.compile(r"\w+")
+
+
+def load_corpus(corpus_dir):
+    """Read every PDF of the corpus into memory"""
+    corpus = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(corpus_dir, name), "rb") as pdf_file:
+                corpus[name] = pdf_file.read()
+    return corpus
+
+
+def word_overlap(text_a, text_b):
+    """Jaccard similarity of the lowercased word sets of two texts"""
+    words_a = set(WORD_RE.findall(text_a.lower()))
+    words_b = set(WORD_RE.findall(text_b.lower()))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def run_backend(name, corpus, repeat):
+    """Extract the whole corpus `repeat` times and return timings and texts"""
+    extract = get_backend(name)
+    texts = {}
+    pages = 0
+    failures = 0
+    best = None
+    for _ in range(repeat):
+        pages = 0
+        failures = 0
+        started = time.perf_counter()
+        for doc_name, pdf_bytes in corpus.items():
+            try:
+                page_texts = extract(pdf_bytes)
+            except ImportError:
+                raise
+            except Exception:
+                failures += 1
+                texts[doc_name] = ""
+                continue
+            pages += len(page_texts)
+            texts[doc_name] = "\n".join(page_texts)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best, "pages": pages, "failures": failures}, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--backends", default=",".join(PDF_TEXT_BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_dir)
+    if not corpus:
+        parser.error(f"no PDF found in {args.corpus_dir}")
+    total_mb = sum(len(pdf_bytes) for pdf_bytes in corpus.values()) / (1024 * 1024)
+    print(f"Corpus: {len(corpus)} PDFs, {total_mb:.1f} MB, best of {args.repeat} runs\n")
+
+    report = {"documents": len(corpus), "megabytes": round(total_mb, 3), "backends": {}}
+    reference_texts = None
+    print(f"{'backend':<12}{'seconds':>10}{'docs/s':>10}{'pages/s':>10}{'MB/s':>10}{'failures':>10}{'overlap':>10}")
+    for name in [backend.strip() for backend in args.backends.split(",") if backend.strip()]:
+        try:
+            stats, texts = run_backend(name, corpus, args.repeat)
+        except ImportError as e:
+            print(f"{name:<12}skipped ({e})")
+            continue
+
+        if reference_texts is None:
+            reference_texts = texts
+        overlap = sum(word_overlap(texts[doc], reference_texts[doc]) for doc in corpus) / len(corpus)
+
+        seconds = stats["seconds"] or 1e-9
+        stats.update({
+            "docs_per_second": len(corpus) / seconds,
+            "pages_per_second": stats["pages"] / seconds,
+            "mb_per_second": total_mb / seconds,
+            "overlap_with_reference": overlap,
+        })
+        report["backends"][name] = stats
+        print(f"{name:<12}{stats['seconds']:>10.2f}{stats['docs_per_second']:>10.1f}{stats['pages_per_second']:>10.1f}"
+              f"{stats['mb_per_second']:>10.2f}{stats['failures']:>10}{overlap:>10.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Benchmark every pipeline stage against the local BOAMP stand-in server
+
+Usage:
+    python benchmarks/pipeline.py [--sizes 1k,10k,50k] [--repeat 3] [--pdf-records 200]
+        [--api-latency 50] [--pdf-latency 100] [--jitter 10] [--pdf-rate 0]
+        [--recordings DIR] [--pdf-corpus DIR] [--json report.json] [--compare baseline.json] [--threshold 0.2]
+        [--min-delta 0.02]
+
+A stand-in server (standin_server.py) is started in a subprocess with one
+synthetic publication day per size (or the recorded pages of --recordings, one
+run per date) and the app is imported with BOAMP_DATASET_URL and
+BOAMP_PDF_BASE_URL pointing at it and a throwaway BOAMP_DATA_DIR. For each day
+this times, best of --repeat runs unless noted:
+
+    get_all_records_for_date   paged (or exports) API fetch of the whole day
+    sync_notices_for_date      first ingestion into the notice warehouse (one run)
+    get_notices                warehouse read of the synced day
+    build_notice_table         records -> NoticeTable (spilled to Parquet past BOAMP_PIPELINE_SPILL_ROWS)
+    filter_by_keywords         the app's predefined keywords
+    remove_duplicates          the keyword matches plus 10% duplicated notices
+    filter_by_departments      --departments
+    extract_pdf_content_cold   first --pdf-records matches, empty PDF and analysis caches (one run)
+    extract_pdf_content_warm   the same notices again, served from the caches
+    link_regexes               extract_links_from_pdf_content over their texts
+    lot_regexes                lot search and visite check over their texts
+
+Reports are comparable when the parameters match: --json saves one, --compare
+prints the change of every stage against a saved report and exits with status 1
+when a stage is slower by more than --threshold (and by at least --min-delta
+seconds, so millisecond stages don't flag noise).
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from standin_server import load_recordings  # noqa: E402
+from synthetic import DEPARTMENTS, synthetic_days  # noqa: E402
+
+SERVER_URL_RE = re.compile(r"on (http://\S+)")
+DEFAULT_DEPARTMENTS = ",".join(DEPARTMENTS[:20])
+# Parameters that must match for two reports to be compared
+COMPARED_PARAMETERS = ["repeat", "pdf_records", "api_latency_ms", "pdf_latency_ms", "jitter_ms", "pdf_rate",
+                       "seed", "departments", "recordings", "pdf_corpus", "pdf_text_backend", "pdf_text_mode",
+                       "pipeline_spill_rows"]
+
+
+def start_standin(args, sizes):
+    """Start the stand-in server on a free port; returns (process, base URL)"""
+    command = [
+        sys.executable, os.path.join(BENCHMARKS_DIR, "standin_server.py"), "serve", "--port", "0",
+        "--date", args.date, "--seed", str(args.seed), "--api-latency", str(args.api_latency),
+        "--pdf-latency", str(args.pdf_latency), "--jitter", str(args.jitter),
+    ]
+    command += ["--recordings", args.recordings] if args.recordings else ["--records", sizes]
+    if args.pdf_corpus:
+        command += ["--pdf-corpus", args.pdf_corpus]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=BENCHMARKS_DIR)
+    first_line = process.stdout.readline()
+    match = SERVER_URL_RE.search(first_line)
+    if not match:
+        process.kill()
+        raise RuntimeError(f"stand-in server failed to start: {first_line!r}")
+    return process, match.group(1)
+
+
+def import_app(base_url, data_dir, args):
+    """Import main configured for the stand-in server and a throwaway data directory"""
+    os.environ.update({
+        "BOAMP_DATASET_URL": base_url + "/api/explore/v2.1/catalog/datasets/boamp",
+        "BOAMP_PDF_BASE_URL": base_url,
+        "BOAMP_DATA_DIR": data_dir,
+        "BOAMP_PDF_RATE_PER_SECOND": str(args.pdf_rate),
+        "BOAMP_INGEST_INTERVAL_MINUTES": "0",
+    })
+    os.chdir(REPO_DIR)  # main mounts static/ and templates/ relative to the working directory
+    with quiet():
+        import main
+    return main
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the app's progress prints while timing"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(func, repeat, items):
+    """Run func `repeat` times; returns (stats, last result)"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        with quiet():
+            started = time.perf_counter()
+            result = func()
+            runs.append(time.perf_counter() - started)
+    best = min(runs)
+    stats = {
+        "seconds": round(best, 6),
+        "median_seconds": round(statistics.median(runs), 6),
+        "runs": len(runs),
+        "items": items(result) if callable(items) else items,
+    }
+    stats["items_per_second"] = round(stats["items"] / best, 1) if best > 0 else None
+    return stats, result
+
+
+def bench_day(main, target_date, args, label):
+    """Time every stage on one publication day; returns {stage: stats}"""
+    results = {}
+    keywords = main.get_predefined_keywords()
+    departments = [code.strip() for code in args.departments.split(",") if code.strip()]
+
+    def record(stage, func, repeat, items):
+        stats, result = measure(func, repeat, items)
+        results[stage] = stats
+        print(f"{label:<12}{stage:<28}{stats['seconds']:>10.3f}{stats['items']:>10}"
+              f"{stats['items_per_second'] or 0:>12.1f}", flush=True)
+        return result
+
+    records = record("get_all_records_for_date", lambda: main.get_all_records_for_date(target_date, 0),
+                     args.repeat, len)
+    record("sync_notices_for_date", lambda: main.sync_notices_for_date(target_date), 1, lambda fetched: fetched)
+    record("get_notices", lambda: main.get_notices(target_date, target_date), args.repeat, len)
+    spill_dir = os.path.join(main.SPILL_DIR, label)
+    notices = record("build_notice_table", lambda: main.build_notice_table(records, spill_dir), args.repeat, len)
+    filtered = record("filter_by_keywords", lambda: main.filter_by_keywords(notices, keywords), args.repeat,
+                      len(notices))
+    if not filtered:
+        print(f"{label:<12}no keyword match, skipping the remaining stages")
+        return results
+
+    matches = filtered.to_notices()
+    duplicated = random.Random(args.seed).sample(matches, k=len(matches) // 10)
+    with_duplicates = main.NoticeTable.from_notices(
+        matches + [replace(notice, keyword="Escaliers") for notice in duplicated], main.notice_store.records,
+        spill_dir, main.PIPELINE_SPILL_ROWS
+    )
+    deduplicated = record("remove_duplicates", lambda: main.remove_duplicates(with_duplicates),
+                          args.repeat, len(with_duplicates))
+    record("filter_by_departments", lambda: main.filter_by_departments(deduplicated, departments),
+           args.repeat, len(deduplicated))
+
+    pdf_notices = deduplicated.filter([position < args.pdf_records for position in range(len(deduplicated))])
+    run_ids = iter(range(1, args.repeat + 2))
+
+    def run_extract():
+        process_id = f"bench_{label}_{next(run_ids)}"
+        main.job_store.create(process_id, {}, status='processing', current_step='pdf_processing')
+        return main.extract_pdf_content(pdf_notices, process_id)
+
+    extracted = record("extract_pdf_content_cold", run_extract, 1, len(pdf_notices))
+    record("extract_pdf_content_warm", run_extract, args.repeat, len(pdf_notices))
+
+    texts = [
+        (notice.generated_link, main.text_store.get(notice.pdf_text_ref), notice.keyword)
+        for notice in extracted if notice.pdf_status == "Success"
+    ]
+    record("link_regexes", lambda: [main.extract_links_from_pdf_content(link, text) for link, text, _ in texts],
+           args.repeat, len(texts))
+
+    def lot_search():
+        for _, text, row_keywords in texts:
+            analyzer = main.DocumentAnalyzer(text)
+            analyzer.visite_obligatoire(main.VISITE_KEYWORDS)
+            main.find_lot_numbers(analyzer, row_keywords)
+
+    record("lot_regexes", lot_search, args.repeat, len(texts))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(report, baseline, threshold, min_delta):
+    """Print the change of each stage against a baseline report; returns the regressed stages"""
+    differing = [name for name in COMPARED_PARAMETERS
+                 if report["parameters"].get(name) != baseline["parameters"].get(name)]
+    if differing:
+        print(f"\nWarning: parameters differ from the baseline ({', '.join(differing)}), timings are not comparable")
+
+    print(f"\nCompared with {baseline.get('git_commit') or 'baseline'} ({baseline.get('created_at', '')})")
+    print(f"{'day':<12}{'stage':<28}{'baseline':>10}{'now':>10}{'change':>10}")
+    regressions = []
+    for label, stages in report["results"].items():
+        for stage, stats in stages.items():
+            before = baseline["results"].get(label, {}).get(stage)
+            if not before or not before["seconds"]:
+                continue
+            change = stats["seconds"] / before["seconds"] - 1
+            flag = ""
+            if change > threshold and stats["seconds"] - before["seconds"] >= min_delta:
+                flag = "  REGRESSION"
+                regressions.append(f"{label}/{stage}")
+            print(f"{label:<12}{stage:<28}{before['seconds']:>10.3f}{stats['seconds']:>10.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1k,10k,50k", help="comma-separated synthetic day sizes")
+    parser.add_argument("--date", default="2024-06-03", help="publication date of the first synthetic day")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recordings", help="replay recorded API pages instead of synthetic days")
+    parser.add_argument("--pdf-corpus", help="serve PDFs from this directory instead of generating them")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf-records", type=int, default=200, help="notices sent through extract_pdf_content")
+    parser.add_argument("--departments", default=DEFAULT_DEPARTMENTS)
+    parser.add_argument("--api-latency", type=float, default=50, help="milliseconds per API request")
+    parser.add_argument("--pdf-latency", type=float, default=100, help="milliseconds per PDF request")
+    parser.add_argument("--jitter", type=float, default=10, help="+/- milliseconds of latency jitter")
+    parser.add_argument("--pdf-rate", type=float, default=0,
+                        help="PDF requests per second (BOAMP_PDF_RATE_PER_SECOND, 0 = unlimited)")
+    parser.add_argument("--json", dest="json_path", help="save the report to this file")
+    parser.add_argument("--compare", help="compare with a report saved by --json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="smallest slowdown in seconds reported")
+    args = parser.parse_args()
+
+    if args.recordings:
+        args.recordings = os.path.abspath(args.recordings)
+        days = [(day, day) for day in sorted({str(record.get("dateparution", ""))[:10]
+                                              for record in load_recordings(args.recordings)})]
+    else:
+        sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+        days = [(label, day) for label, (day, _) in zip(sizes, synthetic_days(args.date, ",".join(sizes)))]
+    # The app is imported from the repository root, so resolve paths first
+    if args.pdf_corpus:
+        args.pdf_corpus = os.path.abspath(args.pdf_corpus)
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    server, base_url = start_standin(args, args.sizes)
+    try:
+        with tempfile.TemporaryDirectory(prefix="boamp-bench-") as data_dir:
+            app = import_app(base_url, data_dir, args)
+            report = {
+                "benchmark": "pipeline",
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "parameters": {
+                    "days": dict(days),
+                    "repeat": args.repeat,
+                    "pdf_records": args.pdf_records,
+                    "api_latency_ms": args.api_latency,
+                    "pdf_latency_ms": args.pdf_latency,
+                    "jitter_ms": args.jitter,
+                    "pdf_rate": args.pdf_rate,
+                    "seed": args.seed,
+                    "departments": args.departments,
+                    "recordings": args.recordings,
+                    "pdf_corpus": args.pdf_corpus,
+                    "pdf_text_backend": app.PDF_TEXT_BACKEND,
+                    "pdf_text_mode": "lazy" if app.PDF_LAZY else "full",
+                    "pipeline_spill_rows": app.PIPELINE_SPILL_ROWS,
+                },
+                "results": {},
+            }
+            print(f"Stand-in server at {base_url}, best of {args.repeat} runs\n")
+            print(f"{'day':<12}{'stage':<28}{'seconds':>10}{'items':>10}{'items/s':>12}")
+            for label, day in days:
+                report["results"][label] = bench_day(app, day, args, label)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    if baseline is not None and compare(report, baseline, args.threshold, args.min_delta):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
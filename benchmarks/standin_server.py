@@ -0,0 +1,284 @@
+"""Local stand-in for the BOAMP opendatasoft API and the boamp.fr PDF downloads
+
+The server answers the two API endpoints the app uses (records, paged by 100
+with the 10000 offset window, and exports/json) and the PDF download path, with
+a configurable latency, jitter and share of 503 answers. It evaluates the parts
+of the ODSQL where clause the app builds (publication date, departments,
+type_marche) and orders by idweb.
+
+Notices come from synthetic days (see synthetic.py) or from recorded API
+pages: JSON files holding either a records page ({"results": [...]}) or an
+exports list, as written by the `record` command. PDFs are read from a corpus
+directory (<idweb>.pdf, or any PDF of the corpus picked by idweb) or generated
+from the notice on first request.
+
+Usage:
+    python benchmarks/standin_server.py serve --records 1k,10k [--date 2024-06-03] [--port 8765]
+        [--recordings DIR] [--pdf-corpus DIR] [--api-latency 80] [--pdf-latency 150] [--jitter 20] [--error-rate 0]
+    python benchmarks/standin_server.py record --date 2024-06-03 --out recordings/2024-06-03
+
+Then point the app at it:
+    BOAMP_DATASET_URL=http://127.0.0.1:8765/api/explore/v2.1/catalog/datasets/boamp \\
+    BOAMP_PDF_BASE_URL=http://127.0.0.1:8765 uvicorn main:app
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from synthetic import generate_day, notice_pdf, synthetic_days
+
+DATASET_PATH = "/api/explore/v2.1/catalog/datasets/boamp"
+LIVE_DATASET_URL = "https://boamp-datadila.opendatasoft.com" + DATASET_PATH
+PAGE_SIZE = 100
+MAX_WINDOW = 10000
+
+DATE_RE = re.compile(r"dateparution\s*=\s*date'(\d{4}-\d{2}-\d{2})'")
+DEPARTMENT_RE = re.compile(r'code_departement\s*=\s*"([^"]*)"')
+TYPE_MARCHE_RE = re.compile(r'type_marche\s*=\s*"([^"]*)"')
+PDF_PATH_RE = re.compile(r"^/telechargements/FILES/PDF/\d{4}/\d{2}/([^/]+)\.pdf$")
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def load_recordings(directory):
+    """Notices found in recorded records pages or exports, deduplicated by idweb"""
+    records = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as recording:
+            data = json.load(recording)
+        for record in data.get("results", []) if isinstance(data, dict) else data:
+            records[str(record["idweb"])] = record
+    return list(records.values())
+
+
+class BoampDataset:
+    """Notices grouped by publication date, queried the way the API would answer"""
+
+    def __init__(self, records):
+        self.by_date = {}
+        self.by_idweb = {}
+        for record in records:
+            self.by_date.setdefault(str(record.get("dateparution", ""))[:10], []).append(record)
+            self.by_idweb[str(record["idweb"])] = record
+        for day_records in self.by_date.values():
+            day_records.sort(key=lambda record: str(record["idweb"]))
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def select(self, where):
+        """Notices matching a where clause built by the app, in idweb order (cached per clause)"""
+        with self.lock:
+            if where in self.results:
+                return self.results[where]
+        date_match = DATE_RE.search(where)
+        records = self.by_date.get(date_match.group(1), []) if date_match else list(self.by_idweb.values())
+        departments = set(DEPARTMENT_RE.findall(where))
+        if departments:
+            records = [record for record in records
+                       if departments & {str(code) for code in as_list(record.get("code_departement"))}]
+        type_marche = TYPE_MARCHE_RE.search(where)
+        if type_marche:
+            records = [record for record in records if type_marche.group(1) in as_list(record.get("type_marche"))]
+        with self.lock:
+            self.results[where] = records
+        return records
+
+
+class PDFSource:
+    """PDF bytes per idweb, from a corpus directory or generated from the notice"""
+
+    def __init__(self, dataset, corpus_dir=None):
+        self.dataset = dataset
+        self.corpus = {}
+        if corpus_dir:
+            for name in sorted(os.listdir(corpus_dir)):
+                if name.lower().endswith(".pdf"):
+                    with open(os.path.join(corpus_dir, name), "rb") as pdf_file:
+                        self.corpus[name[:-4]] = pdf_file.read()
+        self.corpus_names = sorted(self.corpus)
+        self.generated = {}
+        self.lock = threading.Lock()
+
+    def get(self, idweb):
+        if idweb in self.corpus:
+            return self.corpus[idweb]
+        if self.corpus_names:
+            return self.corpus[self.corpus_names[zlib.crc32(idweb.encode()) % len(self.corpus_names)]]
+        record = self.dataset.by_idweb.get(idweb)
+        if record is None:
+            return None
+        with self.lock:
+            if idweb not in self.generated:
+                self.generated[idweb] = notice_pdf(record)
+            return self.generated[idweb]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real servers
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        is_pdf = url.path.startswith("/telechargements/")
+        server.count(is_pdf)
+
+        latency = server.pdf_latency if is_pdf else server.api_latency
+        time.sleep(max(0.0, latency + random.uniform(-server.jitter, server.jitter)))
+        if server.error_rate and random.random() < server.error_rate:
+            return self.send_json(503, {"error_code": "ServiceUnavailable", "message": "stand-in injected failure"})
+
+        if url.path == f"{DATASET_PATH}/records":
+            limit = int(params.get("limit", 10))
+            offset = int(params.get("offset", 0))
+            if limit > PAGE_SIZE or offset + limit > MAX_WINDOW:
+                return self.send_json(400, {"error_code": "InvalidRESTParameterError",
+                                            "message": "Invalid value for limit or offset"})
+            records = server.dataset.select(params.get("where", ""))
+            return self.send_json(200, {"total_count": len(records), "results": records[offset:offset + limit]})
+
+        if url.path == f"{DATASET_PATH}/exports/json":
+            records = server.dataset.select(params.get("where", ""))
+            limit = int(params.get("limit", -1))
+            return self.send_json(200, records if limit < 0 else records[:limit])
+
+        match = PDF_PATH_RE.match(url.path)
+        pdf_bytes = server.pdfs.get(match.group(1)) if match else None
+        if pdf_bytes is None:
+            return self.send_body(404, b"Not Found", "text/plain")
+        return self.send_body(200, pdf_bytes, "application/pdf")
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded stand-in server; latencies are in seconds"""
+
+    daemon_threads = True
+
+    def __init__(self, dataset, pdfs, host="127.0.0.1", port=0, api_latency=0.0, pdf_latency=0.0,
+                 jitter=0.0, error_rate=0.0):
+        super().__init__((host, port), StandInHandler)
+        self.dataset = dataset
+        self.pdfs = pdfs
+        self.api_latency = api_latency
+        self.pdf_latency = pdf_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = {"api": 0, "pdf": 0}
+        self.requests_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def dataset_url(self):
+        return self.base_url + DATASET_PATH
+
+    def count(self, is_pdf):
+        with self.requests_lock:
+            self.requests["pdf" if is_pdf else "api"] += 1
+
+    def start(self):
+        """Serve from a daemon thread; returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, name="boamp-standin", daemon=True)
+        thread.start()
+        return thread
+
+
+def record_live(target_date, out_dir):
+    """Save the live records pages of a publication date (up to the API offset window)"""
+    os.makedirs(out_dir, exist_ok=True)
+    params = {"where": f"dateparution = date'{target_date}'", "order_by": "idweb", "limit": PAGE_SIZE}
+    offset = 0
+    while True:
+        response = requests.get(f"{LIVE_DATASET_URL}/records", params={**params, "offset": offset}, timeout=30)
+        response.raise_for_status()
+        page = response.json()
+        with open(os.path.join(out_dir, f"page_{offset // PAGE_SIZE:04d}.json"), "w", encoding="utf-8") as page_file:
+            json.dump(page, page_file, ensure_ascii=False)
+        offset += PAGE_SIZE
+        if offset >= min(page.get("total_count", 0), MAX_WINDOW):
+            return offset // PAGE_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the stand-in server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--records", default="1k",
+                       help="comma-separated synthetic day sizes (a number or 1k / 10k / 50k), one date each")
+    serve.add_argument("--date", default="2024-06-03", help="publication date of the first synthetic day")
+    serve.add_argument("--seed", type=int, default=0)
+    serve.add_argument("--recordings", help="replay recorded API pages from this directory instead")
+    serve.add_argument("--pdf-corpus", help="serve PDFs from this directory instead of generating them")
+    serve.add_argument("--api-latency", type=float, default=0, help="milliseconds per API request")
+    serve.add_argument("--pdf-latency", type=float, default=0, help="milliseconds per PDF request")
+    serve.add_argument("--jitter", type=float, default=0, help="+/- milliseconds added at random")
+    serve.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 503")
+
+    record = commands.add_parser("record", help="save the live API pages of a date for later replay")
+    record.add_argument("--date", required=True)
+    record.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        pages = record_live(args.date, args.out)
+        print(f"Saved {pages} pages to {args.out}")
+        return
+
+    if args.recordings:
+        records = load_recordings(args.recordings)
+    else:
+        records = []
+        for day, size in synthetic_days(args.date, args.records):
+            records += generate_day(day, size, args.seed)
+    dataset = BoampDataset(records)
+    server = StandInServer(
+        dataset, PDFSource(dataset, args.pdf_corpus), args.host, args.port,
+        args.api_latency / 1000, args.pdf_latency / 1000, args.jitter / 1000, args.error_rate
+    )
+    print(f"BOAMP stand-in serving {len(records)} notices on {server.base_url}", flush=True)
+    print(f"  BOAMP_DATASET_URL={server.dataset_url}", flush=True)
+    print(f"  BOAMP_PDF_BASE_URL={server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Synthetic BOAMP publication days and notice PDFs for the benchmarks
+
+A generated day looks like what the opendatasoft records endpoint returns for
+one dateparution: list fields stay lists, and 'donnees' is a JSON string a few
+KB long that embeds the CPV codes. A small share of notices mention the
+app's predefined keywords, so the keyword filter keeps a realistic fraction.
+Everything is seeded, so the same size, date and seed always give the same day.
+
+Usage:
+    python benchmarks/synthetic.py --records 10000 [--date 2024-06-03] [--seed 0] [--out day.json]
+    python benchmarks/synthetic.py --records 200 --pdf-dir corpus/   # also write one PDF per notice
+"""
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+DAY_SIZES = {"1k": 1000, "10k": 10000, "50k": 50000}
+
+# Part of the app's predefined keywords, as text and as CPV codes
+MATCHING_PHRASES = [
+    "menuiserie extérieure", "Serrurerie", "Travaux de menuiserie", "Pose de clôtures", "métallerie",
+    "Installation de volets", "Escaliers", "Travaux de cloisonnement", "miroiterie",
+]
+MATCHING_CPV = ["45421000", "45421100", "44316500", "45340000", "45342000", "45313000", "50740000"]
+OTHER_PHRASES = [
+    "Fourniture de denrées alimentaires", "Prestations de nettoyage des locaux", "Maintenance des installations",
+    "Travaux de voirie et réseaux divers", "Assurance dommages aux biens", "Location de véhicules",
+    "Mission de maîtrise d'oeuvre", "Fourniture de matériel informatique", "Entretien des espaces verts",
+    "Transport scolaire", "Travaux de peinture", "Réhabilitation d'un groupe scolaire",
+    "Prestations de restauration collective", "Travaux de plomberie et chauffage", "Etudes géotechniques",
+]
+OTHER_CPV = ["15000000", "90910000", "50700000", "45233140", "66515000", "34100000", "71000000", "30200000",
+             "77310000", "60130000", "45442100", "45214200", "55520000", "45330000", "71332000"]
+BUYERS = ["Commune de", "Département de", "Communauté d'agglomération de", "Centre hospitalier de",
+          "Office public de l'habitat de", "Syndicat mixte de"]
+CITIES = ["Lyon", "Rennes", "Nantes", "Lille", "Bordeaux", "Toulouse", "Dijon", "Metz", "Tours", "Amiens",
+          "Nîmes", "Brest", "Limoges", "Pau", "Annecy", "Valence", "Orléans", "Caen"]
+DEPARTMENTS = [f"{number:02d}" for number in range(1, 96) if number != 20] + ["2A", "2B", "971", "972", "974"]
+FILLER = (
+    "Le présent avis porte sur la passation d'un marché public selon les conditions du code de la commande "
+    "publique. Les candidats transmettent leur offre par voie électronique avant la date limite indiquée. "
+    "Les critères d'attribution sont le prix et la valeur technique appréciée au regard du mémoire technique. "
+)
+DOCUMENTS_URL = "https://www.achatpublic.com/sdm/ent/gen/ent_detail.do?PCSLID=CSL_{year}_{code}"
+
+
+def parse_size(value):
+    """'10k' -> 10000; plain integers are accepted too"""
+    return DAY_SIZES.get(value.lower()) or int(value)
+
+
+def synthetic_days(start_date, sizes):
+    """[(date, size)] for comma-separated sizes, one publication date each from start_date on"""
+    start = date.fromisoformat(start_date)
+    return [((start + timedelta(days=offset)).isoformat(), parse_size(size.strip()))
+            for offset, size in enumerate(sizes.split(","))]
+
+
+def day_seed(target_date, count, seed):
+    return f"{target_date}:{count}:{seed}"
+
+
+def generate_record(rng, target_date, idweb):
+    """One notice as returned by the records endpoint"""
+    matching = rng.random() < 0.08
+    lots = rng.randint(1, 6) if rng.random() < 0.4 else 0
+    phrases = rng.sample(MATCHING_PHRASES if matching else OTHER_PHRASES, k=rng.randint(1, 2))
+    cpv_codes = rng.sample(MATCHING_CPV if matching else OTHER_CPV, k=rng.randint(1, 3))
+    departments = rng.sample(DEPARTMENTS, k=1 if rng.random() < 0.9 else 2)
+    city = rng.choice(CITIES)
+    published = date.fromisoformat(target_date)
+    deadline = published + timedelta(days=rng.randint(10, 45))
+
+    donnees = {
+        "OBJET": {
+            "TITRE": phrases[0],
+            "CPV": {"PRINCIPAL": cpv_codes[0], "SUPPLEMENTAIRE": cpv_codes[1:]},
+            "DIV_EN_LOTS": {"OUI": None} if lots else {"NON": None},
+            "LOTS": [{"NUM": str(number), "INTITULE": rng.choice(phrases), "CPV": rng.choice(cpv_codes)}
+                     for number in range(1, lots + 1)],
+            "DESCRIPTION": FILLER * rng.randint(2, 8),
+        },
+        "IDENTITE": {"DENOMINATION": f"{rng.choice(BUYERS)} {city}", "VILLE": city, "CP": departments[0] + "000"},
+        "PROCEDURES": {"TYPE": rng.choice(["Ouverte", "Adaptée", "Restreinte"])},
+    }
+    return {
+        "idweb": idweb,
+        "id": idweb,
+        "objet": f"{' - '.join(phrases)} ({city})",
+        "nomacheteur": f"{rng.choice(BUYERS)} {city}",
+        "dateparution": target_date,
+        "datelimitereponse": f"{deadline.isoformat()}T12:00:00+00:00",
+        "code_departement": departments,
+        "type_marche": [rng.choice(["TRAVAUX", "SERVICES", "FOURNITURES"])],
+        "nature": "APPEL_OFFRE",
+        "nature_libelle": "Avis de marché",
+        "famille": "FNS",
+        "descripteur_code": cpv_codes,
+        "descripteur_libelle": phrases,
+        "donnees": json.dumps(donnees, ensure_ascii=False),
+    }
+
+
+def generate_day(target_date, count, seed=0):
+    """`count` notices published on `target_date`, sorted by idweb like the API returns them"""
+    rng = random.Random(day_seed(target_date, count, seed))
+    published = date.fromisoformat(target_date)
+    first_number = published.timetuple().tm_yday * 100000
+    return [
+        generate_record(rng, target_date, f"{published.year % 100:02d}-{first_number + number:07d}")
+        for number in range(count)
+    ]
+
+
+def notice_pages(record, seed=0):
+    """Page texts of a notice PDF: lots, a visite clause and a 'Documents de marché' link, padded with filler"""
+    rng = random.Random(f"{record['idweb']}:{seed}")
+    donnees = json.loads(record["donnees"])
+    lines = [
+        "BOAMP - Avis de marché",
+        f"Référence : {record['idweb']}",
+        f"Acheteur : {record['nomacheteur']}",
+        f"Objet : {record['objet']}",
+        "",
+    ]
+    lines += [FILLER[i:i + 95] for i in range(0, len(FILLER), 95)] * rng.randint(2, 6)
+    for lot in donnees["OBJET"]["LOTS"]:
+        lines += ["", f"Lot {lot['NUM']} : {lot['INTITULE']}", f"Code CPV principal : {lot['CPV']}"]
+        lines += [FILLER[:95], FILLER[95:190]]
+    if rng.random() < 0.3:
+        lines += ["", "Une visite des lieux est obligatoire avant la remise des offres."]
+    lines += [
+        "",
+        "Documents de marché : " + DOCUMENTS_URL.format(year=record["dateparution"][:4], code=rng.randint(10 ** 5, 10 ** 6)),
+        f"Date limite de réception des offres : {record['datelimitereponse'][:10]}",
+    ]
+    lines += [FILLER[i:i + 95] for i in range(0, len(FILLER), 95)] * rng.randint(10, 60)
+    return ["\n".join(lines[start:start + 60]) for start in range(0, len(lines), 60)]
+
+
+def _pdf_string(line):
+    """A PDF literal string in WinAnsi encoding"""
+    encoded = line.replace("’", "'").encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def make_pdf(pages):
+    """A minimal text-only PDF (Helvetica, one text block per page) with the given page texts"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_refs = []
+    for page_text in pages:
+        stream = b"BT /F1 9 Tf 11 TL 40 800 Td " + b" ".join(
+            _pdf_string(line) + b" Tj T*" for line in page_text.split("\n")
+        ) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % len(objects))
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(page_refs) + b"] /Count %d >>" % len(pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def notice_pdf(record, seed=0):
+    """PDF bytes of a synthetic notice"""
+    return make_pdf(notice_pages(record, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", default="1k", help="number of notices, or 1k / 10k / 50k")
+    parser.add_argument("--date", default="2024-06-03")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the day as a JSON list (default: print a summary only)")
+    parser.add_argument("--pdf-dir", help="also write <idweb>.pdf for every notice into this directory")
+    args = parser.parse_args()
+
+    records = generate_day(args.date, parse_size(args.records), args.seed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out_file:
+            json.dump(records, out_file, ensure_ascii=False)
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+        for record in records:
+            with open(os.path.join(args.pdf_dir, f"{record['idweb']}.pdf"), "wb") as pdf_file:
+                pdf_file.write(notice_pdf(record, args.seed))
+    size_mb = sum(len(json.dumps(record, ensure_ascii=False)) for record in records) / (1024 * 1024)
+    print(f"{len(records)} notices for {args.date} ({size_mb:.1f} MB of JSON)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Set
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+
+# Export writers
+# Every writer consumes an iterator of flat row dicts along with the columns
+# to write (found by a first pass, see row_columns, since rows don't all have
+# the same keys) and never holds the whole table: CSV is produced chunk by
+# chunk, xlsx goes through openpyxl's write-only workbook and Parquet is
+# written in row groups. Output files appear atomically, so a half-written
+# export is never served from the cache.
+
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+CSV_CHUNK_ROWS = 200
+EXCEL_CELL_MAX_CHARS = 32767
+PARQUET_BATCH_ROWS = 1000
+
+
+@contextlib.contextmanager
+def atomic_output(path: str):
+    """Yield a temporary path next to `path`, moved into place if the block succeeds"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".part", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+
+
+def row_columns(rows: Iterable[dict]) -> Dict[str, Set[type]]:
+    """Every column of the rows, in order of first appearance, with the types of its non-null values"""
+    columns = {}
+    for row in rows:
+        for column, value in row.items():
+            kinds = columns.setdefault(column, set())
+            if value is not None:
+                kinds.add(type(value))
+    return columns
+
+
+def stream_csv(rows: Iterable[dict], path: str, columns: Dict[str, Set[type]]) -> Iterator[bytes]:
+    """Yield a UTF-8 (with BOM, for Excel) CSV export chunk by chunk, saving the same bytes to `path`"""
+    with atomic_output(path) as temp_path, open(temp_path, "wb") as cache_file:
+        buffer = io.StringIO()
+        buffer.write('\ufeff')
+        writer = csv.DictWriter(buffer, fieldnames=list(columns), lineterminator='\n')
+        writer.writeheader()
+        for count, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if count % CSV_CHUNK_ROWS == 0:
+                chunk = buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                cache_file.write(chunk)
+                yield chunk
+        chunk = buffer.getvalue().encode('utf-8')
+        cache_file.write(chunk)
+        yield chunk
+
+
+def write_csv(rows: Iterable[dict], path: str, columns: Dict[str, Set[type]]):
+    """Write a CSV export to `path`"""
+    for _ in stream_csv(rows, path, columns):
+        pass
+
+
+def _xlsx_value(value):
+    """Strip the control characters openpyxl refuses in cells and cut texts to Excel's cell limit"""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)[:EXCEL_CELL_MAX_CHARS]
+    return value
+
+
+def write_xlsx(rows: Iterable[dict], path: str, columns: Dict[str, Set[type]]):
+    """Write an xlsx export to `path` with a write-only (constant memory) workbook"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(columns))
+    for row in rows:
+        sheet.append([_xlsx_value(row.get(column)) for column in columns])
+    with atomic_output(path) as temp_path:
+        workbook.save(temp_path)
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _parquet_schema(pa, columns: Dict[str, Set[type]]):
+    """Numeric/boolean columns keep their type; text, mixed and empty columns are stored as text"""
+    fields = []
+    for column, kinds in columns.items():
+        if kinds == {bool}:
+            fields.append(pa.field(column, pa.bool_()))
+        elif kinds and kinds <= {int}:
+            fields.append(pa.field(column, pa.int64()))
+        elif kinds and kinds <= {int, float}:
+            fields.append(pa.field(column, pa.float64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+
+def _parquet_column(pa, values: list, field_type) -> list:
+    """Coerce a column to its schema type (text columns stringify whatever they hold)"""
+    if field_type == pa.string():
+        return [None if value is None else str(value) for value in values]
+    return values
+
+
+def write_parquet(rows: Iterable[dict], path: str, columns: Dict[str, Set[type]]):
+    """Write a Parquet export to `path`, one row group per batch (needs pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa, columns)
+    with atomic_output(path) as temp_path:
+        with pq.ParquetWriter(temp_path, schema) as writer:
+            for batch in _batches(rows, PARQUET_BATCH_ROWS):
+                values = {
+                    field.name: _parquet_column(pa, [row.get(field.name) for row in batch], field.type)
+                    for field in schema
+                }
+                writer.write_table(pa.table(values, schema=schema))
+
+
+EXPORT_WRITERS: Dict[str, Callable[[Iterable[dict], str, Dict[str, Set[type]]], None]] = {
+    'csv': write_csv,
+    'xlsx': write_xlsx,
+    'parquet': write_parquet,
+}
@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class HostPolicy(NamedTuple):
+    max_concurrency: int
+    rate: float = 0  # requests per second, 0 = unlimited
+    burst: int = 1
+    timeout: Optional[float] = None
+
+
+class HTTPClient:
+    """Shared HTTP client: keep-alive pools, per-host limits and retries
+
+    Every outgoing request of the app goes through one instance, so connections
+    to a host are reused across jobs and threads. Each host gets a concurrency
+    cap and an optional token-bucket rate (see configure_host). GET requests
+    that fail with a connection error, a timeout, 429 or 5xx are retried with
+    exponential backoff and full jitter, honouring a numeric Retry-After.
+
+    With http2=True and httpx[http2] installed, requests are sent over HTTP/2;
+    otherwise a pooled requests.Session (HTTP/1.1 keep-alive) is used. Either
+    way failures surface as requests exceptions, so callers don't care.
+    `on_retry(host, reason)` is called before each retry (for metrics).
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, default_policy: HostPolicy, timeout: float = 30, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30, http2: bool = False,
+                 on_retry: Optional[Callable[[str, str], None]] = None):
+        self.default_policy = default_policy
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_retry = on_retry
+        self.policies: Dict[str, HostPolicy] = {}
+        self.host_limits: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+        self.httpx_client = self._make_httpx_client() if http2 else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(default_policy.max_concurrency, 16))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _make_httpx_client(self):
+        try:
+            import httpx
+            return httpx.Client(http2=True, timeout=self.timeout)
+        except ImportError:
+            print("HTTP/2 requested but httpx[http2] is not installed, using HTTP/1.1")
+            return None
+
+    def configure_host(self, host: str, policy: HostPolicy):
+        """Set the concurrency cap, rate and timeout used for one host"""
+        with self.lock:
+            self.policies[host.lower()] = policy
+            self.host_limits.pop(host.lower(), None)
+
+    def _limits(self, host: str):
+        """(semaphore, token bucket or None, policy) for a host"""
+        with self.lock:
+            if host not in self.host_limits:
+                policy = self.policies.get(host, self.default_policy)
+                bucket = TokenBucket(policy.rate, policy.burst) if policy.rate > 0 else None
+                self.host_limits[host] = (threading.BoundedSemaphore(policy.max_concurrency), bucket, policy)
+            return self.host_limits[host]
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, url: str, params, headers, timeout: float):
+        """Send one GET with the active backend; transport errors become requests exceptions"""
+        if self.httpx_client is None:
+            return self.session.get(url, params=params, headers=headers, timeout=timeout)
+
+        import httpx
+        try:
+            return self.httpx_client.get(url, params=params, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e))
+
+    def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+            timeout: Optional[float] = None):
+        """GET a URL with retries; returns the response (2xx/3xx) or raises requests.HTTPError"""
+        host = urlparse(url).netloc.lower()
+        slot, bucket, policy = self._limits(host)
+        timeout = timeout or policy.timeout or self.timeout
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            retry_after = None
+            try:
+                with slot:
+                    if bucket:
+                        bucket.acquire()
+                    response = self._send(url, params, headers, timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                reason = type(e).__name__
+            else:
+                if response.status_code not in self.RETRY_STATUSES or last_attempt:
+                    if response.status_code >= 400:
+                        raise requests.HTTPError(f"{response.status_code} error for url: {url}", response=response)
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                reason = str(response.status_code)
+            if self.on_retry:
+                self.on_retry(host, reason)
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+        if self.httpx_client is not None:
+            self.httpx_client.close()
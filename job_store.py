@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, List, Optional, Set
+
+
+class JobStore:
+    """SQLite-backed store of jobs, their result rows and their progress events
+
+    Every uvicorn worker opens the same database file (WAL mode), so any worker
+    can answer /progress, /results or /download for a job started by another
+    one, and jobs survive restarts.
+    """
+
+    # Columns that update() accepts; job parameters live in the 'params' JSON
+    FIELDS = ['status', 'current_step', 'total_records', 'processed_records', 'current_record', 'message', 'error']
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                process_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                current_step TEXT NOT NULL DEFAULT '',
+                total_records INTEGER NOT NULL DEFAULT 0,
+                processed_records INTEGER NOT NULL DEFAULT 0,
+                current_record TEXT NOT NULL DEFAULT '',
+                message TEXT,
+                error TEXT,
+                params TEXT NOT NULL DEFAULT '{}',
+                job_key TEXT NOT NULL DEFAULT '',
+                timings TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at);
+            CREATE TABLE IF NOT EXISTS job_rows (
+                process_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                idweb TEXT NOT NULL,
+                row TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                failed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (process_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                process_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_events_process ON job_events (process_id, event_id);
+        """)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(jobs)")]
+        if 'job_key' not in columns:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN job_key TEXT NOT NULL DEFAULT ''")
+        if 'timings' not in columns:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN timings TEXT NOT NULL DEFAULT '{}'")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_job_key ON jobs (job_key, status)")
+        row_columns = [row[1] for row in self.db.execute("PRAGMA table_info(job_rows)")]
+        if 'failed' not in row_columns:
+            self.db.execute("ALTER TABLE job_rows ADD COLUMN failed INTEGER NOT NULL DEFAULT 0")
+            self.db.execute("UPDATE job_rows SET failed = 1 WHERE row LIKE '%\"pdf_status\": \"Error%'")
+        self.db.execute("CREATE INDEX IF NOT EXISTS job_rows_idweb ON job_rows (process_id, idweb)")
+        self.db.commit()
+
+    def create(self, process_id: str, params: dict, job_key: str = '', **fields):
+        """Register a new job with its parameters (keywords, date, departments...)"""
+        with self.lock:
+            self._insert(process_id, params, job_key, fields)
+            self.db.commit()
+
+    def attach_or_create(self, process_id: str, params: dict, job_key: str, stale_before: float, **fields) -> str:
+        """Return the running job with the same job_key, or register a new one
+
+        A job counts as running if it is queued or processing and was updated
+        after stale_before. The lookup and the insert share one write
+        transaction, so concurrent workers agree on a single job.
+        """
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT process_id FROM jobs WHERE job_key = ? AND status IN ('queued', 'processing') "
+                    "AND updated_at >= ? ORDER BY created_at LIMIT 1",
+                    (job_key, stale_before)
+                ).fetchone()
+                if row is None:
+                    self._insert(process_id, params, job_key, fields)
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return row[0] if row else process_id
+
+    def _insert(self, process_id: str, params: dict, job_key: str, fields: dict):
+        """Insert a job row (lock held, caller commits)"""
+        now = time.time()
+        fields = {name: value for name, value in fields.items() if name in self.FIELDS}
+        columns = ['process_id', 'params', 'job_key', 'created_at', 'updated_at'] + list(fields)
+        values = [process_id, json.dumps(params, ensure_ascii=False), job_key, now, now] + list(fields.values())
+        self.db.execute(
+            f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", values
+        )
+
+    def update(self, process_id: str, **fields):
+        """Update progress fields of a job"""
+        fields = {name: value for name, value in fields.items() if name in self.FIELDS}
+        assignments = ''.join(f"{name} = ?, " for name in fields)
+        with self.lock:
+            self.db.execute(
+                f"UPDATE jobs SET {assignments}updated_at = ? WHERE process_id = ?",
+                list(fields.values()) + [time.time(), process_id]
+            )
+            self.db.commit()
+
+    def set_timings(self, process_id: str, timings: dict):
+        """Store a job's timing breakdown (step -> seconds and count)"""
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET timings = ? WHERE process_id = ?", (json.dumps(timings), process_id)
+            )
+            self.db.commit()
+
+    def get(self, process_id: str) -> Optional[dict]:
+        """Return a job's fields merged with its parameters, or None"""
+        with self.lock:
+            cursor = self.db.execute("SELECT * FROM jobs WHERE process_id = ?", (process_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([column[0] for column in cursor.description], row))
+        job.pop('job_key')
+        job['timings'] = json.loads(job['timings'])
+        params = json.loads(job.pop('params'))
+        return {**params, **job}
+
+    def append_row(self, process_id: str, idweb: str, row: dict, summary: dict, failed: bool = False) -> int:
+        """Append a finished result row and its summary; returns its position
+
+        A notice that failed in an earlier run keeps its position and has its
+        row replaced, so the rows stay numbered 1..n for /results?since=.
+        """
+        values = (json.dumps(row, ensure_ascii=False), json.dumps(summary, ensure_ascii=False), int(failed))
+        with self.lock:
+            previous = self.db.execute(
+                "SELECT seq FROM job_rows WHERE process_id = ? AND idweb = ? AND failed = 1 ORDER BY seq LIMIT 1",
+                (process_id, str(idweb))
+            ).fetchone()
+            if previous is not None:
+                seq = previous[0]
+                self.db.execute(
+                    "UPDATE job_rows SET row = ?, summary = ?, failed = ? WHERE process_id = ? AND seq = ?",
+                    values + (process_id, seq)
+                )
+            else:
+                seq = self.db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_rows WHERE process_id = ?", (process_id,)
+                ).fetchone()[0]
+                self.db.execute(
+                    "INSERT INTO job_rows (process_id, seq, idweb, row, summary, failed) VALUES (?, ?, ?, ?, ?, ?)",
+                    (process_id, seq, str(idweb)) + values
+                )
+            self.db.commit()
+        return seq
+
+    def summaries(self, process_id: str, since: int = 0) -> List[dict]:
+        """Summary rows of a job, in completion order, after the first `since`"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT summary FROM job_rows WHERE process_id = ? AND seq > ? ORDER BY seq", (process_id, since)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_rows(self, process_id: str, column: str = 'row', batch_size: int = 500) -> Iterator[dict]:
+        """Stream a job's full rows (or 'summary' rows) in completion order, one batch in memory at a time"""
+        if column not in ('row', 'summary'):
+            raise ValueError(f"Unknown row column '{column}'")
+        last_seq = 0
+        while True:
+            with self.lock:
+                batch = self.db.execute(
+                    f"SELECT seq, {column} FROM job_rows WHERE process_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (process_id, last_seq, batch_size)
+                ).fetchall()
+            for last_seq, data in batch:
+                yield json.loads(data)
+            if len(batch) < batch_size:
+                return
+
+    def done_idwebs(self, process_id: str) -> Set[str]:
+        """idwebs whose result row is already stored (the job's checkpoint); failed rows are retried"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT idweb FROM job_rows WHERE process_id = ? AND failed = 0", (process_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def claim(self, process_id: str, stale_before: float) -> bool:
+        """Atomically requeue a failed job, or a running one whose heartbeat is older than stale_before
+
+        Returns False if the job is not resumable or another worker claimed it first.
+        """
+        with self.lock:
+            cursor = self.db.execute(
+                "UPDATE jobs SET status = 'queued', current_step = 'queued', error = NULL, updated_at = ? "
+                "WHERE process_id = ? AND (status = 'error' OR (status IN ('queued', 'processing') AND updated_at < ?))",
+                (time.time(), process_id, stale_before)
+            )
+            self.db.commit()
+        return cursor.rowcount == 1
+
+    def row_count(self, process_id: str) -> int:
+        """Number of result rows stored for a job"""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM job_rows WHERE process_id = ?", (process_id,)).fetchone()[0]
+
+    def add_event(self, process_id: str, event_type: str, data: dict) -> int:
+        """Append a progress event; returns its id"""
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO job_events (process_id, type, data) VALUES (?, ?, ?)",
+                (process_id, event_type, json.dumps(data, ensure_ascii=False))
+            )
+            self.db.commit()
+        return cursor.lastrowid
+
+    def events_since(self, process_id: str, last_event_id: int):
+        """(event_id, type, data) tuples of a job newer than last_event_id"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT event_id, type, data FROM job_events WHERE process_id = ? AND event_id > ? ORDER BY event_id",
+                (process_id, last_event_id)
+            ).fetchall()
+        return [(event_id, event_type, json.loads(data)) for event_id, event_type, data in rows]
+
+    def evict_expired(self, ttl_seconds: float) -> List[str]:
+        """Delete jobs not updated for ttl_seconds, with their rows and events; returns their ids"""
+        cutoff = time.time() - ttl_seconds
+        with self.lock:
+            expired = [row[0] for row in self.db.execute("SELECT process_id FROM jobs WHERE updated_at < ?", (cutoff,))]
+            for process_id in expired:
+                self.db.execute("DELETE FROM job_rows WHERE process_id = ?", (process_id,))
+                self.db.execute("DELETE FROM job_events WHERE process_id = ?", (process_id,))
+                self.db.execute("DELETE FROM jobs WHERE process_id = ?", (process_id,))
+            self.db.commit()
+        return expired
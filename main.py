@@ -1,28 +1,39 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Form, UploadFile, File
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Form, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import List, Optional
-import requests
-import pandas as pd
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import json
-import io
 import uuid
 import os
-import tempfile
-import PyPDF2
 import time
 import re
 import uvicorn
 import asyncio
-import requests
-import io
+import functools
+import contextlib
 import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urljoin, urlparse
-import fitz  # PyMuPDF - better for PDF text extraction (install: pip install PyMuPDF)
+import bisect
+import hashlib
+import shutil
+import unicodedata
+from pdf_store import PDFStore
+from analysis_cache import AnalysisCache
+from text_store import TextStore
+from job_store import JobStore
+from notice_store import NoticeStore
+from http_client import HTTPClient, HostPolicy
+from metrics import MetricsRegistry, Timings
+from exports import EXPORT_MEDIA_TYPES, EXPORT_WRITERS, row_columns, stream_csv
+from pdf_text import LazyDocument, get_backend, format_pages
+from notice_record import NoticeRecord
+from notice_table import SPILL_ROWS, NoticeTable
 
 app = FastAPI(title="BOAMP Data Extractor Pro", version="3.0.0")
 
@@ -30,6 +41,10 @@ app = FastAPI(title="BOAMP Data Extractor Pro", version="3.0.0")
 os.makedirs("static", exist_ok=True)
 os.makedirs("templates", exist_ok=True)
 
+# Local data (PDF cache, job store, ...) lives under BOAMP_DATA_DIR
+DATA_DIR = os.environ.get("BOAMP_DATA_DIR", "data")
+os.makedirs(DATA_DIR, exist_ok=True)
+
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -57,74 +72,561 @@ class ExtractionResponse(BaseModel):
     filtered_records: Optional[int] = None
 
 # Storage for job results
-jobs = {}
-processing_state = {}
+# Jobs, their result rows and their progress events live in a SQLite file shared
+# by every worker process, so results survive restarts and any worker can serve
+# them. Jobs untouched for BOAMP_JOB_TTL_HOURS are evicted.
+JOB_TTL_SECONDS = float(os.environ.get("BOAMP_JOB_TTL_HOURS", "48")) * 3600
+JOB_EVICTION_INTERVAL = 3600
+
+job_store = JobStore(os.path.join(DATA_DIR, "jobs.sqlite"))
+
+# Checkpoints
+# Every finished row is stored as it completes, so a job cut short by a restart
+# or crash can be resumed with POST /resume/{id}: the pipeline reruns and skips
+# the notices already stored. Running jobs heartbeat the store; a queued or
+# processing job silent for BOAMP_JOB_STALE_SECONDS is reported as interrupted.
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_STALE_SECONDS = float(os.environ.get("BOAMP_JOB_STALE_SECONDS", "120"))
+RESUMABLE_STATUSES = ('error', 'interrupted')
+
+# Progress events
+# Each job keeps an append-only log of small events (progress counters, per-row
+# status, completion) that /progress/{id}/stream pushes to the browser as
+# Server-Sent Events. Events are numbered so a reconnecting client resumes
+# from its Last-Event-ID.
+PROGRESS_FIELDS = JobStore.FIELDS
+TERMINAL_STATUSES = ('completed', 'error')
+# 'error' is reserved by EventSource for connection failures
+TERMINAL_EVENTS = {'completed': 'completed', 'error': 'failed'}
+SSE_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_INTERVAL = 15
+
+def publish_event(process_id: str, event_type: str, data: dict):
+    """Append an event to a job's event log"""
+    job_store.add_event(process_id, event_type, data)
+
+def get_events_since(process_id: str, last_event_id: int):
+    """Return the job's events numbered after last_event_id"""
+    return job_store.events_since(process_id, last_event_id)
+
+def progress_summary(job: dict) -> dict:
+    """Compact progress view of a job, without its result rows"""
+    return {field: job[field] for field in PROGRESS_FIELDS if job.get(field) is not None}
+
+def job_status(job: dict) -> str:
+    """Status of a job, 'interrupted' if it stopped heartbeating while running"""
+    if job['status'] in ('queued', 'processing') and job['updated_at'] < time.time() - JOB_STALE_SECONDS:
+        return 'interrupted'
+    return job['status']
+
+async def get_job(process_id: str) -> dict:
+    """Load a job from the store or answer 404"""
+    job = await run_store(job_store.get, process_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Process not found")
+    job['status'] = job_status(job)
+    return job
+
+def build_job_key(target_date: str, end_date: str, keywords: List[str], departments: List[str]) -> str:
+    """Identity of a job's inputs; identical submissions attach to the same running job"""
+    inputs = json.dumps([target_date, end_date, sorted(set(keywords)), sorted(set(departments))], ensure_ascii=False)
+    return hashlib.sha256(inputs.encode('utf-8')).hexdigest()
+
+def publish_progress(process_id: str):
+    """Publish a job's current progress summary"""
+    publish_event(process_id, 'progress', progress_summary(job_store.get(process_id)))
+
+def update_progress(process_id: str, **fields):
+    """Update a job's state and publish the new progress summary"""
+    job_store.update(process_id, **fields)
+    job = job_store.get(process_id)
+    event_type = TERMINAL_EVENTS.get(job['status'], 'progress')
+    publish_event(process_id, event_type, progress_summary(job))
+
+# Job execution engine
+# Every pipeline stage is blocking (HTTP paging, record processing, PDF downloads), so it
+# runs on a bounded worker pool instead of the event loop. MAX_CONCURRENT_JOBS
+# caps how many jobs run their pipeline at once; extra jobs wait in 'queued'.
+MAX_CONCURRENT_JOBS = int(os.environ.get("BOAMP_MAX_CONCURRENT_JOBS", "4"))
+STAGE_WORKERS = int(os.environ.get("BOAMP_STAGE_WORKERS", str(MAX_CONCURRENT_JOBS)))
+
+stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="boamp-stage")
+job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+running_jobs = set()
+
+async def run_stage(func, *args, **kwargs):
+    """Run a blocking pipeline stage on the worker pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(stage_executor, functools.partial(func, *args, **kwargs))
+
+# Job store calls (SQLite) and text store reads from the event loop run on their
+# own small pool, so progress polls, SSE streams and /text are not queued
+# behind long pipeline stages.
+STORE_WORKERS = int(os.environ.get("BOAMP_STORE_WORKERS", "4"))
+
+store_executor = ThreadPoolExecutor(max_workers=STORE_WORKERS, thread_name_prefix="boamp-store")
+
+async def run_store(func, *args, **kwargs):
+    """Run a blocking job or text store call on the store pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(store_executor, functools.partial(func, *args, **kwargs))
+
+# Blocking work done on behalf of a single request (building exports, the PDF
+# link lookup) runs on its own pool, so it neither waits behind pipeline stages
+# nor stalls the event loop.
+IO_WORKERS = int(os.environ.get("BOAMP_IO_WORKERS", "4"))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="boamp-io")
+
+async def run_io(func, *args, **kwargs):
+    """Run blocking request work on the I/O pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+# The notice ingester and the eviction loop run on a pool of their own, so
+# background upkeep neither takes a stage slot from a job nor waits for one.
+BACKGROUND_WORKERS = 2
+
+background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="boamp-background")
+
+async def run_background(func, *args, **kwargs):
+    """Run blocking background upkeep on the background pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(background_executor, functools.partial(func, *args, **kwargs))
+
+# Metrics
+# Stage and per-PDF step durations, download sizes, cache lookups and errors
+# are exported at /metrics in the Prometheus text format. The same durations
+# are summed per job and stored in the job record's timings.
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram("boamp_stage_duration_seconds", "Duration of pipeline stages", ["stage"])
+PDF_STEP_SECONDS = metrics.histogram("boamp_pdf_step_duration_seconds", "Duration of per-notice PDF steps", ["step"])
+PDF_DOWNLOAD_BYTES = metrics.histogram(
+    "boamp_pdf_download_bytes", "Size of downloaded PDFs",
+    buckets=(10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6)
+)
+CACHE_LOOKUPS = metrics.counter("boamp_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+ERRORS = metrics.counter("boamp_errors_total", "Errors by kind", ["kind"])
+HTTP_RETRIES = metrics.counter("boamp_http_retries_total", "Retried HTTP requests by host and reason", ["host", "reason"])
+JOBS = metrics.counter("boamp_jobs_total", "Finished jobs by status", ["status"])
+
+current_timings = threading.local()
+
+@contextlib.contextmanager
+def timed_step(step: str):
+    """Measure a per-notice step into the metrics and the current job's timings"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PDF_STEP_SECONDS.observe(elapsed, step=step)
+        timings = getattr(current_timings, 'timings', None)
+        if timings is not None:
+            timings.add(step, elapsed)
+
+def with_timings(timings: Optional[Timings], func, *args, **kwargs):
+    """Run func on a worker thread, attributing the steps it measures to a job"""
+    current_timings.timings = timings
+    try:
+        return func(*args, **kwargs)
+    finally:
+        current_timings.timings = None
+
+async def run_timed_stage(timings: Timings, stage: str, func, *args, **kwargs):
+    """Run a pipeline stage on the worker pool and record its duration"""
+    started = time.perf_counter()
+    try:
+        return await run_stage(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings.add(stage, elapsed)
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    """Stop accepting stage work when the server shuts down"""
+    stage_executor.shutdown(wait=False, cancel_futures=True)
+    store_executor.shutdown(wait=False, cancel_futures=True)
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    background_executor.shutdown(wait=False, cancel_futures=True)
+    pdf_download_executor.shutdown(wait=False, cancel_futures=True)
+    pdf_parse_executor.shutdown(wait=False, cancel_futures=True)
+    api_page_executor.shutdown(wait=False, cancel_futures=True)
+    http_client.close()
+
+async def evict_expired_jobs():
+    """Periodically drop jobs older than the TTL from the job store, and unused PDF texts"""
+    while True:
+        try:
+            evicted = await run_background(job_store.evict_expired, JOB_TTL_SECONDS)
+            for process_id in evicted:
+                shutil.rmtree(os.path.join(EXPORT_DIR, process_id), ignore_errors=True)
+                shutil.rmtree(os.path.join(SPILL_DIR, process_id), ignore_errors=True)
+            if evicted:
+                print(f"Evicted {len(evicted)} expired jobs")
+            evicted_texts = await run_background(text_store.evict_expired, TEXT_TTL_SECONDS)
+            if evicted_texts:
+                print(f"Evicted {evicted_texts} unused PDF texts")
+        except Exception as e:
+            print(f"Error evicting expired jobs: {e}")
+        await asyncio.sleep(JOB_EVICTION_INTERVAL)
+
+@app.on_event("startup")
+async def start_job_eviction():
+    """Start the job store eviction loop"""
+    task = asyncio.create_task(evict_expired_jobs())
+    running_jobs.add(task)
+    task.add_done_callback(running_jobs.discard)
+
+# Request coalescing
+# Concurrent jobs often ask for the same API pages and PDFs at the same moment.
+# A SingleFlight lets the first caller for a key do the work while the others
+# wait for its result (or its exception) instead of repeating the request.
+class SingleFlight:
+    """Share one in-flight call among the threads asking for the same key"""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Call func(*args, **kwargs), or wait for the identical call already running"""
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+api_flights = SingleFlight()
+pdf_flights = SingleFlight()
+
+# BOAMP opendatasoft API
+# The records endpoint serves at most 100 rows per call and refuses offsets past
+# 10000, so larger result sets go through the exports endpoint in one request.
+# BOAMP_DATASET_URL and BOAMP_PDF_BASE_URL can point the app at another server,
+# such as the stand-in used by the benchmarks. Values that go into the ODSQL
+# where clause are validated (dates, department codes) or quoted as string
+# literals. Only BOAMP_TYPE_MARCHE notices are processed ('Travaux' unless set;
+# an empty value keeps every market type).
+BOAMP_DATASET_URL = os.environ.get(
+    "BOAMP_DATASET_URL", "https://boamp-datadila.opendatasoft.com/api/explore/v2.1/catalog/datasets/boamp"
+).rstrip("/")
+BOAMP_PDF_BASE_URL = os.environ.get("BOAMP_PDF_BASE_URL", "https://www.boamp.fr").rstrip("/")
+API_PAGE_SIZE = 100
+API_MAX_WINDOW = 10000
+API_PAGE_WORKERS = int(os.environ.get("BOAMP_API_PAGE_WORKERS", "6"))
+API_TIMEOUT = 30
+TYPE_MARCHE = os.environ.get("BOAMP_TYPE_MARCHE", "Travaux")
+DEPARTMENT_CODE_RE = re.compile(r'^\w{1,3}$')
+
+api_page_executor = ThreadPoolExecutor(max_workers=API_PAGE_WORKERS, thread_name_prefix="boamp-api-page")
+
+def build_records_where(target_date: str, departments: Optional[List[str]] = None, type_marche: Optional[str] = None) -> str:
+    """Build the ODSQL where clause selecting one publication date
+
+    Raises ValueError for a date that isn't YYYY-MM-DD or a malformed department code.
+    """
+    clauses = [f"dateparution = date'{date.fromisoformat(target_date).isoformat()}'"]
+    if departments:
+        for dep in departments:
+            if not DEPARTMENT_CODE_RE.match(dep):
+                raise ValueError(f"Invalid department code '{dep}'")
+        clauses.append("(" + " OR ".join(f'code_departement = {odsql_string(dep)}' for dep in departments) + ")")
+    if type_marche:
+        clauses.append(f'type_marche = {odsql_string(type_marche)}')
+    return " AND ".join(clauses)
+
+def odsql_string(value: str) -> str:
+    """Quote a value as an ODSQL string literal"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def fetch_records_page(params: dict) -> dict:
+    """Fetch one page from the records endpoint, sharing identical in-flight requests"""
+    return api_flights.do(('records', json.dumps(params, sort_keys=True)), _fetch_records_page, params)
+
+def _fetch_records_page(params: dict) -> dict:
+    return http_client.get(f"{BOAMP_DATASET_URL}/records", params=params).json()
+
+def fetch_records_export(params: dict) -> List[dict]:
+    """Fetch a whole result set from the exports endpoint, which has no offset window"""
+    return api_flights.do(('exports', json.dumps(params, sort_keys=True)), _fetch_records_export, params)
+
+def _fetch_records_export(params: dict) -> List[dict]:
+    return http_client.get(f"{BOAMP_DATASET_URL}/exports/json", params=params, timeout=API_TIMEOUT * 10).json()
 
 # Main function to get BOAMP records
-def get_all_records_for_date(target_date, max_records=5000):
+def get_all_records_for_date(target_date, max_records=0, departments=None, type_marche=None):
     """Get all records for a specific date with all available fields"""
-    url = "https://boamp-datadila.opendatasoft.com/api/explore/v2.1/catalog/datasets/boamp/records"
-    all_records = []
-    offset = 0
-    limit = 100
-    
-    while len(all_records) < max_records:
-        params = {
-            'order_by': 'dateparution DESC',
-            "type_marche": 'Travaux',
-            'limit': limit,
-            'offset': offset,
-        }
+    base_params = {
+        'where': build_records_where(target_date, departments, type_marche),
+        # A stable ordering keeps concurrently fetched pages from overlapping
+        'order_by': 'idweb',
+    }
+    
+    first_page = fetch_records_page({**base_params, 'limit': API_PAGE_SIZE, 'offset': 0})
+    all_records = first_page.get('results', [])
+    total_count = first_page.get('total_count', len(all_records))
+    
+    wanted = min(total_count, max_records) if max_records else total_count
+    if wanted < total_count:
+        print(f"Warning: {total_count} records published on {target_date}, keeping the first {wanted}")
+    
+    if wanted <= len(all_records):
+        return all_records[:wanted]
+    
+    if wanted > API_MAX_WINDOW:
+        return fetch_records_export({**base_params, 'limit': wanted})[:wanted]
+    
+    # Fan out the remaining pages now that the total is known
+    offsets = range(API_PAGE_SIZE, wanted, API_PAGE_SIZE)
+    pages = api_page_executor.map(
+        lambda offset: fetch_records_page({**base_params, 'limit': API_PAGE_SIZE, 'offset': offset}),
+        offsets
+    )
+    for page in pages:
+        all_records.extend(page.get('results', []))
+    
+    return all_records[:wanted]
+
+# Local notice warehouse
+# Notices are synced per publication date into DATA_DIR/notices.sqlite. A
+# background ingester keeps the last BOAMP_INGEST_DAYS dates up to date every
+# BOAMP_INGEST_INTERVAL_MINUTES (0 disables it). /process reads from the
+# warehouse and only calls the API for dates never synced, or for a date still
+# in progress whose last sync is older than NOTICE_REFRESH_AFTER. Each sync
+# fetches the whole date again, since idwebs don't sort in publication order
+# and a late or corrected notice can sort below any idweb already stored.
+INGEST_INTERVAL = float(os.environ.get("BOAMP_INGEST_INTERVAL_MINUTES", "30")) * 60
+INGEST_DAYS = int(os.environ.get("BOAMP_INGEST_DAYS", "7"))
+NOTICE_REFRESH_AFTER = 600
+MAX_DATE_RANGE_DAYS = int(os.environ.get("BOAMP_MAX_DATE_RANGE_DAYS", "31"))
+
+notice_store = NoticeStore(os.path.join(DATA_DIR, "notices.sqlite"))
+ingest_flights = SingleFlight()
 
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """ISO dates from start_date to end_date inclusive (empty if end_date is before start_date)"""
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+def as_list(value) -> list:
+    """Normalize a single-or-multi valued API field to a list"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def record_cpv_codes(record: dict) -> List[str]:
+    """CPV codes of a raw API record, read from the CPV objects of CPV_FIELDS"""
+    codes = set()
+    for field in CPV_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                continue
+        _collect_cpv_codes(value, codes, False)
+    return sorted(codes)
+
+def _collect_cpv_codes(value, codes: set, in_cpv: bool):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _collect_cpv_codes(item, codes, in_cpv or bool(CPV_KEY_RE.search(key)))
+    elif isinstance(value, list):
+        for item in value:
+            _collect_cpv_codes(item, codes, in_cpv)
+    elif in_cpv and isinstance(value, (str, int)):
+        codes.update(CPV_CODE_RE.findall(str(value)))
+
+def needs_sync(target_date: str) -> bool:
+    """Whether a publication date must be (re)synced before being read locally"""
+    state = notice_store.sync_state(target_date)
+    if state is None:
+        return True
+    day_end = (datetime.strptime(target_date, '%Y-%m-%d') + timedelta(days=1)).timestamp()
+    # Notices can still be published on a date that wasn't over at the last sync
+    return state['synced_at'] < day_end and time.time() - state['synced_at'] > NOTICE_REFRESH_AFTER
+
+def sync_notices_for_date(target_date: str) -> int:
+    """Ingest (again) every notice of a date; returns how many were fetched"""
+    records = get_all_records_for_date(target_date, 0)
+    notice_store.upsert(target_date, [
+        (str(record['idweb']), record, [str(code) for code in as_list(record.get('code_departement'))], record_cpv_codes(record))
+        for record in records if record.get('idweb')
+    ])
+    return len(records)
+
+def get_notices(start_date: str, end_date: str, departments: Optional[List[str]] = None,
+                type_marche: Optional[str] = None, keywords: Optional[List[str]] = None):
+    """Notices published between two dates, read from the warehouse after syncing the dates that need it"""
+    for day in date_range(start_date, end_date):
+        if needs_sync(day):
+            CACHE_LOOKUPS.inc(cache='notices', result='miss')
+            ingest_flights.do(day, sync_notices_for_date, day)
+        else:
+            CACHE_LOOKUPS.inc(cache='notices', result='hit')
+    
+    # When only CPV codes are searched, let the CPV index do the first cut
+    cpv_matches = [CPV_KEYWORD_RE.match(keyword.strip()) for keyword in keywords or []]
+    cpv_codes = [match.group(1) for match in cpv_matches] if cpv_matches and all(cpv_matches) else None
+    
+    records = notice_store.query(start_date, end_date, departments, cpv_codes)
+    if type_marche:
+        wanted = type_marche.casefold()
+        records = [record for record in records
+                   if any(str(value).casefold() == wanted for value in as_list(record.get('type_marche')))]
+    return records
+
+async def ingest_recent_notices():
+    """Periodically sync the most recent publication dates into the warehouse"""
+    while True:
+        today = date.today()
+        for offset in range(INGEST_DAYS):
+            day = (today - timedelta(days=offset)).isoformat()
+            try:
+                fetched = await run_background(ingest_flights.do, day, sync_notices_for_date, day)
+                if fetched:
+                    print(f"Ingested {fetched} notices published on {day}")
+            except Exception as e:
+                ERRORS.inc(kind='ingest')
+                print(f"Error ingesting notices published on {day}: {e}")
+        await asyncio.sleep(INGEST_INTERVAL)
+
+@app.on_event("startup")
+async def start_ingester():
+    """Start the notice ingester unless it is disabled"""
+    if INGEST_INTERVAL > 0 and INGEST_DAYS > 0:
+        task = asyncio.create_task(ingest_recent_notices())
+        running_jobs.add(task)
+        task.add_done_callback(running_jobs.discard)
+
+# Publication date formats seen in API records (ISO dates take the fast path)
+NOTICE_DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+def parse_notice_date(value) -> Optional[date]:
+    """Parse a publication date, returning None when it can't be parsed"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        return None
+    with contextlib.suppress(ValueError):
+        return date.fromisoformat(value)
+    for fmt in NOTICE_DATE_FORMATS[1:]:
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            records = data.get('results', [])
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
 
-            if not records:
-                break  # No more records
+def parse_deadline(value) -> Optional[datetime]:
+    """Parse an ISO 8601 response deadline, returning None when missing or invalid"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
 
-            # Filter records for our target date
-            target_records = [record for record in records if record.get('dateparution') == target_date]
+def build_notice_record(record: dict) -> NoticeRecord:
+    """Wrap an API record, parsing once the fields the pipeline stages use"""
+    return NoticeRecord(
+        idweb=str(record.get('idweb') or 'N/A'),
+        dateparution=parse_notice_date(record.get('dateparution')),
+        datelimitereponse=parse_deadline(record.get('datelimitereponse')),
+        objet=record.get('objet') or '',
+        nomacheteur=record.get('nomacheteur') or '',
+        departments=[str(code) for code in as_list(record.get('code_departement'))],
+        cpv_codes=[int(code) for code in record_cpv_codes(record)],
+        source=record,
+        search_text=notice_search_text(record),
+    )
 
-            # If we found target records, add them
-            if target_records:
-                all_records.extend(target_records)
+# Record-level stages
+# Between record creation and the PDF stage the notices are held in a
+# NoticeTable: an Arrow table with dictionary-encoded strings when pyarrow is
+# installed, filtered with boolean masks computed on its columns. The API
+# records stay in the warehouse until the PDF stage reads back the notices
+# that are left. Tables of more than
+# BOAMP_PIPELINE_SPILL_ROWS notices are written to Parquet files in
+# DATA_DIR/spill/<process_id> and processed one row group at a time.
+PIPELINE_SPILL_ROWS = int(os.environ.get("BOAMP_PIPELINE_SPILL_ROWS", str(SPILL_ROWS)))
+SPILL_DIR = os.path.join(DATA_DIR, "spill")
 
-            # Check if we've moved past our target date (since we're sorting DESC)
-            if records and records[-1].get('dateparution', '') < target_date:
-                break
+def build_notice_table(records: List[dict], spill_dir: Optional[str] = None) -> NoticeTable:
+    """Build the table the record-level stages work on from API records"""
+    return NoticeTable.from_notices(
+        (build_notice_record(record) for record in records), notice_store.records, spill_dir, PIPELINE_SPILL_ROWS
+    )
 
-            offset += limit
+def flatten_export_row(row: dict) -> dict:
+    """Serialize nested values (lists, dicts) to JSON strings and empty ones to '' for Excel/CSV/Parquet export"""
+    for column, value in row.items():
+        if isinstance(value, (list, dict)):
+            row[column] = json.dumps(value, ensure_ascii=False)
+        elif value is None:
+            row[column] = ''
+    return row
 
-            if offset > 10000:
-                break
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data: {e}")
-            break
+# Exports
+# A finished job's rows never change, so each export is written once from the
+# job store (streamed, never fully in memory) and then served from
+# DATA_DIR/exports/<process_id>/. The first CSV download is streamed to the
+# client while it is being cached.
+EXPORT_DIR = os.path.join(DATA_DIR, "exports")
+EXPORT_TABLES = {'results': 'row', 'summary': 'summary'}
+export_flights = SingleFlight()
 
-    return all_records
-
-# Function to create cleaned dataframe
-def create_excel_simple(records: List[dict], target_date: str):
-    """Simple and robust Excel creation"""
-    cleaned_records = []
-    for record in records:
-        cleaned_record = {}
-        for key, value in record.items():
-            if isinstance(value, (list, dict)):
-                cleaned_record[key] = json.dumps(value, ensure_ascii=False)
-            elif value is None:
-                cleaned_record[key] = ''
-            else:
-                cleaned_record[key] = value
-        cleaned_records.append(cleaned_record)
+def export_path(process_id: str, table: str, export_format: str, include_text: bool = False) -> str:
+    """Cache location of one export of a job"""
+    suffix = "-text" if include_text else ""
+    return os.path.join(EXPORT_DIR, process_id, f"{table}{suffix}.{export_format}")
+
+def with_pdf_text(row: dict) -> dict:
+    """Add the stored PDF text of a result row as 'pdf_content'"""
+    ref = row.get('pdf_text_ref')
+    row['pdf_content'] = (text_store.get(ref) or "") if ref else ""
+    return row
+
+def export_rows(process_id: str, table: str, include_text: bool = False):
+    """Iterate the flattened rows of a job table ('results' or 'summary'), optionally with PDF texts"""
+    rows = (flatten_export_row(row) for row in job_store.iter_rows(process_id, EXPORT_TABLES[table]))
+    return (with_pdf_text(row) for row in rows) if include_text else rows
+
+def export_columns(process_id: str, table: str, include_text: bool = False) -> dict:
+    """Columns of a job table (the union of its rows' keys) with their value types, read in a first pass"""
+    columns = row_columns(export_rows(process_id, table))
+    if include_text:
+        columns['pdf_content'] = {str}
+    return columns
 
-    df = pd.DataFrame(cleaned_records)
-    return df
+def build_export(process_id: str, table: str, export_format: str, include_text: bool = False) -> str:
+    """Write an export into the cache unless it is already there"""
+    path = export_path(process_id, table, export_format, include_text)
+    if not os.path.exists(path):
+        columns = export_columns(process_id, table, include_text)
+        EXPORT_WRITERS[export_format](export_rows(process_id, table, include_text), path, columns)
+    return path
+
+def stream_csv_export(process_id: str, table: str, include_text: bool, path: str):
+    """Stream a CSV export while caching it (the column pass runs when streaming starts)"""
+    columns = export_columns(process_id, table, include_text)
+    yield from stream_csv(export_rows(process_id, table, include_text), path, columns)
 
 def get_predefined_keywords():
     """Return predefined keywords for filtering"""
@@ -173,239 +675,523 @@ def get_predefined_keywords():
         "45313200", "50740000", "51511000",
     ]
 
-def filter_by_keywords(df: pd.DataFrame, keywords: List[str]):
-    """Filter DataFrame by keywords"""
-    df_str = df.astype(str).apply(lambda x: x.str.lower())
-    all_matches = pd.DataFrame()
+# Keyword search index
+# Only these fields are searched for text keywords; CPV keywords (8 digits) are
+# looked up in the set of CPV codes of the record instead of anywhere in it,
+# which used to match unrelated numbers. The codes are read from the notice
+# objects in CPV_FIELDS whose key matches CPV_KEY_RE: CPV, CPV_OBJ, ... in BOAMP
+# notices, the classification objects (cbc:ItemClassificationCode) in eForms.
+SEARCH_TEXT_FIELDS = ['objet', 'descripteur_libelle', 'donnees']
+CPV_FIELDS = ['donnees']
+CPV_KEY_RE = re.compile(r'cpv|classification', re.IGNORECASE)
+CPV_CODE_RE = re.compile(r'(?<!\d)(\d{8})(?:-\d)?(?!\d)')
+CPV_KEYWORD_RE = re.compile(r'^(\d{8})(?:-\d)?$')
+
+def _build_fold_table() -> dict:
+    """Translation table folding accented Latin letters and typographic quotes"""
+    table = {ord('’'): "'", ord('‘'): "'", ord('œ'): 'oe', ord('æ'): 'ae'}
+    for codepoint in range(0xC0, 0x250):
+        decomposed = unicodedata.normalize('NFKD', chr(codepoint))
+        if len(decomposed) > 1 and decomposed[0].isascii():
+            table[codepoint] = decomposed[0]
+    return table
+
+FOLD_TABLE = _build_fold_table()
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip accents so 'Métallerie' and 'metallerie' compare equal"""
+    return text.lower().translate(FOLD_TABLE)
+
+class KeywordMatcher:
+    """Match many keywords against a folded text (see fold_text) in a single regex scan
 
-    for keyword in keywords:
-        mask = df_str.apply(lambda x: x.str.contains(keyword.lower(), na=False))
-        filtered_df = df[mask.any(axis=1)]
+    The keywords are compiled into one regex shaped like a trie (shared
+    prefixes factored out), so each start position is tried once for all
+    keywords. The regex sits inside a lookahead, so overlapping matches are
+    still found; shorter keywords contained in a longer match are added from
+    a precomputed containment table.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = {}
+        for keyword in keywords:
+            lowered = fold_text(keyword).strip()
+            if lowered and lowered not in self.keywords:
+                self.keywords[lowered] = keyword
         
-        if not filtered_df.empty:
-            filtered_df = filtered_df.copy()
-            filtered_df["keyword"] = keyword
-            all_matches = pd.concat([all_matches, filtered_df], ignore_index=True)
-
-    return all_matches
-
-def remove_duplicates(df: pd.DataFrame, id_column: str, keyword_column: str):
-    """Remove duplicates from DataFrame by combining keywords"""
-    # Group by ID and combine keywords
-    def combine_keywords(group):
-        if len(group) > 1:
-            # Combine keywords from all rows with the same ID
-            combined_keywords = '; '.join(str(keyword) for keyword in group[keyword_column] if pd.notna(keyword) and str(keyword).strip())
-            # Keep the first row but update the keyword column with combined values
-            first_row = group.iloc[0].copy()
-            first_row[keyword_column] = combined_keywords
-            return first_row
-        else:
-            return group.iloc[0]
-    
-    # Apply the combination logic
-    df_clean = df.groupby(id_column).apply(combine_keywords).reset_index(drop=True)
-    return df_clean
+        self.order = {lowered: position for position, lowered in enumerate(self.keywords)}
+        self.contained = {
+            lowered: [other for other in self.keywords if other != lowered and other in lowered]
+            for lowered in self.keywords
+        }
+        self.pattern = re.compile(f'(?=({self._trie_pattern(self.keywords)}))') if self.keywords else None
+
+    @staticmethod
+    def _trie_pattern(words) -> str:
+        """Build a regex matching any of `words`, longest alternative first"""
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = True
+        
+        def build(node) -> str:
+            branches = []
+            final_chars = []
+            for char, child in sorted((char, child) for char, child in node.items() if char != ''):
+                if len(child) == 1 and '' in child:
+                    final_chars.append(re.escape(char))
+                else:
+                    branches.append(re.escape(char) + build(child))
+            if final_chars:
+                branches.append(final_chars[0] if len(final_chars) == 1 else '[' + ''.join(final_chars) + ']')
+            if not branches:
+                return ''
+            pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # A word may end here: make the longer continuation optional (greedy)
+            return f'(?:{pattern})?' if '' in node else pattern
+        
+        return build(trie)
+
+    def match(self, text: str) -> List[str]:
+        """Return the keywords found in an already folded text, in input order"""
+        if self.pattern is None:
+            return []
+        found = {match.group(1) for match in self.pattern.finditer(text)}
+        for lowered in list(found):
+            found.update(self.contained[lowered])
+        return [self.keywords[lowered] for lowered in sorted(found, key=self.order.get)]
+
+def search_text(value) -> str:
+    """Text of a record field for keyword search (list items on separate lines)"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '\n'.join(search_text(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def notice_search_text(record: dict, text_fields: List[str] = SEARCH_TEXT_FIELDS) -> str:
+    """Folded text of a record's searchable fields, as NoticeSearchIndex searches it"""
+    return fold_text('\n'.join(search_text(record.get(field)) for field in text_fields))
+
+class NoticeSearchIndex:
+    """Per-record search index over the records' folded search texts and CPV codes"""
+
+    def __init__(self, texts: List[str], cpv_codes: List[List[int]]):
+        self.texts = texts
+        self.cpv_codes = [frozenset(codes or ()) for codes in cpv_codes]
 
-def filter_by_departments(df, target_departments):
-    """Filter dataframe by target departments"""
+    def search(self, keywords: List[str]) -> List[List[str]]:
+        """Return, for each record, the keywords it matches (in keyword order)"""
+        cpv_keywords = {}
+        text_keywords = []
+        for keyword in keywords:
+            cpv_match = CPV_KEYWORD_RE.match(keyword.strip())
+            if cpv_match:
+                cpv_keywords[keyword] = int(cpv_match.group(1))
+            else:
+                text_keywords.append(keyword)
+        
+        matcher = KeywordMatcher(text_keywords)
+        order = {keyword: position for position, keyword in enumerate(keywords)}
+        results = []
+        for text, codes in zip(self.texts, self.cpv_codes):
+            matches = matcher.match(text) if text else []
+            matches += [keyword for keyword, code in cpv_keywords.items() if code in codes]
+            if cpv_keywords and text_keywords:
+                matches.sort(key=order.get)
+            results.append(matches)
+        return results
+
+def filter_by_keywords(notices: NoticeTable, keywords: List[str]) -> NoticeTable:
+    """Keep the notices matching at least one keyword, listing all matches in 'keyword'"""
+    matched_keywords = []
+    for texts, cpv_codes in notices.iter_columns('search_text', 'cpv_codes'):
+        matched_keywords += NoticeSearchIndex(texts, cpv_codes).search(keywords)
+    return notices.filter(
+        [bool(matches) for matches in matched_keywords],
+        keyword=['; '.join(matches) for matches in matched_keywords if matches],
+    )
+
+def remove_duplicates(notices: NoticeTable) -> NoticeTable:
+    """Remove duplicate notices by idweb, merging their '; '-separated keywords into the first one"""
+    return notices.drop_duplicates('idweb', merge='keyword')
+
+def filter_by_departments(notices: NoticeTable, target_departments) -> NoticeTable:
+    """Keep the notices of the target departments, recording the first one found"""
     if not target_departments:
-        return df
+        return notices
+    return notices.filter_any_in('departments', target_departments, found='department_found')
+
+# PDF fetch/parse pipeline settings
+# Downloads run on their own pool (the HTTP client caps and paces them per
+# host); parsing and analysis run on a separate pool so network I/O and text
+# extraction overlap instead of alternating row by row.
+PDF_DOWNLOAD_WORKERS = int(os.environ.get("BOAMP_PDF_DOWNLOAD_WORKERS", "8"))
+PDF_MAX_PER_HOST = int(os.environ.get("BOAMP_PDF_MAX_PER_HOST", "4"))
+PDF_RATE_PER_SECOND = float(os.environ.get("BOAMP_PDF_RATE_PER_SECOND", "5"))
+PDF_RATE_BURST = int(os.environ.get("BOAMP_PDF_RATE_BURST", "5"))
+PDF_PARSE_WORKERS = int(os.environ.get("BOAMP_PDF_PARSE_WORKERS", str(os.cpu_count() or 2)))
+PDF_DOWNLOAD_TIMEOUT = 30
+
+# Published notices never change, so downloaded PDFs are kept on disk and only
+# revalidated (If-None-Match / If-Modified-Since) once they are older than
+# PDF_CACHE_REVALIDATE_AFTER seconds.
+PDF_CACHE_MAX_BYTES = int(float(os.environ.get("BOAMP_PDF_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+PDF_CACHE_REVALIDATE_AFTER = int(os.environ.get("BOAMP_PDF_CACHE_REVALIDATE_AFTER", str(7 * 24 * 3600)))
+BOAMP_PDF_PATH_RE = re.compile(r'/telechargements/FILES/PDF/\d{4}/\d{2}/([^/]+)\.pdf$', re.IGNORECASE)
+
+pdf_store = PDFStore(os.path.join(DATA_DIR, "pdfs"), PDF_CACHE_MAX_BYTES)
+
+# Extracted text and keyword-independent analysis (visite, links) are cached per
+# notice; bump PDF_ANALYSIS_REVISION whenever extraction or analysis changes.
+# Texts are kept as compressed blobs in DATA_DIR/texts: result rows only carry
+# a pdf_text_ref, and the text is served by GET /text/{ref} or added to
+# exports with ?include_text=true. A ref never changes its text (a new
+# extraction gets a new ref); texts unused for BOAMP_TEXT_TTL_HOURS are deleted
+# by the eviction loop, so keep it above the job TTL.
+# The text backend (pymupdf, pypdf2 or pdfplumber) is chosen per deployment.
+PDF_TEXT_BACKEND = os.environ.get("BOAMP_PDF_TEXT_BACKEND", "pymupdf").lower()
+extract_pdf_pages = get_backend(PDF_TEXT_BACKEND)
+PDF_ANALYSIS_REVISION = "4"
+
+# Lazy mode (BOAMP_PDF_TEXT_MODE=lazy, PyMuPDF only) reads a PDF page by page and
+# stops once the visite clause, the "Documents de marché" link and every keyword
+# of the row have been seen, or after BOAMP_PDF_LAZY_MAX_PAGES pages (0 = no
+# limit). The pages read are analyzed like a full text and stored as the
+# notice's text; a later row whose keywords don't all appear in them rescans
+# the PDF further.
+PDF_TEXT_MODE = os.environ.get("BOAMP_PDF_TEXT_MODE", "full").lower()
+PDF_LAZY_MAX_PAGES = int(os.environ.get("BOAMP_PDF_LAZY_MAX_PAGES", "30"))
+PDF_LAZY = PDF_TEXT_MODE == "lazy"
+if PDF_LAZY and PDF_TEXT_BACKEND != "pymupdf":
+    print(f"Lazy PDF mode needs the pymupdf backend, extracting full texts with {PDF_TEXT_BACKEND}")
+    PDF_LAZY = False
+
+PDF_EXTRACTOR_VERSION = f"{PDF_TEXT_BACKEND}-{PDF_ANALYSIS_REVISION}"
+if PDF_LAZY:
+    PDF_EXTRACTOR_VERSION += f"-lazy{PDF_LAZY_MAX_PAGES}"
+analysis_cache = AnalysisCache(os.path.join(DATA_DIR, "analysis.sqlite"))
+text_store = TextStore(os.path.join(DATA_DIR, "texts"))
+TEXT_TTL_SECONDS = float(os.environ.get("BOAMP_TEXT_TTL_HOURS", "72")) * 3600
+
+# Shared HTTP client
+# Every outgoing request (API pages, PDFs, link extraction) goes through one
+# pooled client: keep-alive connections, a concurrency cap (and for boamp.fr a
+# rate) per host, retries with jittered exponential backoff on connection
+# errors, 429 and 5xx, and HTTP/2 when BOAMP_HTTP2=1 and httpx[http2] is installed.
+HTTP_MAX_PER_HOST = int(os.environ.get("BOAMP_HTTP_MAX_PER_HOST", "4"))
+HTTP_MAX_RETRIES = int(os.environ.get("BOAMP_HTTP_MAX_RETRIES", "4"))
+HTTP2_ENABLED = os.environ.get("BOAMP_HTTP2", "0") == "1"
+
+http_client = HTTPClient(
+    HostPolicy(HTTP_MAX_PER_HOST, timeout=PDF_DOWNLOAD_TIMEOUT),
+    timeout=API_TIMEOUT, max_retries=HTTP_MAX_RETRIES, http2=HTTP2_ENABLED,
+    on_retry=lambda host, reason: HTTP_RETRIES.inc(host=host, reason=reason)
+)
+http_client.configure_host(urlparse(BOAMP_DATASET_URL).netloc, HostPolicy(API_PAGE_WORKERS, timeout=API_TIMEOUT))
+http_client.configure_host(
+    urlparse(BOAMP_PDF_BASE_URL).netloc, HostPolicy(PDF_MAX_PER_HOST, PDF_RATE_PER_SECOND, PDF_RATE_BURST, PDF_DOWNLOAD_TIMEOUT)
+)
+
+pdf_download_executor = ThreadPoolExecutor(max_workers=PDF_DOWNLOAD_WORKERS, thread_name_prefix="boamp-pdf-download")
+pdf_parse_executor = ThreadPoolExecutor(max_workers=PDF_PARSE_WORKERS, thread_name_prefix="boamp-pdf-parse")
+
+def build_pdf_link(dateparution_str, idweb: str) -> str:
+    """Build the BOAMP PDF URL for a notice, raising ValueError if the date can't be parsed"""
+    dateparution = parse_notice_date(dateparution_str)
+    if dateparution is None:
+        raise ValueError("Date parsing failed")
     
-    indices_a_conserver = []
-    departements_trouves = []
+    return f"{BOAMP_PDF_BASE_URL}/telechargements/FILES/PDF/{dateparution.year}/{dateparution.month:02d}/{idweb}.pdf"
+
+def pdf_cache_key(url: str) -> str:
+    """Cache key for a PDF URL: the idweb for BOAMP notices, a URL hash otherwise"""
+    match = BOAMP_PDF_PATH_RE.search(urlparse(url).path)
+    if match:
+        return match.group(1)
+    return "url-" + hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+def download_pdf(link: str) -> bytes:
+    """Return a PDF from the local store, downloading or revalidating it when needed
+
+    Concurrent requests for the same notice share a single download.
+    """
+    key = pdf_cache_key(link)
+    return pdf_flights.do(key, _download_pdf, link, key)
+
+def _download_pdf(link: str, key: str) -> bytes:
+    cached = pdf_store.get(key)
+    if cached and time.time() - cached.fetched_at < PDF_CACHE_REVALIDATE_AFTER:
+        CACHE_LOOKUPS.inc(cache='pdf', result='hit')
+        return cached.content
+    
+    headers = {}
+    if cached and cached.etag:
+        headers['If-None-Match'] = cached.etag
+    if cached and cached.last_modified:
+        headers['If-Modified-Since'] = cached.last_modified
+    
+    with timed_step('pdf_download'):
+        response = http_client.get(link, headers=headers)
+    
+    if cached and response.status_code == 304:
+        CACHE_LOOKUPS.inc(cache='pdf', result='revalidated')
+        pdf_store.touch(key)
+        return cached.content
+    
+    CACHE_LOOKUPS.inc(cache='pdf', result='miss')
+    PDF_DOWNLOAD_BYTES.observe(len(response.content))
+    pdf_store.put(key, response.content, response.headers.get('ETag', ''), response.headers.get('Last-Modified', ''))
+    return response.content
+
+def extract_pdf_analysis(pdf_bytes: bytes, link: str):
+    """Extract the text of a downloaded PDF and the analysis that doesn't depend on keywords
+
+    Returns the analysis dict and the DocumentAnalyzer built over the text, so
+    the lot search can reuse it.
+    """
+    with timed_step('pdf_text_extraction'):
+        page_texts = extract_pdf_pages(pdf_bytes)
+    return analyze_pdf_pages(page_texts, link)
 
-    for index, row in df.iterrows():
-        code_departement = row.get('code_departement', '')
-        departement_trouve = None
+def analyze_pdf_pages(page_texts: List[str], link: str):
+    """The keyword-independent analysis (visite, links) of a PDF's page texts, and its DocumentAnalyzer"""
+    full_text = format_pages(page_texts)
+    analyzer = DocumentAnalyzer(full_text)
+    
+    analysis = {
+        'pdf_content': full_text,
+        'pages_extracted': len(page_texts),
+        'extracted_links': "",
+        'primary_extracted_link': "",
+    }
+    
+    with timed_step('pdf_analysis'):
+        # Check for visite obligatoire
+        analysis['visite_obligatoire'] = analyzer.visite_obligatoire(VISITE_KEYWORDS)
         
-        # Check if code_departement is a valid list
-        if pd.notna(code_departement) and code_departement != "":
-            # If it's a string that looks like a list, convert to list
-            if isinstance(code_departement, str):
-                try:
-                    # Remove brackets and quotes, then split
-                    code_departement = code_departement.strip('[]').replace('"', '').replace("'", "").split(', ')
-                    # Clean elements
-                    code_departement = [dep.strip() for dep in code_departement if dep.strip()]
-                except:
-                    code_departement = []
-            elif not isinstance(code_departement, list):
-                code_departement = []
+        # Extract links from PDF content
+        try:
+            pdf_links = extract_links_from_pdf_content(link, full_text)
+            if pdf_links:
+                # Store all links (comma-separated) and the primary link (first one)
+                analysis['extracted_links'] = ', '.join(pdf_links)
+                analysis['primary_extracted_link'] = pdf_links[0]
+        except Exception as e:
+            ERRORS.inc(kind='link_extraction')
+            print(f"Error extracting links from PDF {link}: {e}")
+    
+    return analysis, analyzer
+
+def split_row_keywords(keywords_from_row) -> List[str]:
+    """The keywords of a row (a string or a single value)"""
+    if isinstance(keywords_from_row, str):
+        # Split by semicolon if it's a combined string from deduplication
+        return [k.strip() for k in keywords_from_row.split(';') if k.strip()]
+    return [str(keywords_from_row)]
+
+def format_lot_numbers(lot_numbers) -> str:
+    """Format lot numbers as 'lot-1, lot-2'"""
+    return ', '.join(sorted({f"lot-{lot_number}" for lot_number in lot_numbers}))
+
+def find_lot_numbers(analyzer: 'DocumentAnalyzer', keywords_from_row) -> str:
+    """Return the lots preceding the row's keywords, formatted as 'lot-1, lot-2'"""
+    lot_results = analyzer.find_lots(split_row_keywords(keywords_from_row))
+    return format_lot_numbers(result['lot_number'] for result in lot_results)
+
+def scan_pdf_lazily(pdf_bytes: bytes, link: str, keywords_from_row, min_pages: int = 0):
+    """Read a PDF page by page until its visite clause, market documents link and keywords are seen
+
+    Each page is checked together with the end of the pages before it, so
+    mentions split across a page break are still seen. Reading stops once all
+    three are found (and at least min_pages pages are read), or at
+    PDF_LAZY_MAX_PAGES. The pages read are then analyzed as in full mode:
+    returns the analysis, with their text as pdf_content, and its DocumentAnalyzer.
+    """
+    keywords = split_row_keywords(keywords_from_row)
+    overlap = max(LOT_LOOKBEHIND, VISITE_LOOKBEHIND)
+    visite_found = links_found = False
+    unseen = set(keywords)
+    page_texts = []
+    
+    with timed_step('pdf_text_extraction'), LazyDocument(pdf_bytes) as document:
+        page_count = len(document)
+        pages_to_read = min(page_count, PDF_LAZY_MAX_PAGES) if PDF_LAZY_MAX_PAGES else page_count
+        tail = ""
+        for page_number in range(pages_to_read):
+            page_texts.append(document.page_text(page_number))
+            window = tail + f"Page {page_number + 1}:\n{page_texts[-1]}\n\n"
             
-            # Check if at least one department from the list is in target departments
-            for dep in code_departement:
-                if dep in target_departments:
-                    indices_a_conserver.append(index)
-                    departement_trouve = dep  # Store found department
-                    break  # Exit loop as soon as we find a match
-        
-        # Add found department (or None if none)
-        departements_trouves.append(departement_trouve)
-
-    # Create new DataFrame with only kept rows
-    if indices_a_conserver:
-        df_filtre = df.loc[indices_a_conserver].reset_index(drop=True)
-        # Add column with found department code
-        df_filtre['code_departement_trouve'] = [departements_trouves[i] for i in indices_a_conserver]
+            if not visite_found:
+                visite_found = DocumentAnalyzer(window).visite_obligatoire(VISITE_KEYWORDS) == "yes"
+            if not links_found:
+                links_found = bool(extract_documents_de_marche_urls(preprocess_pdf_text_for_urls(window)))
+            unseen = {keyword for keyword in unseen if not keyword_pattern(keyword).search(window)}
+            
+            if visite_found and links_found and not unseen and len(page_texts) >= min_pages:
+                break
+            tail = window[-overlap:]
+    
+    analysis, analyzer = analyze_pdf_pages(page_texts, link)
+    # Without a whole scan, a later row may need more pages than these
+    analysis['scan_complete'] = len(page_texts) == pages_to_read
+    if len(page_texts) < page_count:
+        analysis['pdf_content'] += f"[{len(page_texts)} of {page_count} pages analyzed]\n"
+    return analysis, analyzer
+
+def analyze_pdf(pdf_bytes: bytes, link: str, keywords_from_row, cached_analysis: Optional[dict] = None) -> dict:
+    """Analyze a downloaded PDF, caching the keyword-independent part for later jobs
+
+    In lazy mode `cached_analysis` is an earlier scan that stopped before this
+    row's keywords; the PDF is read again, at least as far. The text goes to
+    the text store; the result only references it.
+    """
+    key = pdf_cache_key(link)
+    if PDF_LAZY:
+        min_pages = cached_analysis['pages_extracted'] if cached_analysis else 0
+        analysis, analyzer = scan_pdf_lazily(pdf_bytes, link, keywords_from_row, min_pages)
     else:
-        df_filtre = pd.DataFrame(columns=df.columns)
-    
-    return df_filtre
-
-def extract_pdf_content(df: pd.DataFrame, process_id: str):
-    """Extract PDF content and analyze for lots and visite information"""
-    if df.empty:
-        return df
-    
-    df_with_pdf = df.copy()
-    df_with_pdf['generated_link'] = ""
-    df_with_pdf['pdf_content'] = ""
-    df_with_pdf['pdf_status'] = ""
-    df_with_pdf['pages_extracted'] = 0
-    df_with_pdf['lot_numbers'] = ""
-    df_with_pdf['visite_obligatoire'] = ""
-    df_with_pdf['keywords_used'] = ""
-    # Add these to the list of new columns (around line 410)
-    df_with_pdf['extracted_links'] = ""
-    df_with_pdf['primary_extracted_link'] = ""
-    
-    total_records = len(df_with_pdf)
-    successful = 0
-    errors = 0
-    
-    processing_state[process_id]['current_step'] = 'pdf_processing'
-    processing_state[process_id]['total_records'] = total_records
-    processing_state[process_id]['processed_records'] = 0
-    
-    for index, row in df_with_pdf.iterrows():
-        dateparution_str = row.get('dateparution')
-        idweb = row.get('idweb', 'N/A')
-        keywords_from_row = row.get('keyword', '')
-        
-        # Update progress
-        processing_state[process_id]['processed_records'] = index + 1
-        processing_state[process_id]['current_record'] = idweb
+        analysis, analyzer = extract_pdf_analysis(pdf_bytes, link)
+    analysis['pdf_text_ref'] = text_store.put(key, analysis.pop('pdf_content'))
+    analysis_cache.put(key, PDF_EXTRACTOR_VERSION, analysis)
+    return analyze_cached_pdf(analysis, keywords_from_row, analyzer)
+
+def analyze_cached_pdf(analysis: dict, keywords_from_row, analyzer: 'DocumentAnalyzer' = None) -> Optional[dict]:
+    """Complete a cached analysis with the keyword-dependent lot search over the stored text
+
+    Returns None for a lazy scan that stopped before one of the row's keywords
+    was seen, so the PDF gets scanned further.
+    """
+    analyzer = analyzer or DocumentAnalyzer(text_store.get(analysis['pdf_text_ref']) or "")
+    keywords = split_row_keywords(keywords_from_row)
+    if not analysis.get('scan_complete', True) and not all(analyzer.keyword_positions(keyword) for keyword in keywords):
+        return None
+    with timed_step('lot_search'):
+        lot_numbers = find_lot_numbers(analyzer, keywords_from_row)
+    return {
+        **{name: value for name, value in analysis.items() if name != 'scan_complete'},
+        'lot_numbers': lot_numbers,
+        'pdf_status': "Success",
+    }
+
+def iter_pdf_results(notices: List[NoticeRecord], timings: Optional[Timings] = None):
+    """Yield (notice, updates) for each notice as soon as its PDF is processed
+
+    `updates` maps NoticeRecord fields to their values for that notice,
+    including the pdf_status of notices that failed or were skipped. Step
+    durations are added to `timings` when given.
+    """
+    # Queue every download; each finished download is handed to the parse pool
+    pending = {}
+    for notice in notices:
+        idweb = notice.idweb
         
         if idweb == 'N/A':
-            df_with_pdf.at[index, 'pdf_status'] = "Skipped - No ID"
-            errors += 1
+            ERRORS.inc(kind='missing_id')
+            yield notice, {'pdf_status': "Skipped - No ID"}
             continue
-            
-        try:
-            # Parse date
-            if isinstance(dateparution_str, str):
-                date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']
-                dateparution = None
-                for fmt in date_formats:
-                    try:
-                        dateparution = datetime.strptime(dateparution_str, fmt)
-                        break
-                    except ValueError:
-                        continue
-                if dateparution is None:
-                    df_with_pdf.at[index, 'pdf_status'] = "Error - Date parsing failed"
-                    errors += 1
-                    continue
-            else:
-                dateparution = dateparution_str
-            
-            # Generate link
-            link = f"https://www.boamp.fr/telechargements/FILES/PDF/{dateparution.year}/{dateparution.month:02d}/{idweb}.pdf"
-            
-            # Add link to DataFrame
-            df_with_pdf.at[index, 'generated_link'] = link
-            
-            # Store keywords used for this row
-            df_with_pdf.at[index, 'keywords_used'] = str(keywords_from_row)
-            
-            # Download and extract PDF content
+        
+        if notice.dateparution is None:
+            ERRORS.inc(kind='date_parse')
+            yield notice, {'pdf_status': "Error - Date parsing failed"}
+            continue
+        
+        link = build_pdf_link(notice.dateparution, idweb)
+        keywords_from_row = notice.keyword
+        row_info = {'generated_link': link, 'keywords_used': str(keywords_from_row)}
+        
+        # Notices analyzed by an earlier job skip download and parsing entirely
+        # (unless a lazy scan stopped before this row's keywords, see below)
+        key = pdf_cache_key(link)
+        cached_analysis = analysis_cache.get(key, PDF_EXTRACTOR_VERSION)
+        if cached_analysis is not None and not text_store.touch(cached_analysis['pdf_text_ref']):
+            cached_analysis = None
+        CACHE_LOOKUPS.inc(cache='analysis', result='miss' if cached_analysis is None else 'hit')
+        if cached_analysis is not None:
+            parse_future = pdf_parse_executor.submit(
+                with_timings, timings, analyze_cached_pdf, cached_analysis, keywords_from_row
+            )
+            pending[parse_future] = (notice, link, keywords_from_row, row_info, 'cached', cached_analysis)
+        else:
+            download_future = pdf_download_executor.submit(with_timings, timings, download_pdf, link)
+            pending[download_future] = (notice, link, keywords_from_row, row_info, 'download', cached_analysis)
+    
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            notice, link, keywords_from_row, row_info, stage, cached_analysis = pending.pop(future)
             try:
-                # Download the PDF
-                response = requests.get(link, timeout=30)
-                response.raise_for_status()
-                
-                # Save to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                    temp_file.write(response.content)
-                    temp_path = temp_file.name
-                
-                # Extract text using PyPDF2
-                with open(temp_path, 'rb') as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    
-                    # Extract text from each page
-                    full_text = ""
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        page_text = page.extract_text()
-                        full_text += f"Page {page_num + 1}:\n{page_text}\n\n"
-                    
-                    # Add PDF content to DataFrame
-                    df_with_pdf.at[index, 'pdf_content'] = full_text
-                    df_with_pdf.at[index, 'pages_extracted'] = len(pdf_reader.pages)
-                    df_with_pdf.at[index, 'pdf_status'] = "Success"
-                    
-                    
-                    # Extract keywords from the row (could be string or list)
-                    if isinstance(keywords_from_row, str):
-                        # Split by semicolon if it's a combined string from deduplication
-                        search_keywords = [k.strip() for k in keywords_from_row.split(';') if k.strip()]
-                    else:
-                        search_keywords = [str(keywords_from_row)]
-                    
-                    # Search for lot numbers
-                    lot_results = search_keywords_and_find_lot(full_text, search_keywords)
-                    if lot_results:
-                        unique_lots = set()
-                        for result in lot_results:
-                            unique_lots.add(f"lot-{result['lot_number']}")
-                        df_with_pdf.at[index, 'lot_numbers'] = ', '.join(sorted(unique_lots))
-                    
-                    # Check for visite obligatoire
-                    visite_keywords = ["obligatoires", "obligatoire"]
-                    visite_result = check_visite_obligatoire(full_text, visite_keywords)
-                    df_with_pdf.at[index, 'visite_obligatoire'] = visite_result
-                    
-                    successful += 1
-                    # Extract links from PDF content
-                    try:
-                        pdf_links = extract_links_from_pdf_content(link, full_text)
-                        if pdf_links:
-                            # Store all links (comma-separated)
-                            df_with_pdf.at[index, 'extracted_links'] = ', '.join(pdf_links)
-                            # Store primary link (first one)
-                            df_with_pdf.at[index, 'primary_extracted_link'] = pdf_links[0] if pdf_links else ''
-                        else:
-                            df_with_pdf.at[index, 'extracted_links'] = ''
-                            df_with_pdf.at[index, 'primary_extracted_link'] = ''
-                    except Exception as e:
-                        print(f"Error extracting links from PDF {link}: {e}")
-                        df_with_pdf.at[index, 'extracted_links'] = ''
-                        df_with_pdf.at[index, 'primary_extracted_link'] = ''
+                if stage == 'download':
+                    parse_future = pdf_parse_executor.submit(
+                        with_timings, timings, analyze_pdf, future.result(), link, keywords_from_row, cached_analysis
+                    )
+                    pending[parse_future] = (notice, link, keywords_from_row, row_info, 'parse', None)
+                    continue
                 
-                # Clean up
-                os.unlink(temp_path)
+                result = future.result()
+                if result is None:
+                    # The cached lazy scan doesn't cover this row's keywords
+                    download_future = pdf_download_executor.submit(with_timings, timings, download_pdf, link)
+                    pending[download_future] = (notice, link, keywords_from_row, row_info, 'download', cached_analysis)
+                    continue
                 
+                yield notice, {**row_info, **result}
             except Exception as e:
-                error_msg = f"Error processing PDF: {str(e)}"
-                df_with_pdf.at[index, 'pdf_content'] = error_msg
-                df_with_pdf.at[index, 'pdf_status'] = f"Error: {str(e)}"
-                errors += 1
-            
-            # Add a small delay to be respectful to the server
-            time.sleep(0.5)
-            
-        except Exception as e:
-            error_msg = f"Error processing row: {str(e)}"
-            df_with_pdf.at[index, 'pdf_content'] = error_msg
-            df_with_pdf.at[index, 'pdf_status'] = f"Error: {str(e)}"
-            errors += 1
-            continue
-    
-    processing_state[process_id]['status'] = 'completed'
-    processing_state[process_id]['result'] = df_with_pdf.to_dict('records')
+                ERRORS.inc(kind='pdf_download' if stage == 'download' else 'pdf_processing')
+                yield notice, {**row_info, 'pdf_status': f"Error: {str(e)}"}
+
+def build_summary_row(notice: NoticeRecord) -> dict:
+    """Build one summary table row (as shown in the UI) from a processed notice"""
+    return {
+        "Keywords": notice.keyword,
+        'Acheteur': notice.nomacheteur,
+        'Objet': notice.objet,
+        'Lots': notice.lot_numbers,
+        'Visite Obligatoire': notice.visite_obligatoire,
+        'Département': notice.department_found or notice.departments,
+        'Date Limite': notice.source.get('datelimitereponse') or '',
+        'PDF Link': notice.generated_link,
+        'Extracted Link': notice.primary_extracted_link,
+    }
+
+def extract_pdf_content(table: NoticeTable, process_id: str, timings: Optional[Timings] = None) -> List[NoticeRecord]:
+    """Extract PDF content and analyze for lots and visite information
+
+    Each notice is appended to the job's results as soon as it is done, so the
+    UI can show rows live and partial results survive a later failure.
+    Returns the processed notices.
+    """
+    total_records = len(table)
+    if not total_records:
+        return []
+    processed = 0
+    
+    # Skip the notices a previous run of this job already stored
+    done = job_store.done_idwebs(process_id)
+    if done:
+        table = table.exclude('idweb', done)
+        processed = total_records - len(table)
+        print(f"Resuming {process_id}: {processed} records already processed")
+    
+    update_progress(process_id, current_step='pdf_processing', total_records=total_records, processed_records=processed)
+    
+    notices = table.to_notices()
+    for notice, updates in iter_pdf_results(notices, timings):
+        notice.update(**updates)
+        summary_row = build_summary_row(notice)
+        failed = notice.pdf_status.startswith("Error")
+        job_store.append_row(process_id, notice.idweb, notice.as_row(), summary_row, failed)
+        
+        # Update progress
+        processed += 1
+        publish_event(process_id, 'row', {'idweb': notice.idweb, 'pdf_status': notice.pdf_status, 'summary': summary_row})
+        update_progress(process_id, processed_records=processed, current_record=notice.idweb)
     
-    return df_with_pdf
+    return notices
 
 def extract_links_from_pdf_content(pdf_url: str, pdf_content: str = None) -> List[str]:
     """
@@ -417,17 +1203,10 @@ def extract_links_from_pdf_content(pdf_url: str, pdf_content: str = None) -> Lis
         if pdf_content:
             text = pdf_content
         else:
-            # Download and extract PDF text
-            response = requests.get(pdf_url, timeout=30)
-            response.raise_for_status()
+            # Fetch the PDF (from the local store when possible) and extract its text
+            pdf_bytes = download_pdf(pdf_url)
             
-            # Use PyMuPDF for better text extraction
-            doc = fitz.open(stream=response.content, filetype="pdf")
-            text = ""
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                text += page.get_text("text") + "\n"
-            doc.close()
+            text = "".join(f"{page_text}\n" for page_text in extract_pdf_pages(pdf_bytes))
         
         # Preprocess text to handle line breaks in URLs
         text = preprocess_pdf_text_for_urls(text)
@@ -779,69 +1558,134 @@ def filter_relevant_urls(urls: List[str]) -> List[str]:
     
     return relevant
 
+# Lot and visite detection
+# Lot markers and "visite" mentions are located once per document, pattern by
+# pattern; each keyword occurrence then looks up the markers in the window
+# before it by binary search. Only the ends of a window are matched again, where
+# a pattern run over the window alone would split text differently from the
+# whole-document pass.
+LOT_LOOKBEHIND = 1000
+VISITE_LOOKBEHIND = 500
+LOT_PATTERNS = [
+    re.compile(r'(lot|LOT)\s*[:\-\s]*\s*(\d+[-\w]*)', re.IGNORECASE),  # lot: 123, LOT-456, lot 789
+    re.compile(r'(Lot\s*\d+)', re.IGNORECASE),  # Lot 123
+    re.compile(r'(lot\s*\d+)', re.IGNORECASE),  # lot 123
+    re.compile(r'\b(\d+)\s*-\s*Lot', re.IGNORECASE),  # 123 - Lot
+    re.compile(r'\b(LOT\s*[A-Z]*\d+)', re.IGNORECASE),  # LOT A123, LOT 456
+]
+LOT_PREFIX_RE = re.compile(r'^(lot|LOT)\s*', re.IGNORECASE)
+VISITE_PATTERN = re.compile(r'visite', re.IGNORECASE)  # also covers "visites"
+VISITE_KEYWORDS = ["obligatoires", "obligatoire"]
+
+def lot_number(pattern, match) -> str:
+    """The lot number of a LOT_PATTERNS match (its last group), without the 'lot' prefix"""
+    return LOT_PREFIX_RE.sub('', match.group(pattern.groups)).strip(' :-\t')
+
+@functools.lru_cache(maxsize=256)
+def keyword_pattern(keyword: str):
+    """Case-insensitive pattern matching a keyword literally"""
+    return re.compile(re.escape(keyword), re.IGNORECASE)
+
+class DocumentAnalyzer:
+    """Positions of lot markers and 'visite' mentions in a PDF text, found in one pass each"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._keyword_positions = {}
+        self._lot_markers = None
+        self._visite_spans = None
+
+    @property
+    def lot_markers(self):
+        """Per pattern of LOT_PATTERNS, the sorted starts, ends and lot numbers of its matches"""
+        if self._lot_markers is None:
+            self._lot_markers = []
+            for pattern in LOT_PATTERNS:
+                matches = list(pattern.finditer(self.text))
+                self._lot_markers.append((
+                    [match.start() for match in matches],
+                    [match.end() for match in matches],
+                    [lot_number(pattern, match) for match in matches],
+                ))
+        return self._lot_markers
+
+    @property
+    def visite_spans(self):
+        """Sorted starts and ends of every 'visite' mention"""
+        if self._visite_spans is None:
+            spans = [match.span() for match in VISITE_PATTERN.finditer(self.text)]
+            self._visite_spans = ([span[0] for span in spans], [span[1] for span in spans])
+        return self._visite_spans
+
+    def keyword_positions(self, keyword: str):
+        """Start offsets of every case-insensitive occurrence of a keyword"""
+        positions = self._keyword_positions.get(keyword)
+        if positions is None:
+            positions = [match.start() for match in keyword_pattern(keyword).finditer(self.text)]
+            self._keyword_positions[keyword] = positions
+        return positions
+
+    def lots_before(self, position: int, window: int = LOT_LOOKBEHIND) -> List[str]:
+        """Lot numbers found in the `window` characters before `position`, pattern by pattern"""
+        start = max(0, position - window)
+        lots = []
+        for pattern, (starts, ends, numbers) in zip(LOT_PATTERNS, self.lot_markers):
+            lots += self._window_lots(pattern, starts, ends, numbers, start, position)
+        return list(dict.fromkeys(lot for lot in lots if lot))
+
+    def _window_lots(self, pattern, starts, ends, numbers, start: int, position: int) -> List[str]:
+        """Lot numbers of one pattern matched over text[start:position], as if over that window alone"""
+        lots = []
+        # A window starting inside a match sees only its tail: match from the
+        # window start until the scan leaves the whole-document matches
+        index = bisect.bisect_right(starts, start) - 1
+        while index >= 0 and starts[index] < start < ends[index]:
+            match = pattern.search(self.text, start, position)
+            if match is None:
+                return lots
+            lots.append(lot_number(pattern, match))
+            start = match.end()
+            index = bisect.bisect_right(starts, start) - 1
+        # From a gap between matches on, the window sees the same matches, but
+        # the one running past `position` is cut short there
+        for index in range(bisect.bisect_left(starts, start), len(starts)):
+            if starts[index] >= position:
+                break
+            if ends[index] <= position:
+                lots.append(numbers[index])
+                continue
+            lots += [lot_number(pattern, match) for match in pattern.finditer(self.text, starts[index], position)]
+            break
+        return lots
+
+    def has_visite_before(self, position: int, window: int = VISITE_LOOKBEHIND) -> bool:
+        """Whether a 'visite' mention lies entirely within `window` characters before `position`"""
+        starts, ends = self.visite_spans
+        index = bisect.bisect_left(starts, position - window)
+        return index < len(starts) and ends[index] <= position
+
+    def find_lots(self, keywords: List[str]) -> List[dict]:
+        """Every lot number appearing before each keyword occurrence"""
+        results = []
+        for keyword in keywords:
+            for position in self.keyword_positions(keyword):
+                for lot_number in self.lots_before(position):
+                    results.append({'keyword': keyword, 'lot_number': lot_number})
+        return results
+
+    def visite_obligatoire(self, keywords: List[str] = VISITE_KEYWORDS) -> str:
+        """'yes' if 'visite' appears shortly before any of the keywords, else 'no'"""
+        for keyword in keywords:
+            if any(self.has_visite_before(position) for position in self.keyword_positions(keyword)):
+                return "yes"
+        return "no"
+
 def search_keywords_and_find_lot(text: str, keywords: List[str]):
     """
     Search for keywords in PDF text and find ALL lot numbers that appear before them
     """
     try:
-        results = []
-        
-        # Search for each keyword
-        for keyword in keywords:
-            # Find all occurrences of the keyword
-            keyword_matches = list(re.finditer(re.escape(keyword), text, re.IGNORECASE))
-            
-            for match in keyword_matches:
-                keyword_position = match.start()
-                
-                # Extract more text before the keyword (look back up to 500 characters)
-                text_before = text[max(0, keyword_position - 1000):keyword_position]
-                
-                # Improved lot pattern to catch more formats
-                lot_patterns = [
-                    r'(lot|LOT)\s*[:\-\s]*\s*(\d+[-\w]*)',  # lot: 123, LOT-456, lot 789
-                    r'(Lot\s*\d+)',  # Lot 123
-                    r'(lot\s*\d+)',  # lot 123
-                    r'\b(\d+)\s*-\s*Lot',  # 123 - Lot
-                    r'\b(LOT\s*[A-Z]*\d+)',  # LOT A123, LOT 456
-                ]
-                
-                all_lot_matches = []
-                
-                for pattern in lot_patterns:
-                    matches = re.findall(pattern, text_before, re.IGNORECASE)
-                    for match_tuple in matches:
-                        if isinstance(match_tuple, tuple):
-                            # For patterns that capture groups
-                            lot_number = match_tuple[1] if len(match_tuple) > 1 else match_tuple[0]
-                        else:
-                            # For patterns that capture directly
-                            lot_number = match_tuple
-                        
-                        # Clean up the lot number
-                        lot_number = re.sub(r'^(lot|LOT)\s*', '', lot_number, flags=re.IGNORECASE)
-                        lot_number = lot_number.strip(' :-\t')
-                        
-                        if lot_number and lot_number not in [lm[0] for lm in all_lot_matches]:
-                            all_lot_matches.append((lot_number, pattern))
-                
-                # Remove duplicates while preserving order
-                unique_lots = []
-                seen = set()
-                for lot_num, pattern in all_lot_matches:
-                    if lot_num not in seen:
-                        seen.add(lot_num)
-                        unique_lots.append(lot_num)
-                
-                if unique_lots:
-                    for lot_number in unique_lots:
-                        results.append({
-                            'keyword': keyword,
-                            'lot_number': lot_number
-                        })
-        
-        return results
-            
+        return DocumentAnalyzer(text).find_lots(keywords)
     except Exception as e:
         return []
 
@@ -850,41 +1694,19 @@ def check_visite_obligatoire(text: str, keywords: List[str]):
     Search for keywords in PDF text and check if 'visite' appears before them
     """
     try:
-        # Search for each keyword
-        for keyword in keywords:
-            # Find all occurrences of the keyword
-            keyword_matches = list(re.finditer(re.escape(keyword), text, re.IGNORECASE))
-            
-            for match in keyword_matches:
-                keyword_position = match.start()
-                
-                # Extract text before the keyword (look back up to 500 characters)
-                text_before = text[max(0, keyword_position - 500):keyword_position]
-                
-                # Check if "visite" appears before the keyword
-                visite_patterns = [r"visites", r"visite"]
-                
-                for pattern in visite_patterns:
-                    if re.search(pattern, text_before, re.IGNORECASE):
-                        return "yes"
-        
-        return "no"
-            
+        return DocumentAnalyzer(text).visite_obligatoire(keywords)
     except Exception as e:
         return "no"
+
 def debug_pdf_extraction(pdf_url: str):
     """Debug function to see what URLs are being extracted"""
     print(f"\n=== DEBUG for {pdf_url} ===")
     
     # Download PDF
-    response = requests.get(pdf_url, timeout=30)
+    pdf_bytes = download_pdf(pdf_url)
     
     # Extract text
-    doc = fitz.open(stream=response.content, filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text() + "\n"
-    doc.close()
+    text = "".join(f"{page_text}\n" for page_text in extract_pdf_pages(pdf_bytes))
     
     print(f"PDF Text Sample (first 2000 chars):\n{text[:2000]}\n")
     
@@ -922,7 +1744,8 @@ async def process_data(
     target_date: str = Form(...),
     selected_keywords: List[str] = Form(...),
     custom_keywords: str = Form(""),
-    selected_departments: str = Form("")  # New parameter for departments from map
+    selected_departments: str = Form(""),  # New parameter for departments from map
+    end_date: str = Form("")  # Optional last publication date of a range
 ):
     """Start the data processing"""
     process_id = f"process_{int(time.time())}_{uuid.uuid4().hex[:8]}"
@@ -945,22 +1768,36 @@ async def process_data(
     if not target_departments_list:
         raise HTTPException(status_code=400, detail="Please select at least one department")
     
-    # Initialize processing state
-    processing_state[process_id] = {
-        'status': 'starting',
-        'current_step': 'initializing',
-        'total_records': 0,
-        'processed_records': 0,
-        'current_record': '',
-        'result': None,
-        'keywords': all_keywords,
-        'target_date': target_date,
-        'departments': target_departments_list,
-        'summary_table': []
-    }
+    # Publication date range (a single day unless an end date is given)
+    end_date = end_date or target_date
+    try:
+        days = date_range(target_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must use the YYYY-MM-DD format")
+    
+    if not days:
+        raise HTTPException(status_code=400, detail="The end date must not be before the start date")
+    
+    if len(days) > MAX_DATE_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date ranges are limited to {MAX_DATE_RANGE_DAYS} days")
+    
+    # Attach to an identical job that is already running instead of redoing its work
+    running_id = await run_store(
+        job_store.attach_or_create, process_id,
+        {'keywords': all_keywords, 'target_date': target_date, 'end_date': end_date, 'departments': target_departments_list},
+        build_job_key(target_date, end_date, all_keywords, target_departments_list),
+        time.time() - JOB_STALE_SECONDS,
+        status='queued', current_step='queued'
+    )
+    if running_id != process_id:
+        return JSONResponse({
+            "process_id": running_id,
+            "status": "attached",
+            "message": f"Identical processing already running for {len(target_departments_list)} departments"
+        })
     
-    # Run processing in background
-    asyncio.create_task(run_processing(process_id, target_date, all_keywords, target_departments_list))
+    await run_store(publish_progress, process_id)
+    start_job(process_id, target_date, end_date, all_keywords, target_departments_list)
     
     return JSONResponse({
         "process_id": process_id, 
@@ -968,147 +1805,245 @@ async def process_data(
         "message": f"Processing started for {len(target_departments_list)} departments"
     })
 
-async def run_processing(process_id: str, target_date: str, all_keywords: List[str], target_departments_list: List[str]):
-    """Run the full processing in background"""
+@app.post("/resume/{process_id}")
+async def resume_processing(process_id: str):
+    """Resume an interrupted or failed job, skipping the records it already processed"""
+    job = await get_job(process_id)
+    if job['status'] not in RESUMABLE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Process is {job['status']}, only interrupted or failed jobs can be resumed")
+    
+    if not await run_store(job_store.claim, process_id, time.time() - JOB_STALE_SECONDS):
+        raise HTTPException(status_code=409, detail="Process is already being resumed")
+    
+    done = await run_store(job_store.row_count, process_id)
+    await run_store(publish_progress, process_id)
+    start_job(process_id, job['target_date'], job.get('end_date', job['target_date']), job['keywords'], job['departments'])
+    
+    return JSONResponse({
+        "process_id": process_id,
+        "status": "resumed",
+        "message": f"Processing resumed, {done} records already processed"
+    })
+
+def start_job(process_id: str, target_date: str, end_date: str, all_keywords: List[str], target_departments_list: List[str]):
+    """Run a job in background; keep a reference so the task is not garbage collected"""
+    task = asyncio.create_task(run_processing(process_id, target_date, end_date, all_keywords, target_departments_list))
+    running_jobs.add(task)
+    task.add_done_callback(running_jobs.discard)
+
+async def job_heartbeat(process_id: str):
+    """Refresh a job's timestamp so other workers don't consider it interrupted"""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+        try:
+            await run_store(job_store.update, process_id)
+        except Exception as e:
+            print(f"Error updating heartbeat of {process_id}: {e}")
+
+async def run_processing(process_id: str, target_date: str, end_date: str, all_keywords: List[str], target_departments_list: List[str]):
+    """Run the full processing in background, one job slot at a time"""
+    heartbeat = asyncio.create_task(job_heartbeat(process_id))
+    # A resumed job keeps adding to the timings of its earlier runs
+    timings = Timings((await run_store(job_store.get, process_id))['timings'])
+    queued_at = time.perf_counter()
     try:
-        MAX_RECORDS = 10000
-        
-        # Step 1: Extract data
-        processing_state[process_id]['current_step'] = 'data_extraction'
-        processing_state[process_id]['status'] = 'processing'
+        async with job_slots:
+            timings.add('queued', time.perf_counter() - queued_at)
+            await _run_pipeline(process_id, target_date, end_date, all_keywords, target_departments_list, timings)
+    finally:
+        heartbeat.cancel()
+        await run_store(job_store.set_timings, process_id, timings.as_dict())
+        JOBS.inc(status=(await run_store(job_store.get, process_id))['status'])
+
+async def _run_pipeline(process_id: str, target_date: str, end_date: str, all_keywords: List[str],
+                        target_departments_list: List[str], timings: Timings):
+    """Run each pipeline stage on the worker pool so the event loop stays responsive"""
+    spill_dir = os.path.join(SPILL_DIR, process_id)
+    try:
+        # Step 1: Extract data (local warehouse, synced from the API when needed)
+        await run_store(update_progress, process_id, current_step='data_extraction', status='processing')
         
-        all_records = get_all_records_for_date(target_date, MAX_RECORDS)
+        all_records = await run_timed_stage(
+            timings, 'data_extraction', get_notices, target_date, end_date, departments=target_departments_list,
+            type_marche=TYPE_MARCHE or None, keywords=all_keywords
+        )
         
         if not all_records:
-            processing_state[process_id]['status'] = 'completed'
-            processing_state[process_id]['message'] = f"No records found for date {target_date}"
+            period = target_date if end_date == target_date else f"{target_date} to {end_date}"
+            await run_store(update_progress, process_id, status='completed', message=f"No records found for date {period}")
             return
         
-        processing_state[process_id]['total_records'] = len(all_records)
+        await run_store(update_progress, process_id, total_records=len(all_records))
         
-        # Create DataFrame
-        df = create_excel_simple(all_records, target_date)
+        # Parse the records the stages work on; from here on the table holds
+        # everything they need, and each stage's output replaces its input
+        notices = await run_timed_stage(timings, 'record_creation', build_notice_table, all_records, spill_dir)
+        all_records = None
 
         # Step 2: Filter by keywords
-        processing_state[process_id]['current_step'] = 'keyword_filtering'
-        filtered_df = filter_by_keywords(df, all_keywords)
+        await run_store(update_progress, process_id, current_step='keyword_filtering')
+        notices = await run_timed_stage(timings, 'keyword_filtering', filter_by_keywords, notices, all_keywords)
 
-        if filtered_df.empty:
-            processing_state[process_id]['status'] = 'completed'
-            processing_state[process_id]['message'] = "No matches found for the selected keywords"
+        if not notices:
+            await run_store(update_progress, process_id, status='completed', message="No matches found for the selected keywords")
             return
         
-        # Step 3: Remove duplicates
-        processing_state[process_id]['current_step'] = 'deduplication'
-        available_columns = filtered_df.columns.tolist()
-        id_column = available_columns[0]
-        keyword_column = available_columns[-1]
-        df_clean = remove_duplicates(filtered_df, id_column, keyword_column)
+        # Step 3: Remove notices returned more than once by the API
+        # (filter_by_keywords already lists every matched keyword on a single row)
+        await run_store(update_progress, process_id, current_step='deduplication')
+        notices = await run_timed_stage(timings, 'deduplication', remove_duplicates, notices)
         
         # Step 4: Filter by selected departments from map
-        processing_state[process_id]['current_step'] = 'department_filtering'
-        df_final = filter_by_departments(df_clean, target_departments_list)
+        await run_store(update_progress, process_id, current_step='department_filtering')
+        notices = await run_timed_stage(timings, 'department_filtering', filter_by_departments, notices, target_departments_list)
         
-        if df_final.empty:
-            processing_state[process_id]['status'] = 'completed'
-            processing_state[process_id]['message'] = f"No records found for selected departments: {', '.join(target_departments_list)}"
+        if not notices:
+            await run_store(
+                update_progress, process_id, status='completed',
+                message=f"No records found for selected departments: {', '.join(target_departments_list)}"
+            )
             return
         
         # Step 5: Process PDFs
-        processing_state[process_id]['current_step'] = 'pdf_processing'
-        processed_df = extract_pdf_content(df_final, process_id)
-        
-        # Create summary table
-         # Update the summary_table creation to include extracted link
-        # In the run_processing function, update the summary_table creation:
-        summary_table = pd.DataFrame({
-            "Keywords": processed_df.get('keyword', 'N/A'),
-            'Acheteur': processed_df.get('nomacheteur', 'N/A'),
-            'Objet': processed_df.get('objet', 'N/A'),
-            'Lots': processed_df.get('lot_numbers', ''),
-            'Visite Obligatoire': processed_df.get('visite_obligatoire', 'no'),
-            'Département': processed_df.get('code_departement_trouve', processed_df.get('code_departement', 'N/A')),
-            'Date Limite': processed_df.get('datelimitereponse', 'Pas Mentionné'),
-            'PDF Link': processed_df.get('generated_link', 'N/A'),
-            'Extracted Link': processed_df.get('primary_extracted_link', '')  # This should now contain the correct URL
-        })
+        await run_store(update_progress, process_id, current_step='pdf_processing')
+        # (rows and their summary are appended to the job as each notice finishes)
+        await run_timed_stage(timings, 'pdf_processing', extract_pdf_content, notices, process_id, timings)
         
-        processing_state[process_id]['summary_table'] = summary_table.to_dict('records')
-        processing_state[process_id]['status'] = 'completed'
-        processing_state[process_id]['message'] = f"Processing completed. Found {len(summary_table)} records."
+        found = await run_store(job_store.row_count, process_id)
+        await run_store(
+            update_progress, process_id, status='completed', current_step='completed',
+            message=f"Processing completed. Found {found} records."
+        )
         
     except Exception as e:
-        processing_state[process_id]['status'] = 'error'
-        processing_state[process_id]['error'] = str(e)
+        ERRORS.inc(kind='job')
+        await run_store(update_progress, process_id, status='error', error=str(e))
         print(f"Error in processing: {e}")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics of this worker process"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/progress/{process_id}")
 async def get_progress(process_id: str):
-    """Get processing progress"""
-    if process_id not in processing_state:
-        raise HTTPException(status_code=404, detail="Process not found")
-    
-    return JSONResponse(processing_state[process_id])
+    """Get a small progress summary (use /results for the rows)"""
+    return JSONResponse(progress_summary(await get_job(process_id)))
 
-@app.get("/download/{process_id}")
-async def download_results(process_id: str):
-    """Download results as Excel file"""
-    if process_id not in processing_state:
-        raise HTTPException(status_code=404, detail="Process not found")
+@app.get("/progress/{process_id}/stream")
+async def stream_progress(process_id: str, request: Request):
+    """Push progress events for a job as Server-Sent Events"""
+    await get_job(process_id)
     
-    if processing_state[process_id]['status'] != 'completed':
-        raise HTTPException(status_code=400, detail="Process not completed")
-    
-    # Convert result back to DataFrame
-    result_data = processing_state[process_id].get('result', [])
-    if not result_data:
-        raise HTTPException(status_code=404, detail="No data available")
-    
-    df = pd.DataFrame(result_data)
-    
-    # Create Excel file in memory
-    excel_buffer = io.BytesIO()
-    df.to_excel(excel_buffer, index=False, engine='openpyxl')
-    excel_buffer.seek(0)
-    
-    target_date = processing_state[process_id].get('target_date', 'unknown')
-    filename = f"BOAMP_Full_Results_{target_date}_{datetime.now().strftime('%H%M%S')}.xlsx"
+    try:
+        last_event_id = int(request.headers.get('last-event-id', 0))
+    except ValueError:
+        last_event_id = 0
+    
+    async def event_stream():
+        nonlocal last_event_id
+        idle = 0.0
+        while True:
+            events = await run_store(get_events_since, process_id, last_event_id)
+            for event_id, event_type, data in events:
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                last_event_id = event_id
+            
+            if not events:
+                job = await run_store(job_store.get, process_id)
+                status = job_status(job) if job else 'error'
+                if status == 'interrupted':
+                    # Not a stored event: the job may still be resumed
+                    data = {**progress_summary(job), 'status': status, 'error': "Processing was interrupted, it can be resumed"}
+                    yield f"event: failed\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                if status in TERMINAL_STATUSES + ('interrupted',):
+                    break
+            if await request.is_disconnected():
+                break
+            
+            idle = 0.0 if events else idle + SSE_POLL_INTERVAL
+            if idle >= SSE_KEEPALIVE_INTERVAL:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(SSE_POLL_INTERVAL)
     
     return StreamingResponse(
-        excel_buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@app.get("/download-summary/{process_id}")
-async def download_summary(process_id: str):
-    """Download summary table as CSV"""
-    if process_id not in processing_state:
-        raise HTTPException(status_code=404, detail="Process not found")
+@app.get("/results/{process_id}")
+async def get_results(process_id: str, since: int = 0):
+    """Get the summary rows of a job, optionally only those after the first `since`"""
+    job = await get_job(process_id)
+    since = max(since, 0)
+    summary_table = await run_store(job_store.summaries, process_id, since)
+    return JSONResponse({
+        **progress_summary(job),
+        'departments': job.get('departments', []),
+        'timings': job['timings'],
+        'since': since,
+        'next': since + len(summary_table),
+        'summary_table': summary_table,
+    })
+
+async def send_export(process_id: str, table: str, export_format: str, name: str, include_text: bool = False):
+    """Serve an export of a completed job, building it on first request"""
+    job = await get_job(process_id)
     
-    if processing_state[process_id]['status'] != 'completed':
+    if job['status'] != 'completed':
         raise HTTPException(status_code=400, detail="Process not completed")
     
-    # Get summary table
-    summary_data = processing_state[process_id].get('summary_table', [])
-    if not summary_data:
-        raise HTTPException(status_code=404, detail="No summary data available")
+    if export_format not in EXPORT_WRITERS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{export_format}', expected one of: {', '.join(EXPORT_WRITERS)}")
     
-    df = pd.DataFrame(summary_data)
+    if await run_store(job_store.row_count, process_id) == 0:
+        raise HTTPException(status_code=404, detail="No data available")
     
-    # Create CSV in memory
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
-    csv_buffer.seek(0)
+    target_date = job.get('target_date', 'unknown')
+    filename = f"{name}_{target_date}_{datetime.now().strftime('%H%M%S')}.{export_format}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    media_type = EXPORT_MEDIA_TYPES[export_format]
+    path = export_path(process_id, table, export_format, include_text)
     
-    target_date = processing_state[process_id].get('target_date', 'unknown')
-    filename = f"BOAMP_Summary_{target_date}_{datetime.now().strftime('%H%M%S')}.csv"
+    if not os.path.exists(path) and export_format == 'csv':
+        return StreamingResponse(
+            stream_csv_export(process_id, table, include_text, path), media_type=media_type, headers=headers
+        )
     
-    return StreamingResponse(
-        io.BytesIO(csv_buffer.getvalue().encode('utf-8-sig')),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    if not os.path.exists(path):
+        try:
+            await run_io(export_flights.do, path, build_export, process_id, table, export_format, include_text)
+        except ImportError as e:
+            raise HTTPException(status_code=400, detail=f"{export_format} export is not available: {e}")
+    
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+@app.get("/download/{process_id}")
+async def download_results(process_id: str, export_format: str = Query("xlsx", alias="format"),
+                           include_text: bool = False):
+    """Download full results as Excel (default), CSV or Parquet, with the PDF texts if include_text is set"""
+    return await send_export(process_id, 'results', export_format, "BOAMP_Full_Results", include_text)
+
+@app.get("/download-summary/{process_id}")
+async def download_summary(process_id: str, export_format: str = Query("csv", alias="format")):
+    """Download summary table as CSV (default), Excel or Parquet"""
+    return await send_export(process_id, 'summary', export_format, "BOAMP_Summary")
+
+@app.get("/text/{ref}")
+async def get_pdf_text(ref: str):
+    """Extracted text of a notice PDF (the pages analyzed in lazy mode), by the pdf_text_ref of a result row"""
+    try:
+        text = await run_store(text_store.get, ref)
+    except ValueError:
+        text = None
+    if text is None:
+        raise HTTPException(status_code=404, detail="Text not found")
+    return PlainTextResponse(text)
+
 @app.post("/api/extract-pdf-link")
 async def extract_pdf_link_api(
     pdf_url: str = Form(...),
@@ -1123,7 +2058,7 @@ async def extract_pdf_link_api(
             })
         
         # Extract links
-        links = extract_links_from_pdf_content(pdf_url)
+        links = await run_io(extract_links_from_pdf_content, pdf_url)
         primary_link = links[0] if links else None
         
         return JSONResponse({
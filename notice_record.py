@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+# Columns the pipeline adds to a notice, in the order they appear in results
+PIPELINE_COLUMNS = {
+    'keyword': 'keyword',
+    'department_found': 'code_departement_trouve',
+    'generated_link': 'generated_link',
+    'pdf_text_ref': 'pdf_text_ref',
+    'pdf_status': 'pdf_status',
+    'pages_extracted': 'pages_extracted',
+    'lot_numbers': 'lot_numbers',
+    'visite_obligatoire': 'visite_obligatoire',
+    'keywords_used': 'keywords_used',
+    'extracted_links': 'extracted_links',
+    'primary_extracted_link': 'primary_extracted_link',
+}
+
+
+@dataclass(slots=True)
+class NoticeRecord:
+    """One notice as it moves through the processing pipeline
+
+    The fields the stages work on are parsed once into typed attributes
+    (dates, department list, CPV codes as ints); the API record itself is
+    kept untouched in `source`, nested fields included, and only flattened
+    when a job is exported. `search_text` is the folded text the keyword
+    filter searches, so it never has to go back to `source`. Pipeline stages
+    fill in the remaining fields.
+    """
+
+    idweb: str
+    dateparution: Optional[date]
+    datelimitereponse: Optional[datetime]
+    objet: str
+    nomacheteur: str
+    departments: List[str]
+    cpv_codes: List[int]
+    source: dict = field(repr=False)
+    search_text: str = field(default="", repr=False)
+
+    keyword: str = ""
+    department_found: str = ""
+    generated_link: str = ""
+    pdf_text_ref: str = ""
+    pdf_status: str = ""
+    pages_extracted: int = 0
+    lot_numbers: str = ""
+    visite_obligatoire: str = ""
+    keywords_used: str = ""
+    extracted_links: str = ""
+    primary_extracted_link: str = ""
+
+    def update(self, **fields):
+        """Set pipeline fields (unknown names raise AttributeError)"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def as_row(self) -> dict:
+        """The stored result row: the API record followed by the pipeline columns"""
+        row = dict(self.source)
+        row.update((column, getattr(self, name)) for name, column in PIPELINE_COLUMNS.items())
+        return row
@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+
+class NoticeStore:
+    """Local SQLite warehouse of BOAMP notices, synced per publication date from the API
+
+    Each notice is stored once (keyed by idweb) with its publication date; its
+    departments and CPV codes go to side tables indexed for lookups. Every sync
+    of a date upserts all its notices, so late and corrected ones replace what
+    was stored, and a date with a sync_state row can be served without calling
+    the API.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS notices (
+                idweb TEXT PRIMARY KEY,
+                dateparution TEXT NOT NULL,
+                record TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS notices_date ON notices (dateparution, idweb);
+            CREATE TABLE IF NOT EXISTS notice_departments (
+                code_departement TEXT NOT NULL,
+                idweb TEXT NOT NULL,
+                PRIMARY KEY (code_departement, idweb)
+            );
+            CREATE INDEX IF NOT EXISTS notice_departments_idweb ON notice_departments (idweb);
+            CREATE TABLE IF NOT EXISTS notice_cpv (
+                cpv TEXT NOT NULL,
+                idweb TEXT NOT NULL,
+                PRIMARY KEY (cpv, idweb)
+            );
+            CREATE INDEX IF NOT EXISTS notice_cpv_idweb ON notice_cpv (idweb);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                dateparution TEXT PRIMARY KEY,
+                record_count INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL NOT NULL
+            );
+        """)
+        self.db.commit()
+
+    def sync_state(self, dateparution: str) -> Optional[dict]:
+        """Return the sync state of a publication date, or None if it was never synced"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT record_count, synced_at FROM sync_state WHERE dateparution = ?", (dateparution,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'record_count': row[0], 'synced_at': row[1]}
+
+    def upsert(self, dateparution: str, notices: Iterable[Tuple[str, dict, List[str], List[str]]]):
+        """Store (idweb, record, departments, cpv_codes) notices of a date and mark the date synced"""
+        now = time.time()
+        with self.lock:
+            try:
+                for idweb, record, departments, cpv_codes in notices:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO notices (idweb, dateparution, record, ingested_at) VALUES (?, ?, ?, ?)",
+                        (idweb, dateparution, json.dumps(record, ensure_ascii=False), now)
+                    )
+                    self.db.execute("DELETE FROM notice_departments WHERE idweb = ?", (idweb,))
+                    self.db.execute("DELETE FROM notice_cpv WHERE idweb = ?", (idweb,))
+                    self.db.executemany(
+                        "INSERT OR IGNORE INTO notice_departments (code_departement, idweb) VALUES (?, ?)",
+                        [(department, idweb) for department in departments]
+                    )
+                    self.db.executemany(
+                        "INSERT OR IGNORE INTO notice_cpv (cpv, idweb) VALUES (?, ?)",
+                        [(code, idweb) for code in cpv_codes]
+                    )
+                record_count = self.db.execute(
+                    "SELECT COUNT(*) FROM notices WHERE dateparution = ?", (dateparution,)
+                ).fetchone()[0]
+                self.db.execute(
+                    "INSERT OR REPLACE INTO sync_state (dateparution, record_count, synced_at) VALUES (?, ?, ?)",
+                    (dateparution, record_count, now)
+                )
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+
+    def query(self, start_date: str, end_date: str, departments: Optional[List[str]] = None,
+              cpv_codes: Optional[List[str]] = None, limit: Optional[int] = None) -> List[dict]:
+        """Records published between two dates (inclusive), optionally restricted to departments and CPV codes"""
+        sql = "SELECT record FROM notices WHERE dateparution BETWEEN ? AND ?"
+        params = [start_date, end_date]
+        if departments:
+            sql += (" AND idweb IN (SELECT idweb FROM notice_departments WHERE code_departement IN ("
+                    + ", ".join("?" for _ in departments) + "))")
+            params += departments
+        if cpv_codes:
+            sql += " AND idweb IN (SELECT idweb FROM notice_cpv WHERE cpv IN (" + ", ".join("?" for _ in cpv_codes) + "))"
+            params += cpv_codes
+        sql += " ORDER BY dateparution, idweb"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def records(self, idwebs: List[str]) -> List[dict]:
+        """The records of some notices in the order given, {} for the ones not stored"""
+        found = {}
+        with self.lock:
+            for start in range(0, len(idwebs), 500):
+                chunk = idwebs[start:start + 500]
+                found.update(self.db.execute(
+                    "SELECT idweb, record FROM notices WHERE idweb IN (" + ", ".join("?" for _ in chunk) + ")", chunk
+                ).fetchall())
+        return [json.loads(found[idweb]) if idweb in found else {} for idweb in idwebs]
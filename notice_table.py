@@ -0,0 +1,311 @@
+import os
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from notice_record import NoticeRecord
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # listed in requirements; without it notices are kept as a list of NoticeRecords
+    pa = None
+
+# Notices are converted from and back to NoticeRecords this many at a time
+RECORD_BATCH_ROWS = 1000
+# Tables with more notices than this are spilled to Parquet (when given a
+# spill_dir). 10000 notices take about 50 MB as Arrow, so short date ranges
+# stay in memory while ranges of weeks over many departments go to disk.
+SPILL_ROWS = 10000
+
+# Returns the API records of some idwebs, in order ({} for unknown ones)
+SourceLoader = Callable[[List[str]], List[dict]]
+
+
+def notice_schema():
+    """Arrow schema of a NoticeTable; buyer, department and keyword strings are dictionary-encoded"""
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('idweb', pa.string()),
+        ('dateparution', pa.date32()),
+        ('datelimitereponse', pa.string()),
+        ('objet', pa.string()),
+        ('nomacheteur', label),
+        ('departments', pa.list_(label)),
+        ('cpv_codes', pa.list_(pa.int64())),
+        ('keyword', label),
+        ('department_found', label),
+        ('search_text', pa.large_string()),
+    ])
+
+
+SCHEMA = notice_schema() if pa is not None else None
+
+
+def _notice_row(notice: NoticeRecord) -> dict:
+    return {
+        'idweb': notice.idweb,
+        'dateparution': notice.dateparution,
+        'datelimitereponse': notice.datelimitereponse.isoformat() if notice.datelimitereponse else None,
+        'objet': notice.objet,
+        'nomacheteur': notice.nomacheteur,
+        'departments': notice.departments,
+        'cpv_codes': notice.cpv_codes,
+        'keyword': notice.keyword,
+        'department_found': notice.department_found,
+        'search_text': notice.search_text,
+    }
+
+
+def _row_notice(row: dict, source: dict) -> NoticeRecord:
+    deadline = row['datelimitereponse']
+    row['datelimitereponse'] = datetime.fromisoformat(deadline) if deadline else None
+    return NoticeRecord(source=source, **row)
+
+
+def _merge_lists(values: List[str]) -> str:
+    """Join '; '-separated lists, keeping the first occurrence of each item"""
+    items = {}
+    for value in values:
+        for item in (value or '').split(';'):
+            if item.strip():
+                items[item.strip()] = None
+    return '; '.join(items)
+
+
+def _value_type(name: str):
+    """Arrow type of the values of a field, or of its list items, without dictionary encoding"""
+    value_type = SCHEMA.field(name).type
+    if pa.types.is_list(value_type):
+        value_type = value_type.value_type
+    if pa.types.is_dictionary(value_type):
+        value_type = value_type.value_type
+    return value_type
+
+
+def _field_values(values, field):
+    """Values (a list or an Arrow array) as an array of the field's type"""
+    if not isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return pa.array(values, field.type)
+    if pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(values.type):
+        return pc.dictionary_encode(values)
+    return values.cast(field.type)
+
+
+class NoticeTable:
+    """The notices of a job while they go through the record-level stages
+
+    With pyarrow installed the notices are held column by column in an Arrow
+    table, and each stage computes a boolean mask (filter) from the columns it
+    needs. Once a table grows past `spill_rows` notices and a `spill_dir` is
+    given, it is written there as a Parquet file instead and read back one row
+    group (RECORD_BATCH_ROWS notices) at a time. The API records themselves are
+    not held: `load_sources` looks them up by idweb when NoticeRecords are
+    built again. Without pyarrow the notices stay a plain list of NoticeRecords.
+    """
+
+    def __init__(self, notices: Optional[List[NoticeRecord]] = None, table=None, path: Optional[str] = None,
+                 load_sources: Optional[SourceLoader] = None, spill_dir: Optional[str] = None,
+                 spill_rows: int = SPILL_ROWS):
+        self.notices = notices
+        self.table = table
+        self.path = path
+        self.load_sources = load_sources
+        self.spill_dir = spill_dir
+        self.spill_rows = spill_rows
+
+    @classmethod
+    def from_notices(cls, notices: Iterable[NoticeRecord], load_sources: SourceLoader,
+                     spill_dir: Optional[str] = None, spill_rows: int = SPILL_ROWS) -> 'NoticeTable':
+        """Build a table from NoticeRecords, converting RECORD_BATCH_ROWS of them at a time"""
+        if pa is None:
+            return cls(notices=list(notices))
+        notices = iter(notices)
+        chunks = iter(lambda: list(islice(notices, RECORD_BATCH_ROWS)), [])
+        tables = (pa.Table.from_pylist([_notice_row(notice) for notice in chunk], schema=SCHEMA) for chunk in chunks)
+        return cls(load_sources=load_sources, spill_dir=spill_dir, spill_rows=spill_rows)._collect(tables)
+
+    def _collect(self, tables) -> 'NoticeTable':
+        """A table with the same settings from tables, moved to a Parquet file once they add up to more than spill_rows"""
+        held = []
+        rows = 0
+        path = None
+        writer = None
+        try:
+            for table in tables:
+                if writer is not None:
+                    writer.write_table(table)
+                    continue
+                held.append(table)
+                rows += table.num_rows
+                if self.spill_dir is not None and rows > self.spill_rows:
+                    os.makedirs(self.spill_dir, exist_ok=True)
+                    fd, path = tempfile.mkstemp(suffix=".parquet", dir=self.spill_dir)
+                    os.close(fd)
+                    writer = pq.ParquetWriter(path, SCHEMA)
+                    for held_table in held:
+                        writer.write_table(held_table)
+                    held = []
+        finally:
+            if writer is not None:
+                writer.close()
+        settings = dict(load_sources=self.load_sources, spill_dir=self.spill_dir, spill_rows=self.spill_rows)
+        if path is not None:
+            return NoticeTable(path=path, **settings)
+        table = pa.concat_tables(held) if held else SCHEMA.empty_table()
+        return NoticeTable(table=table, **settings)
+
+    def _tables(self):
+        """The Arrow table, or the row groups of the spilled file one by one"""
+        if self.path is None:
+            yield self.table
+            return
+        parquet_file = pq.ParquetFile(self.path)
+        for index in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(index)
+
+    def _arrow_column(self, name: str):
+        """One field of every notice as a ChunkedArray, read alone from the spilled file"""
+        if self.path is not None:
+            return pq.read_table(self.path, columns=[name]).column(name)
+        return self.table.column(name)
+
+    def __len__(self) -> int:
+        if pa is None:
+            return len(self.notices)
+        if self.path is not None:
+            return pq.ParquetFile(self.path).metadata.num_rows
+        return self.table.num_rows
+
+    def column(self, name: str) -> list:
+        """The values of one field for every notice, in order"""
+        if pa is None:
+            return [getattr(notice, name) for notice in self.notices]
+        return self._arrow_column(name).to_pylist()
+
+    def filter(self, mask, **columns) -> 'NoticeTable':
+        """Keep the notices where mask is true, setting the given fields to one value per kept notice
+
+        The mask and values can be lists, or with pyarrow Arrow (or numpy) arrays.
+        """
+        if pa is None:
+            kept = [notice for notice, keep in zip(self.notices, mask) if keep]
+            for name, values in columns.items():
+                for notice, value in zip(kept, values):
+                    setattr(notice, name, value)
+            return NoticeTable(notices=kept)
+        return self._collect(self._filtered(mask, columns))
+
+    def _filtered(self, mask, columns: dict):
+        if not isinstance(mask, (pa.Array, pa.ChunkedArray)):
+            mask = pa.array(mask, pa.bool_())
+        start = 0
+        kept = 0
+        for table in self._tables():
+            selected = table.filter(mask[start:start + table.num_rows])
+            start += table.num_rows
+            for name, values in columns.items():
+                field = SCHEMA.field(name)
+                values = _field_values(values[kept:kept + selected.num_rows], field)
+                selected = selected.set_column(SCHEMA.get_field_index(name), field, values)
+            kept += selected.num_rows
+            yield selected
+
+    def exclude(self, name: str, values) -> 'NoticeTable':
+        """Drop the notices whose field `name` is one of `values`"""
+        values = set(values)
+        if not values:
+            return self
+        if pa is None:
+            return self.filter([getattr(notice, name) not in values for notice in self.notices])
+        value_set = pa.array(list(values), _value_type(name))
+        return self.filter(pc.invert(pc.is_in(self._arrow_column(name), value_set=value_set)))
+
+    def filter_any_in(self, name: str, values, found: Optional[str] = None) -> 'NoticeTable':
+        """Keep the notices whose list field `name` holds one of `values`, setting field `found` to the first of them"""
+        targets = set(values)
+        if pa is None:
+            first = [next((value for value in getattr(notice, name) if value in targets), None)
+                     for notice in self.notices]
+            columns = {found: [value for value in first if value is not None]} if found else {}
+            return self.filter([value is not None for value in first], **columns)
+        value_set = pa.array(list(targets), _value_type(name))
+        return self._collect(
+            self._any_in(batch, name, value_set, found) for table in self._tables() for batch in table.to_batches()
+        )
+
+    def _any_in(self, batch, name: str, value_set, found: Optional[str]):
+        lists = batch.column(name)
+        # Each list item with the row it belongs to; a row is kept at its first item in value_set
+        items = pc.list_flatten(lists)
+        hits = pc.is_in(items, value_set=value_set)
+        rows, first = np.unique(pc.list_parent_indices(lists).filter(hits).to_numpy(), return_index=True)
+        mask = np.zeros(batch.num_rows, dtype=bool)
+        mask[rows] = True
+        selected = pa.Table.from_batches([batch]).filter(mask)
+        if found is not None:
+            field = SCHEMA.field(found)
+            values = _field_values(items.filter(hits).take(first), field)
+            selected = selected.set_column(SCHEMA.get_field_index(found), field, values)
+        return selected
+
+    def drop_duplicates(self, key: str, merge: str) -> 'NoticeTable':
+        """Keep the first notice of each `key`, merging the '; '-separated `merge` fields of the others into it"""
+        if pa is None:
+            first_positions = {}
+            merged = {}
+            for position, notice in enumerate(self.notices):
+                first_positions.setdefault(getattr(notice, key), position)
+                merged.setdefault(getattr(notice, key), []).append(getattr(notice, merge))
+            return self.filter(
+                [first_positions[getattr(notice, key)] == position for position, notice in enumerate(self.notices)],
+                **{merge: [_merge_lists(values) for values in merged.values()]},
+            )
+        keys = self._arrow_column(key)
+        if pc.count_distinct(keys).as_py() == len(keys):
+            return self
+        values = self._arrow_column(merge).cast(_value_type(merge))
+        groups = pa.table({'key': keys, 'value': values, 'position': np.arange(len(keys))}).group_by(
+            'key', use_threads=False
+        ).aggregate([('position', 'min'), ('position', 'count'), ('value', 'list')])
+        kept = np.sort(groups['position_min'].to_numpy())
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[kept] = True
+        # Only the groups with duplicates need their values merged, in the order of their first notice
+        duplicated = groups.filter(pc.greater(groups['position_count'], 1))
+        order = np.argsort(duplicated['position_min'].to_numpy())
+        merged = [_merge_lists(group) for group in duplicated['value_list'].take(order).to_pylist()]
+        replaced = np.isin(kept, duplicated['position_min'].to_numpy())
+        values = pc.replace_with_mask(values.take(kept), pa.array(replaced), pa.array(merged, values.type))
+        return self.filter(mask, **{merge: values})
+
+    def iter_columns(self, *names: str) -> Iterator[List[list]]:
+        """The values of some fields, RECORD_BATCH_ROWS notices at a time, without building NoticeRecords"""
+        if pa is None:
+            for batch in self.iter_notices():
+                yield [[getattr(notice, name) for notice in batch] for name in names]
+            return
+        for table in self._tables():
+            table = table.select(list(names))
+            for start in range(0, table.num_rows, RECORD_BATCH_ROWS):
+                batch = table.slice(start, RECORD_BATCH_ROWS)
+                yield [batch.column(name).to_pylist() for name in names]
+
+    def iter_notices(self) -> Iterator[List[NoticeRecord]]:
+        """The notices as NoticeRecords, RECORD_BATCH_ROWS at a time, with their API records loaded"""
+        if pa is None:
+            for start in range(0, len(self.notices), RECORD_BATCH_ROWS):
+                yield self.notices[start:start + RECORD_BATCH_ROWS]
+            return
+        for table in self._tables():
+            for start in range(0, table.num_rows, RECORD_BATCH_ROWS):
+                rows = table.slice(start, RECORD_BATCH_ROWS).to_pylist()
+                sources = self.load_sources([row['idweb'] for row in rows])
+                yield [_row_notice(row, source) for row, source in zip(rows, sources)]
+
+    def to_notices(self) -> List[NoticeRecord]:
+        """All the notices as NoticeRecords"""
+        return [notice for batch in self.iter_notices() for notice in batch]
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import NamedTuple, Optional
+
+
+class CachedPDF(NamedTuple):
+    content: bytes
+    etag: str
+    last_modified: str
+    fetched_at: float
+
+
+class PDFStore:
+    """Content-addressed on-disk store of downloaded PDFs, keyed by idweb
+
+    Blobs are named after their SHA-256 and written atomically (temp file in the
+    same directory, then os.replace). A small SQLite index maps each key to its
+    blob, HTTP validators and last access time; once the total size exceeds
+    `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.max_bytes = max_bytes
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pdfs (
+                key TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT NOT NULL DEFAULT '',
+                last_modified TEXT NOT NULL DEFAULT '',
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS pdfs_last_access ON pdfs (last_access)")
+        self.db.commit()
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], f"{sha256}.pdf")
+
+    def get(self, key: str) -> Optional[CachedPDF]:
+        """Return the cached PDF for a key, or None if it is not stored"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT sha256, etag, last_modified, fetched_at FROM pdfs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            sha256, etag, last_modified, fetched_at = row
+            try:
+                with open(self._blob_path(sha256), "rb") as blob:
+                    content = blob.read()
+            except FileNotFoundError:
+                # Blob removed behind our back; forget the entry
+                self.db.execute("DELETE FROM pdfs WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE pdfs SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        return CachedPDF(content, etag, last_modified, fetched_at)
+
+    def touch(self, key: str):
+        """Record a successful revalidation (HTTP 304) of a cached PDF"""
+        now = time.time()
+        with self.lock:
+            self.db.execute("UPDATE pdfs SET fetched_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            self.db.commit()
+
+    def put(self, key: str, content: bytes, etag: str = "", last_modified: str = ""):
+        """Store a PDF atomically and evict old entries if the store is over its cap"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if not os.path.exists(path):
+            fd, temp_path = tempfile.mkstemp(suffix=".part", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    temp_file.write(content)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pdfs (key, sha256, size, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, sha256, len(content), etag or "", last_modified or "", now, now)
+            )
+            self.db.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the store fits in max_bytes (lock held)"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pdfs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, sha256, size in self.db.execute(
+            "SELECT key, sha256, size FROM pdfs ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM pdfs WHERE key = ?", (key,))
+            still_used = self.db.execute("SELECT 1 FROM pdfs WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+            if not still_used:
+                try:
+                    os.unlink(self._blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self.db.commit()
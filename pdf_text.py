@@ -0,0 +1,66 @@
+import io
+from typing import Callable, Dict, List
+
+import fitz  # PyMuPDF
+import PyPDF2
+
+
+# PDF text extraction backends
+# Each backend takes the raw PDF bytes and returns the text of every page. All of
+# them read straight from memory, so no temporary file is ever written.
+
+def extract_pages_pymupdf(pdf_bytes: bytes) -> List[str]:
+    """Extract page texts with PyMuPDF (fastest, default)"""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page.get_text("text") for page in doc]
+
+def extract_pages_pypdf2(pdf_bytes: bytes) -> List[str]:
+    """Extract page texts with PyPDF2 (pure Python)"""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [page.extract_text() or "" for page in pdf_reader.pages]
+
+def extract_pages_pdfplumber(pdf_bytes: bytes) -> List[str]:
+    """Extract page texts with pdfplumber (slowest, best layout; optional dependency)"""
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+PDF_TEXT_BACKENDS: Dict[str, Callable[[bytes], List[str]]] = {
+    "pymupdf": extract_pages_pymupdf,
+    "pypdf2": extract_pages_pypdf2,
+    "pdfplumber": extract_pages_pdfplumber,
+}
+
+def get_backend(name: str) -> Callable[[bytes], List[str]]:
+    """Return the extraction function for a backend name"""
+    try:
+        return PDF_TEXT_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown PDF text backend '{name}', expected one of: {', '.join(PDF_TEXT_BACKENDS)}")
+
+def format_pages(page_texts: List[str]) -> str:
+    """Join page texts into the 'Page N:' layout stored in pdf_content"""
+    return "".join(f"Page {page_num + 1}:\n{page_text}\n\n" for page_num, page_text in enumerate(page_texts))
+
+class LazyDocument:
+    """Page-level access to a PDF with PyMuPDF: a page's text is only extracted when asked for"""
+
+    def __init__(self, pdf_bytes: bytes):
+        self.doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+    def __len__(self) -> int:
+        return self.doc.page_count
+
+    def page_text(self, page_number: int) -> str:
+        """Text of one page (0-based); nothing is kept once returned"""
+        return self.doc.load_page(page_number).get_text("text")
+
+    def close(self):
+        self.doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
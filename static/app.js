@@ -325,6 +325,7 @@ document.getElementById('processForm').addEventListener('submit', async function
     
     // Get other form data
     const targetDate = document.getElementById('targetDate').value;
+    const endDate = document.getElementById('endDate').value;
     const selectedKeywords = Array.from(document.querySelectorAll('input[name="selected_keywords"]:checked'))
         .map(cb => cb.value);
     const customKeywords = document.getElementById('customKeywords').value.trim();
@@ -351,6 +352,9 @@ document.getElementById('processForm').addEventListener('submit', async function
         // Prepare form data
         const formData = new FormData();
         formData.append('target_date', targetDate);
+        if (endDate) {
+            formData.append('end_date', endDate);
+        }
         formData.append('selected_departments', selectedDepts);
         selectedKeywords.forEach(keyword => {
             formData.append('selected_keywords', keyword);
@@ -392,6 +396,52 @@ function startProgressTracking(processId) {
     // Show progress container
     document.getElementById('progressContainer').style.display = 'block';
     
+    // Prefer the server push channel; fall back to polling if it isn't available
+    if (!window.EventSource) {
+        startProgressPolling(processId);
+        return;
+    }
+    
+    const source = new EventSource(`/progress/${processId}/stream`);
+    let liveRows = 0;
+    
+    source.addEventListener('row', (event) => {
+        // Show each notice as soon as it is processed
+        const data = JSON.parse(event.data);
+        if (data.summary) {
+            appendResultRow(data.summary, liveRows === 0);
+            liveRows++;
+        }
+    });
+    
+    source.addEventListener('progress', (event) => {
+        updateProgressDisplay(JSON.parse(event.data));
+    });
+    
+    source.addEventListener('completed', (event) => {
+        source.close();
+        updateProgressDisplay(JSON.parse(event.data));
+        finishProcessing(processId);
+    });
+    
+    source.addEventListener('failed', (event) => {
+        source.close();
+        hideLoadingModal();
+        const progress = JSON.parse(event.data);
+        showNotification('Erreur: ' + (progress.error || 'Erreur inconnue'), 'error');
+    });
+    
+    source.onerror = () => {
+        // The browser reconnects on its own unless the stream was closed for good
+        if (source.readyState === EventSource.CLOSED) {
+            startProgressPolling(processId);
+        }
+    };
+}
+
+// Poll the progress summary (used when the event stream is unavailable)
+function startProgressPolling(processId) {
+    let nextRow = 0;
     const progressInterval = setInterval(async () => {
         try {
             const response = await fetch(`/progress/${processId}`);
@@ -402,12 +452,17 @@ function startProgressTracking(processId) {
             const progress = await response.json();
             updateProgressDisplay(progress);
             
+            // Append the rows finished since the last poll
+            const rowsResponse = await fetch(`/results/${processId}?since=${nextRow}`);
+            if (rowsResponse.ok) {
+                const rows = await rowsResponse.json();
+                rows.summary_table.forEach(row => appendResultRow(row, nextRow++ === 0));
+            }
+            
             if (progress.status === 'completed') {
                 clearInterval(progressInterval);
-                hideLoadingModal();
-                showResults(progress);
-                showNotification('Traitement terminé avec succès!', 'success');
-            } else if (progress.status === 'error') {
+                finishProcessing(processId);
+            } else if (progress.status === 'error' || progress.status === 'interrupted') {
                 clearInterval(progressInterval);
                 hideLoadingModal();
                 showNotification('Erreur: ' + (progress.error || 'Erreur inconnue'), 'error');
@@ -418,6 +473,22 @@ function startProgressTracking(processId) {
     }, 2000);
 }
 
+// Fetch the results of a finished job and display them
+async function finishProcessing(processId) {
+    hideLoadingModal();
+    try {
+        const response = await fetch(`/results/${processId}`);
+        if (!response.ok) {
+            throw new Error('Erreur lors du chargement des résultats');
+        }
+        showResults(await response.json());
+        showNotification('Traitement terminé avec succès!', 'success');
+    } catch (error) {
+        console.error('Error loading results:', error);
+        showNotification('Erreur: ' + error.message, 'error');
+    }
+}
+
 // Update progress display
 function updateProgressDisplay(progress) {
     const progressBar = document.getElementById('progressBar');
@@ -425,6 +496,7 @@ function updateProgressDisplay(progress) {
     const currentStep = document.getElementById('currentStep');
     
     const stepMessages = {
+        'queued': 'En attente d\'un créneau de traitement...',
         'starting': 'Démarrage du traitement...',
         'data_extraction': 'Extraction des données depuis l\'API BOAMP...',
         'keyword_filtering': 'Filtrage par mots-clés...',
@@ -527,7 +599,23 @@ function updateResultsTable(progress) {
         return;
     }
     
-    tableBody.innerHTML = summaryData.map(row => `
+    tableBody.innerHTML = summaryData.map(renderResultRow).join('');
+}
+
+// Append a single row to the results table while the job is running
+function appendResultRow(row, firstRow) {
+    const tableBody = document.getElementById('resultsTableBody');
+    document.getElementById('resultsSection').style.display = 'block';
+    
+    if (firstRow) {
+        tableBody.innerHTML = '';
+    }
+    tableBody.insertAdjacentHTML('beforeend', renderResultRow(row));
+}
+
+// Render one results table row
+function renderResultRow(row) {
+    return `
         <tr>
             <td>${escapeHtml(row.Keywords || '')}</td>
             <td>${escapeHtml(row.Acheteur || '')}</td>
@@ -546,7 +634,7 @@ function updateResultsTable(progress) {
                     '<span class="text-muted">N/A</span>'}
             </td>
         </tr>
-    `).join('');
+    `;
 }
 
 // Utility function to escape HTML
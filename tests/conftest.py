@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# main.py reads its settings at import time and serves static/ and templates/
+# from the working directory: point it at a throwaway data directory, keep the
+# background ingester off and run from the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("BOAMP_DATA_DIR", tempfile.mkdtemp(prefix="boamp-tests-"))
+os.environ.setdefault("BOAMP_INGEST_INTERVAL_MINUTES", "0")
+os.chdir(ROOT)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """A client of the app; its shutdown stops the worker pools, so it is shared by every test"""
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(params=["arrow", "spilled", "list"])
+def build_table(request, tmp_path, monkeypatch):
+    """Build NoticeTables from NoticeRecords, as Arrow tables, spilled to Parquet or as plain lists
+
+    Arrow tables are cut in chunks (and row groups) of 3 notices and spilled
+    past 2, so small tables go through every path; their API records are
+    looked up among the notices built so far.
+    """
+    import notice_table
+    if request.param == "list":
+        monkeypatch.setattr(notice_table, "pa", None)
+    else:
+        monkeypatch.setattr(notice_table, "RECORD_BATCH_ROWS", 3)
+    spill_dir = str(tmp_path / "spill") if request.param == "spilled" else None
+    sources = {}
+    
+    def load_sources(idwebs):
+        return [sources.get(idweb, {}) for idweb in idwebs]
+    
+    def build(notices):
+        notices = list(notices)
+        sources.update((notice.idweb, notice.source) for notice in notices)
+        table = notice_table.NoticeTable.from_notices(notices, load_sources, spill_dir, 2)
+        assert (table.path is not None) == (request.param == "spilled" and len(notices) > 2)
+        return table
+    return build
@@ -0,0 +1,38 @@
+import sqlite3
+
+from analysis_cache import AnalysisCache
+
+
+def test_entries_are_kept_per_extractor_version(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "analysis.sqlite"))
+    cache.put("24-1", "v1", {"visite_obligatoire": "yes", "extracted_links": ["https://a"]})
+    assert cache.get("24-1", "v1") == {"visite_obligatoire": "yes", "extracted_links": ["https://a"]}
+    assert cache.get("24-1", "v2") is None
+    assert cache.get("24-2", "v1") is None
+
+
+def test_put_replaces_an_entry(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "analysis.sqlite"))
+    cache.put("24-1", "v1", {"pages_extracted": 1})
+    cache.put("24-1", "v1", {"pages_extracted": 4})
+    assert cache.get("24-1", "v1") == {"pages_extracted": 4}
+
+
+def test_entries_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "analysis.sqlite")
+    AnalysisCache(path).put("24-1", "v1", {"objet": "Réfection de toiture"})
+    assert AnalysisCache(path).get("24-1", "v1") == {"objet": "Réfection de toiture"}
+
+
+def test_caches_that_held_the_text_are_dropped(tmp_path):
+    path = str(tmp_path / "analysis.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE pdf_analysis (key TEXT, version TEXT, analysis TEXT, text BLOB, created_at REAL)")
+    db.execute("INSERT INTO pdf_analysis VALUES ('24-1', 'v1', '{}', x'00', 0)")
+    db.commit()
+    db.close()
+    
+    cache = AnalysisCache(path)
+    assert cache.get("24-1", "v1") is None
+    cache.put("24-1", "v1", {})
+    assert cache.get("24-1", "v1") == {}
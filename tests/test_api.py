@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+import uuid
+
+import pytest
+
+import main
+
+
+def new_job(status="processing", **params):
+    """A job in the store, as /process would have registered it"""
+    process_id = f"process_test_{uuid.uuid4().hex[:8]}"
+    params = {'target_date': "2024-06-03", 'keywords': ["menuiserie"], 'departments': ["75"], **params}
+    main.job_store.create(process_id, params, status=status)
+    return process_id
+
+
+def read_events(client, process_id, **headers):
+    """(id, event, data) of every Server-Sent Event of a job's stream"""
+    with client.stream("GET", f"/progress/{process_id}/stream", headers=headers) as response:
+        body = "".join(response.iter_text())
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_pdf_link_lookup_runs_off_the_event_loop(client, monkeypatch):
+    threads = []
+    
+    def extract_links(pdf_url):
+        threads.append(threading.current_thread().name)
+        return ["https://www.achatpublic.com/sdm/ent/gen/ent_detail.do?PCSLID=CSL_2024_1"]
+    
+    monkeypatch.setattr(main, "extract_links_from_pdf_content", extract_links)
+    response = client.post("/api/extract-pdf-link", data={"pdf_url": "https://www.boamp.fr/24-1.pdf"})
+    assert response.json()["primary_link"].endswith("CSL_2024_1")
+    assert threads[0].startswith("boamp-io")
+
+
+def test_event_stream_replays_a_finished_job(client):
+    process_id = new_job()
+    main.update_progress(process_id, current_step='pdf_processing', total_records=2)
+    main.publish_event(process_id, 'row', {'seq': 1})
+    main.update_progress(process_id, status='completed', current_step='completed')
+    
+    events = read_events(client, process_id)
+    assert [event for _, event, _ in events] == ['progress', 'row', 'completed']
+    assert events[0][2]['total_records'] == 2
+    assert events[-1][2]['status'] == 'completed'
+
+
+def test_event_stream_resumes_after_last_event_id(client):
+    process_id = new_job()
+    main.update_progress(process_id, current_step='keyword_filtering')
+    main.update_progress(process_id, current_step='pdf_processing')
+    main.update_progress(process_id, status='error', error="API unreachable")
+    
+    first_id = read_events(client, process_id)[0][0]
+    events = read_events(client, process_id, **{"Last-Event-ID": first_id})
+    assert [(event, data['current_step']) for _, event, data in events] == [
+        ('progress', 'pdf_processing'), ('failed', 'pdf_processing')
+    ]
+
+
+def test_event_stream_reports_an_interrupted_job(client, monkeypatch):
+    process_id = new_job()
+    monkeypatch.setattr(main, "JOB_STALE_SECONDS", -1)
+    
+    events = read_events(client, process_id)
+    assert [(event, data['status']) for _, event, data in events] == [('failed', 'interrupted')]
+    assert events[0][0] is None
+
+
+def test_results_since_returns_only_newer_rows(client):
+    process_id = new_job()
+    for number in range(1, 4):
+        main.job_store.append_row(process_id, f"24-{number}", {}, {'IDWEB': f"24-{number}"})
+    
+    first = client.get(f"/results/{process_id}").json()
+    assert [row['IDWEB'] for row in first['summary_table']] == ["24-1", "24-2", "24-3"]
+    assert first['next'] == 3
+    
+    main.job_store.append_row(process_id, "24-4", {}, {'IDWEB': "24-4"})
+    later = client.get(f"/results/{process_id}", params={'since': first['next']}).json()
+    assert [row['IDWEB'] for row in later['summary_table']] == ["24-4"]
+    assert (later['since'], later['next']) == (3, 4)
+    assert client.get(f"/results/{process_id}", params={'since': 4}).json()['summary_table'] == []
+
+
+def test_results_of_an_unknown_job_are_not_found(client):
+    assert client.get("/results/process_unknown").status_code == 404
+
+
+def wait_for(condition, timeout=2.0):
+    """Wait for something done by a task on the app's event loop"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def started_jobs(monkeypatch):
+    """Record the jobs the routes start instead of running their pipeline"""
+    started = []
+    
+    async def run_processing(process_id, *args):
+        started.append((process_id,) + args)
+    
+    monkeypatch.setattr(main, "run_processing", run_processing)
+    return started
+
+
+def test_resume_restarts_a_failed_job_with_its_parameters(client, started_jobs):
+    process_id = new_job(status="error", end_date="2024-06-04")
+    main.job_store.append_row(process_id, "24-1", {}, {})
+    
+    response = client.post(f"/resume/{process_id}")
+    assert response.json()['status'] == "resumed"
+    assert "1 records already processed" in response.json()['message']
+    assert wait_for(lambda: started_jobs)
+    assert started_jobs == [(process_id, "2024-06-03", "2024-06-04", ["menuiserie"], ["75"])]
+    # Queued again: a second resume is refused
+    assert client.post(f"/resume/{process_id}").status_code == 400
+
+
+def test_only_failed_or_interrupted_jobs_can_be_resumed(client, started_jobs, monkeypatch):
+    assert client.post(f"/resume/{new_job(status='completed')}").status_code == 400
+    assert client.post(f"/resume/{new_job(status='processing')}").status_code == 400
+    
+    monkeypatch.setattr(main, "JOB_STALE_SECONDS", -1)
+    assert client.post(f"/resume/{new_job(status='processing')}").json()['status'] == "resumed"
+    assert wait_for(lambda: started_jobs) and len(started_jobs) == 1
+
+
+def test_identical_submission_attaches_to_the_running_job(client, started_jobs):
+    form = {'target_date': "2024-06-03", 'selected_keywords': ["métallerie", "miroiterie"],
+            'selected_departments': "75,13"}
+    first = client.post("/process", data=form).json()
+    assert first['status'] == "started"
+    
+    second = client.post("/process", data={**form, 'selected_keywords': ["miroiterie", "métallerie"],
+                                           'selected_departments': "13,75"}).json()
+    assert (second['status'], second['process_id']) == ("attached", first['process_id'])
+    assert wait_for(lambda: started_jobs) and len(started_jobs) == 1
+    main.job_store.update(first['process_id'], status='completed')
+
+
+def test_exports_are_built_on_the_io_pool(client, monkeypatch):
+    process_id = new_job(status="completed")
+    main.job_store.append_row(process_id, "24-1", {'idweb': "24-1", 'lots': [1, 2]}, {'IDWEB': "24-1"})
+    main.job_store.append_row(process_id, "24-2", {'idweb': "24-2", 'objet': "Réfection"}, {'IDWEB': "24-2"})
+    threads = []
+    build_export = main.build_export
+    
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+        return build_export(*args)
+    
+    monkeypatch.setattr(main, "build_export", record_thread)
+    response = client.get(f"/download/{process_id}", params={'format': "xlsx"})
+    assert response.status_code == 200
+    assert threads and threads[0].startswith("boamp-io")
+    
+    csv_text = client.get(f"/download/{process_id}", params={'format': "csv"}).content.decode("utf-8-sig")
+    assert csv_text.splitlines() == ["idweb,lots,objet", '24-1,"[1, 2]",', "24-2,,Réfection"]
+    assert client.get(f"/download/{new_job(status='processing')}").status_code == 400
+
+
+def test_metrics_are_served_in_the_prometheus_format(client):
+    main.ERRORS.inc(kind='test')
+    response = client.get("/metrics")
+    assert response.headers['content-type'].startswith("text/plain; version=0.0.4")
+    assert 'boamp_errors_total{kind="test"}' in response.text
+
+
+def test_pdf_texts_are_served_by_ref(client):
+    ref = main.text_store.put("24-1", "Page 1\nVisite obligatoire")
+    response = client.get(f"/text/{ref}")
+    assert response.text == "Page 1\nVisite obligatoire"
+    assert client.get("/text/24-1-0000000000000000").status_code == 404
+    assert client.get("/text/24-1..").status_code == 404
@@ -0,0 +1,67 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+from job_store import JobStore
+
+
+def test_single_flight_shares_one_call_among_concurrent_callers():
+    flights = main.SingleFlight()
+    release = threading.Event()
+    calls = []
+    
+    def fetch(key):
+        calls.append(key)
+        release.wait(2)
+        return f"page {key}"
+    
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(flights.do, "page-1", fetch, 1) for _ in range(4)]
+        time.sleep(0.1)
+        release.set()
+        assert [future.result() for future in futures] == ["page 1"] * 4
+    assert calls == [1]
+    # Once finished, the next call for the key runs again
+    assert flights.do("page-1", lambda: "again") == "again"
+
+
+def test_single_flight_passes_errors_to_every_caller():
+    flights = main.SingleFlight()
+    release = threading.Event()
+    
+    def fail():
+        release.wait(2)
+        raise ConnectionError("API unreachable")
+    
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(flights.do, "page-1", fail) for _ in range(2)]
+        time.sleep(0.1)
+        release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert flights.calls == {}
+
+
+def test_job_key_ignores_keyword_and_department_order():
+    assert main.build_job_key("2024-06-03", "2024-06-03", ["b", "a", "a"], ["75", "13"]) == \
+        main.build_job_key("2024-06-03", "2024-06-03", ["a", "b"], ["13", "75"])
+    assert main.build_job_key("2024-06-03", "2024-06-03", ["a"], ["75"]) != \
+        main.build_job_key("2024-06-03", "2024-06-04", ["a"], ["75"])
+
+
+def test_identical_jobs_attach_to_the_running_one(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    stale_before = time.time() - 60
+    assert store.attach_or_create("first", {}, "key", stale_before, status="queued") == "first"
+    assert store.attach_or_create("second", {}, "key", stale_before, status="queued") == "first"
+    assert store.get("second") is None
+    assert store.attach_or_create("other", {}, "other key", stale_before, status="queued") == "other"
+    
+    # Finished or silent jobs are not attached to
+    store.update("first", status="completed")
+    assert store.attach_or_create("third", {}, "key", stale_before, status="queued") == "third"
+    assert store.attach_or_create("fourth", {}, "key", time.time() + 1, status="queued") == "fourth"
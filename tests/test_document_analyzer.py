@@ -0,0 +1,91 @@
+import re
+
+import pytest
+
+import main
+
+
+def old_find_lots(text, keywords):
+    """The lot search as it was before DocumentAnalyzer: every pattern over a sliced window"""
+    results = []
+    for keyword in keywords:
+        for keyword_match in re.finditer(re.escape(keyword), text, re.IGNORECASE):
+            text_before = text[max(0, keyword_match.start() - 1000):keyword_match.start()]
+            lots = []
+            for pattern in main.LOT_PATTERNS:
+                for match in pattern.finditer(text_before):
+                    lot_number = main.LOT_PREFIX_RE.sub('', match.group(pattern.groups)).strip(' :-\t')
+                    if lot_number and lot_number not in lots:
+                        lots.append(lot_number)
+            results += [{'keyword': keyword, 'lot_number': lot_number} for lot_number in lots]
+    return results
+
+
+def old_visite(text, keywords):
+    for keyword in keywords:
+        for keyword_match in re.finditer(re.escape(keyword), text, re.IGNORECASE):
+            if 'visite' in text[max(0, keyword_match.start() - 500):keyword_match.start()].lower():
+                return "yes"
+    return "no"
+
+
+TEXTS = [
+    "LOT 3-MENUISERIE extérieure : menuiserie",
+    "Lot 1 : gros oeuvre\nLot 2 : menuiserie\n12 - Lot peinture\nLOT A12 menuiserie",
+    "lot: 4 lot5 Lot 6b - menuiserie, puis lot 7 menuiserie et Lot 8",
+    "La visite du site est obligatoire. Lot 2 - Menuiserie",
+    "Visites : non obligatoires",
+    "Aucun lot ici, seulement de la menuiserie",
+    "menuiserie " + "x" * 1200 + " Lot 9 menuiserie",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_lot_search_matches_the_old_window_logic(text):
+    keywords = ["menuiserie", "peinture"]
+    assert main.DocumentAnalyzer(text).find_lots(keywords) == old_find_lots(text, keywords)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_visite_check_matches_the_old_window_logic(text):
+    assert main.DocumentAnalyzer(text).visite_obligatoire(main.VISITE_KEYWORDS) == old_visite(text, main.VISITE_KEYWORDS)
+
+
+def test_lot_marker_ending_inside_the_keyword_window():
+    assert main.search_keywords_and_find_lot("LOT 3-MENUISERIE", ["menuiserie"]) == [
+        {'keyword': 'menuiserie', 'lot_number': '3'}
+    ]
+
+
+def test_lot_markers_outside_the_lookbehind_are_ignored():
+    text = "Lot 1 " + "." * main.LOT_LOOKBEHIND + " menuiserie"
+    assert main.search_keywords_and_find_lot(text, ["menuiserie"]) == []
+
+
+def rescanned_lots(text, position, window):
+    """Every pattern run over the window in place, as the index must reproduce"""
+    lots = []
+    for pattern in main.LOT_PATTERNS:
+        for match in pattern.finditer(text, max(0, position - window), position):
+            lots.append(main.lot_number(pattern, match))
+    return list(dict.fromkeys(lot for lot in lots if lot))
+
+
+@pytest.mark.parametrize("text", TEXTS[:4] + ["lot 4-lot5 menuiserie", "LOT  :: 12-34 lot 7 LOTAB9 - lot"])
+@pytest.mark.parametrize("window", [4, 7, 12, main.LOT_LOOKBEHIND])
+def test_marker_index_matches_rescanning_each_window(text, window):
+    analyzer = main.DocumentAnalyzer(text)
+    for position in range(len(text) + 1):
+        assert analyzer.lots_before(position, window) == rescanned_lots(text, position, window)
+
+
+def test_window_starting_inside_a_marker_sees_its_tail():
+    analyzer = main.DocumentAnalyzer("lot 4-lot5 menuiserie")
+    assert analyzer.lots_before(11) == ["4-lot5", "4", "5"]
+    assert analyzer.lots_before(11, window=6) == ["5"]
+
+
+def test_visite_must_end_before_the_keyword():
+    analyzer = main.DocumentAnalyzer("visite obligatoire")
+    assert analyzer.has_visite_before(6) and not analyzer.has_visite_before(5)
+    assert not analyzer.has_visite_before(7, window=6)
@@ -0,0 +1,69 @@
+import pyarrow.parquet as pq
+import pytest
+from openpyxl import load_workbook
+
+import exports
+from exports import EXPORT_WRITERS, row_columns, stream_csv
+
+ROWS = [
+    {'idweb': "24-1", 'pages_extracted': 3, 'lot_numbers': "lot-1"},
+    {'idweb': "24-2", 'pages_extracted': 0, 'visite_obligatoire': "yes"},
+    {'idweb': "24-3", 'pages_extracted': "", 'lot_numbers': None},
+]
+
+
+def test_columns_are_the_union_of_the_rows_keys():
+    columns = row_columns(ROWS)
+    assert list(columns) == ['idweb', 'pages_extracted', 'lot_numbers', 'visite_obligatoire']
+    assert columns['pages_extracted'] == {int, str}
+    assert columns['lot_numbers'] == {str}
+
+
+def test_csv_is_streamed_and_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "CSV_CHUNK_ROWS", 2)
+    path = tmp_path / "summary.csv"
+    chunks = list(stream_csv(iter(ROWS), str(path), row_columns(ROWS)))
+    assert len(chunks) == 2
+    assert b"".join(chunks) == path.read_bytes()
+    assert path.read_text(encoding="utf-8-sig").splitlines() == [
+        "idweb,pages_extracted,lot_numbers,visite_obligatoire",
+        "24-1,3,lot-1,",
+        "24-2,0,,yes",
+        "24-3,,,",
+    ]
+
+
+def test_xlsx_has_every_column(tmp_path):
+    path = tmp_path / "results.xlsx"
+    EXPORT_WRITERS['xlsx'](iter(ROWS + [{'idweb': "24-4\x07", 'lot_numbers': "x" * 40000}]), str(path), row_columns(ROWS))
+    sheet = load_workbook(path).active
+    values = list(sheet.values)
+    assert values[0] == ('idweb', 'pages_extracted', 'lot_numbers', 'visite_obligatoire')
+    assert values[2] == ("24-2", 0, None, "yes")
+    assert values[4][0] == "24-4" and len(values[4][2]) == exports.EXCEL_CELL_MAX_CHARS
+
+
+def test_parquet_keeps_numeric_columns_and_falls_back_to_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "PARQUET_BATCH_ROWS", 2)
+    rows = [{'n': 1, 'score': 1.5, 'flag': True, 'mixed': 1}, {'n': 2, 'score': 2, 'flag': False, 'mixed': "a"}]
+    path = tmp_path / "results.parquet"
+    EXPORT_WRITERS['parquet'](iter(rows + rows), str(path), row_columns(rows))
+    
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 2
+    schema = parquet_file.schema_arrow
+    assert [str(schema.field(name).type) for name in schema.names] == ['int64', 'double', 'bool', 'string']
+    assert parquet_file.read().column('mixed').to_pylist() == ["1", "a", "1", "a"]
+
+
+def test_a_failed_export_leaves_no_file(tmp_path):
+    def rows():
+        yield ROWS[0]
+        raise RuntimeError("job store closed")
+    
+    # (xlsx only writes its file once every row is in the workbook)
+    for export_format in ('csv', 'parquet'):
+        path = tmp_path / f"results.{export_format}"
+        with pytest.raises(RuntimeError):
+            EXPORT_WRITERS[export_format](rows(), str(path), row_columns(ROWS))
+        assert list(tmp_path.iterdir()) == []
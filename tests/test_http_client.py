@@ -0,0 +1,77 @@
+import time
+
+import pytest
+import requests
+
+from http_client import HostPolicy, HTTPClient, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_paces_requests():
+    bucket = TokenBucket(rate=20, capacity=3)
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.04
+    
+    bucket.acquire()
+    bucket.acquire()
+    # Two tokens past the burst take about 2 / rate
+    assert time.monotonic() - started >= 0.08
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(rate=0, capacity=1)
+    started = time.monotonic()
+    for _ in range(1000):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def scripted_client(outcomes, **options):
+    """An HTTPClient whose requests get the given responses (or raise the given errors) in turn"""
+    retries = []
+    client = HTTPClient(HostPolicy(max_concurrency=2), backoff_base=0,
+                        on_retry=lambda host, reason: retries.append((host, reason)), **options)
+    outcomes = iter(outcomes)
+    
+    def send(url, params, headers, timeout):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    
+    client._send = send
+    return client, retries
+
+
+def test_transient_failures_are_retried():
+    client, retries = scripted_client([requests.ConnectionError("reset"), Response(503), Response(200)])
+    assert client.get("https://www.boamp.fr/avis/24-1.pdf").status_code == 200
+    assert retries == [("www.boamp.fr", "ConnectionError"), ("www.boamp.fr", "503")]
+
+
+def test_client_errors_are_not_retried():
+    client, retries = scripted_client([Response(404)])
+    with pytest.raises(requests.HTTPError):
+        client.get("https://www.boamp.fr/avis/24-1.pdf")
+    assert retries == []
+
+
+def test_retries_give_up_after_max_retries():
+    client, retries = scripted_client([Response(500)] * 3, max_retries=2)
+    with pytest.raises(requests.HTTPError):
+        client.get("https://www.boamp.fr/avis/24-1.pdf")
+    assert len(retries) == 2
+
+
+def test_backoff_honours_retry_after_up_to_the_maximum():
+    client = HTTPClient(HostPolicy(max_concurrency=1), backoff_base=1, backoff_max=10)
+    assert client._backoff(0, "3") == 3
+    assert client._backoff(0, "120") == 10
+    assert 0 <= client._backoff(2) <= 4
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def test_jobs_keep_their_parameters_and_progress(store):
+    store.create("job", {"target_date": "2024-06-03", "departments": ["75"]}, status="queued", unknown="ignored")
+    store.update("job", status="processing", total_records=12)
+    job = store.get("job")
+    assert (job["target_date"], job["departments"]) == ("2024-06-03", ["75"])
+    assert (job["status"], job["total_records"]) == ("processing", 12)
+    assert "unknown" not in job
+    assert store.get("other") is None
+
+
+def test_rows_are_numbered_and_streamed_in_completion_order(store):
+    store.create("job", {}, status="queued")
+    for number in range(1, 6):
+        assert store.append_row("job", f"24-{number}", {"idweb": f"24-{number}"}, {"n": number}) == number
+    assert store.row_count("job") == 5
+    assert [row["idweb"] for row in store.iter_rows("job", batch_size=2)] == [f"24-{n}" for n in range(1, 6)]
+    assert store.summaries("job", since=3) == [{"n": 4}, {"n": 5}]
+    with pytest.raises(ValueError):
+        list(store.iter_rows("job", column="params"))
+
+
+def test_events_are_returned_after_the_last_id_seen(store):
+    store.create("job", {}, status="queued")
+    first = store.add_event("job", "progress", {"current_step": "data_extraction"})
+    store.add_event("job", "row", {"seq": 1})
+    store.add_event("other", "progress", {})
+    assert store.events_since("job", first) == [(first + 1, "row", {"seq": 1})]
+
+
+def test_expired_jobs_are_evicted_with_their_rows_and_events(store):
+    store.create("old", {}, status="completed")
+    store.append_row("old", "24-1", {}, {})
+    store.add_event("old", "progress", {})
+    store.db.execute("UPDATE jobs SET updated_at = updated_at - 7200 WHERE process_id = 'old'")
+    store.create("new", {}, status="completed")
+    
+    assert store.evict_expired(3600) == ["old"]
+    assert store.get("old") is None and store.row_count("old") == 0 and store.events_since("old", 0) == []
+    assert store.get("new") is not None
+
+
+def test_claim_requeues_failed_or_stale_jobs_once(store):
+    store.create("failed", {}, status="error")
+    store.create("running", {}, status="processing")
+    
+    assert store.claim("failed", time.time() - 60)
+    assert store.get("failed")["status"] == "queued"
+    # Claimed a moment ago: another worker can't take it over
+    assert not store.claim("failed", time.time() - 60)
+    assert not store.claim("running", time.time() - 60)
+    # A running job that stopped heartbeating can be taken over
+    assert store.claim("running", time.time() + 1)
+
+
+def test_done_idwebs_skips_failed_rows(store):
+    store.create("job", {}, status="processing")
+    store.append_row("job", "1", {"pdf_status": "Success"}, {"Lots": "lot-1"})
+    store.append_row("job", "2", {"pdf_status": "Error: timeout"}, {"Lots": ""}, failed=True)
+    store.append_row("job", "3", {"pdf_status": "Skipped - No ID"}, {"Lots": ""})
+    assert store.done_idwebs("job") == {"1", "3"}
+
+
+def test_retried_row_replaces_the_failed_one_in_place(store):
+    store.create("job", {}, status="processing")
+    store.append_row("job", "1", {"pdf_status": "Success"}, {"n": 1})
+    store.append_row("job", "2", {"pdf_status": "Error: timeout"}, {"n": 2}, failed=True)
+    store.append_row("job", "3", {"pdf_status": "Success"}, {"n": 3})
+    
+    assert store.append_row("job", "2", {"pdf_status": "Success"}, {"n": 22}) == 2
+    assert store.row_count("job") == 3
+    assert store.summaries("job") == [{"n": 1}, {"n": 22}, {"n": 3}]
+    assert store.done_idwebs("job") == {"1", "2", "3"}
@@ -0,0 +1,43 @@
+import main
+
+
+def test_matcher_folds_accents_and_case():
+    matcher = main.KeywordMatcher(["menuiserie extérieure", "Métallerie"])
+    assert matcher.match(main.fold_text("Travaux de MENUISERIE EXTERIEURE et de metallerie")) == [
+        "menuiserie extérieure", "Métallerie"
+    ]
+
+
+def test_matcher_finds_overlapping_and_contained_keywords_in_input_order():
+    matcher = main.KeywordMatcher(["Pose de portes", "Pose de portes et de fenêtres", "portes"])
+    text = main.fold_text("Lot 2 : pose de portes et de fenêtres")
+    assert matcher.match(text) == ["Pose de portes", "Pose de portes et de fenêtres", "portes"]
+
+
+def test_matcher_without_keywords_matches_nothing():
+    assert main.KeywordMatcher([]).match("menuiserie") == []
+
+
+def test_search_index_matches_text_and_cpv_keywords():
+    records = [
+        {"objet": "Menuiserie extérieure du collège", "descripteur_libelle": [], "donnees": None},
+        {"objet": "Nettoyage", "descripteur_libelle": ["Services de nettoyage"],
+         "donnees": '{"CPV": {"PRINCIPAL": "45421100"}}'},
+        {"objet": "Fournitures", "descripteur_libelle": [], "donnees": None},
+    ]
+    notices = [main.build_notice_record(record) for record in records]
+    index = main.NoticeSearchIndex([notice.search_text for notice in notices], [notice.cpv_codes for notice in notices])
+    assert index.search(["45421100", "menuiserie extérieure"]) == [["menuiserie extérieure"], ["45421100"], []]
+
+
+def test_search_text_covers_nested_fields():
+    record = {"objet": "Réhabilitation", "descripteur_libelle": ["Métallerie"],
+              "donnees": '{"lots": [{"intitule": "Miroiterie"}]}'}
+    text = main.notice_search_text(record)
+    assert "rehabilitation" in text and "metallerie" in text and "miroiterie" in text
+
+
+def test_cpv_codes_come_from_cpv_objects_only():
+    record = {"donnees": '{"CPV": {"PRINCIPAL": "45421100", "SUPPLEMENTAIRE": ["45442100"]}, '
+                         '"IDENTITE": {"TEL": "0145421100"}, "SIRET": "45421100000017"}'}
+    assert main.record_cpv_codes(record) == ["45421100", "45442100"]
@@ -0,0 +1,45 @@
+from metrics import MetricsRegistry, Timings
+
+
+def test_counters_render_one_series_per_label_set():
+    registry = MetricsRegistry()
+    errors = registry.counter("boamp_errors_total", "Errors by kind", ["kind"])
+    errors.inc(kind="pdf")
+    errors.inc(2, kind="pdf")
+    errors.inc(kind='api "records"')
+    assert registry.render().splitlines() == [
+        "# HELP boamp_errors_total Errors by kind",
+        "# TYPE boamp_errors_total counter",
+        'boamp_errors_total{kind="api \\"records\\""} 1',
+        'boamp_errors_total{kind="pdf"} 3',
+    ]
+
+
+def test_histograms_render_cumulative_buckets_sum_and_count():
+    registry = MetricsRegistry()
+    durations = registry.histogram("boamp_stage_duration_seconds", "Stage durations", ["stage"], buckets=(1, 0.1))
+    for value in (0.05, 0.1, 0.5, 7):
+        durations.observe(value, stage="pdf_processing")
+    assert registry.render().splitlines()[2:] == [
+        'boamp_stage_duration_seconds_bucket{stage="pdf_processing",le="0.1"} 2',
+        'boamp_stage_duration_seconds_bucket{stage="pdf_processing",le="1.0"} 3',
+        'boamp_stage_duration_seconds_bucket{stage="pdf_processing",le="+Inf"} 4',
+        'boamp_stage_duration_seconds_sum{stage="pdf_processing"} 7.65',
+        'boamp_stage_duration_seconds_count{stage="pdf_processing"} 4',
+    ]
+
+
+def test_metrics_without_labels_render_bare_names():
+    registry = MetricsRegistry()
+    registry.counter("boamp_jobs_total", "Jobs").inc()
+    assert registry.render().splitlines()[-1] == "boamp_jobs_total 1"
+
+
+def test_timings_add_up_to_earlier_runs():
+    timings = Timings({'pdf_processing': {'seconds': 2.0, 'count': 1}})
+    timings.add('pdf_processing', 0.5)
+    timings.add('keyword_filtering', 0.1234)
+    assert timings.as_dict() == {
+        'pdf_processing': {'seconds': 2.5, 'count': 2},
+        'keyword_filtering': {'seconds': 0.123, 'count': 1},
+    }
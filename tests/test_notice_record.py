@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+import pytest
+
+import main
+from notice_record import PIPELINE_COLUMNS
+
+RECORD = {
+    'idweb': 2412345,
+    'dateparution': "03/06/2024",
+    'datelimitereponse': "2024-07-01T12:00:00+02:00",
+    'objet': "Remplacement des menuiseries",
+    'nomacheteur': None,
+    'code_departement': "75",
+    'donnees': '{"CPV": {"PRINCIPAL": "45421100"}}',
+    'descripteur_libelle': ["Menuiserie"],
+}
+
+
+def test_api_records_are_parsed_once():
+    notice = main.build_notice_record(dict(RECORD))
+    assert notice.idweb == "2412345"
+    assert notice.dateparution == date(2024, 6, 3)
+    assert notice.datelimitereponse == datetime.fromisoformat("2024-07-01T12:00:00+02:00")
+    assert (notice.nomacheteur, notice.departments, notice.cpv_codes) == ("", ["75"], [45421100])
+    assert notice.source == RECORD
+
+
+@pytest.mark.parametrize("value, parsed", [
+    ("2024-06-03", date(2024, 6, 3)),
+    ("2024/06/03", date(2024, 6, 3)),
+    (datetime(2024, 6, 3, 10, 0), date(2024, 6, 3)),
+    ("juin 2024", None),
+    (None, None),
+])
+def test_publication_dates_in_any_known_format(value, parsed):
+    assert main.parse_notice_date(value) == parsed
+
+
+def test_rows_keep_the_api_record_followed_by_the_pipeline_columns():
+    notice = main.build_notice_record(dict(RECORD))
+    notice.update(keyword="menuiserie extérieure", lot_numbers="lot-2", pages_extracted=3)
+    row = notice.as_row()
+    assert list(row) == list(RECORD) + list(PIPELINE_COLUMNS.values())
+    assert (row['idweb'], row['keyword'], row['lot_numbers'], row['pages_extracted']) == (
+        2412345, "menuiserie extérieure", "lot-2", 3
+    )
+    assert row['code_departement_trouve'] == ""
+    with pytest.raises(AttributeError):
+        notice.update(unknown="value")
+
+
+def test_export_rows_serialize_nested_and_missing_values():
+    row = main.flatten_export_row(main.build_notice_record(dict(RECORD)).as_row())
+    assert row['descripteur_libelle'] == '["Menuiserie"]'
+    assert row['nomacheteur'] == ""
@@ -0,0 +1,79 @@
+import time
+from datetime import date
+
+import pytest
+
+import main
+from notice_store import NoticeStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = NoticeStore(str(tmp_path / "notices.sqlite"))
+    monkeypatch.setattr(main, "notice_store", store)
+    return store
+
+
+def api_record(idweb, departments=("75",), objet="Menuiserie", cpv="45421100"):
+    return {'idweb': idweb, 'dateparution': "2024-06-03", 'objet': objet, 'code_departement': list(departments),
+            'donnees': f'{{"CPV": {{"PRINCIPAL": "{cpv}"}}}}'}
+
+
+def test_dates_are_unsynced_until_upserted(store):
+    assert store.sync_state("2024-06-03") is None
+    store.upsert("2024-06-03", [("24-1", api_record("24-1"), ["75"], ["45421100"])])
+    state = store.sync_state("2024-06-03")
+    assert state['record_count'] == 1 and state['synced_at'] <= time.time()
+
+
+def test_queries_filter_on_dates_departments_and_cpv_codes(store):
+    store.upsert("2024-06-03", [
+        ("24-1", api_record("24-1"), ["75", "92"], ["45421100"]),
+        ("24-2", api_record("24-2"), ["13"], ["45442100"]),
+    ])
+    store.upsert("2024-06-04", [("24-3", api_record("24-3"), ["75"], ["45421100"])])
+    
+    def idwebs(*args, **kwargs):
+        return [record['idweb'] for record in store.query(*args, **kwargs)]
+    
+    assert idwebs("2024-06-03", "2024-06-03") == ["24-1", "24-2"]
+    assert idwebs("2024-06-03", "2024-06-04", departments=["92", "75"]) == ["24-1", "24-3"]
+    assert idwebs("2024-06-03", "2024-06-04", cpv_codes=["45442100"]) == ["24-2"]
+    assert idwebs("2024-06-03", "2024-06-04", limit=2) == ["24-1", "24-2"]
+
+
+def test_records_are_looked_up_in_the_order_given(store):
+    store.upsert("2024-06-03", [(f"24-{number}", api_record(f"24-{number}"), ["75"], []) for number in range(1200)])
+    idwebs = [f"24-{number}" for number in range(1199, -1, -2)] + ["24-missing"]
+    records = store.records(idwebs)
+    assert [record.get('idweb') for record in records] == idwebs[:-1] + [None]
+    assert records[-1] == {}
+
+
+def test_resyncing_a_date_replaces_corrected_and_adds_late_notices(store, monkeypatch):
+    fetched = {'2024-06-03': [api_record("24-5"), api_record("24-7")]}
+    monkeypatch.setattr(main, "get_all_records_for_date", lambda target_date, max_records: fetched[target_date])
+    assert main.sync_notices_for_date("2024-06-03") == 2
+    
+    # A corrected notice moved to another department, and a late notice whose
+    # idweb sorts below those already stored
+    fetched['2024-06-03'] = [api_record("24-2"), api_record("24-5", departments=["13"], objet="Rectificatif"),
+                             api_record("24-7")]
+    assert main.sync_notices_for_date("2024-06-03") == 3
+    
+    assert [record['idweb'] for record in store.query("2024-06-03", "2024-06-03", departments=["75"])] == ["24-2", "24-7"]
+    assert store.query("2024-06-03", "2024-06-03", departments=["13"])[0]['objet'] == "Rectificatif"
+    assert store.sync_state("2024-06-03")['record_count'] == 3
+
+
+def test_only_unsynced_or_unfinished_dates_need_a_sync(store, monkeypatch):
+    today = date.today().isoformat()
+    assert main.needs_sync("2024-06-03")
+    store.upsert("2024-06-03", [])
+    store.upsert(today, [])
+    # Synced after the day ended: complete
+    assert not main.needs_sync("2024-06-03")
+    # Today's notices are refetched once the last sync is NOTICE_REFRESH_AFTER old
+    assert not main.needs_sync(today)
+    monkeypatch.setattr(main, "NOTICE_REFRESH_AFTER", -1)
+    assert main.needs_sync(today)
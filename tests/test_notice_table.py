@@ -0,0 +1,74 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+import main
+import synthetic
+
+
+@pytest.fixture
+def notices():
+    # Built per test: in list mode filter sets fields on the NoticeRecords themselves
+    return [main.build_notice_record(record) for record in synthetic.generate_day("2024-06-03", 200)]
+
+
+def test_round_trip_keeps_every_field(build_table, notices):
+    assert build_table(notices).to_notices() == notices
+
+
+def test_filter_keeps_masked_rows_and_sets_columns(build_table, notices):
+    table = build_table(notices)
+    mask = np.arange(len(notices)) % 3 == 0
+    kept = [notice for notice, keep in zip(notices, mask) if keep]
+    filtered = table.filter(mask, keyword=[f"k{position}" for position in range(len(kept))])
+    
+    assert len(filtered) == len(kept)
+    assert filtered.column('idweb') == [notice.idweb for notice in kept]
+    assert filtered.column('keyword') == [f"k{position}" for position in range(len(kept))]
+    batches = list(filtered.iter_columns('idweb', 'cpv_codes'))
+    assert [idweb for idwebs, _ in batches for idweb in idwebs] == [notice.idweb for notice in kept]
+    assert [codes for _, cpv_codes in batches for codes in cpv_codes] == [notice.cpv_codes for notice in kept]
+
+
+def test_exclude_drops_the_given_values(build_table, notices):
+    done = {notice.idweb for notice in notices[::2]}
+    remaining = build_table(notices).exclude('idweb', done)
+    assert [notice.idweb for notice in remaining.to_notices()] == [notice.idweb for notice in notices[1::2]]
+
+
+def test_filter_any_in_sets_the_first_value_found(build_table, notices):
+    targets = {"75", "13", "69"}
+    expected = [
+        (notice.idweb, next(code for code in notice.departments if code in targets))
+        for notice in notices if targets.intersection(notice.departments)
+    ]
+    filtered = build_table(notices).filter_any_in('departments', targets, found='department_found')
+    assert expected
+    assert list(zip(filtered.column('idweb'), filtered.column('department_found'))) == expected
+
+
+def test_drop_duplicates_merges_into_the_first_notice(build_table, notices):
+    notices = [replace(notice, keyword=f"k{position % 2}") for position, notice in enumerate(notices[:50])]
+    duplicated = notices + [replace(notice, keyword="k1; Escaliers") for notice in notices[::5]]
+    deduplicated = build_table(duplicated).drop_duplicates('idweb', merge='keyword')
+    expected = [
+        "k0; k1; Escaliers" if position % 5 == 0 and position % 2 == 0
+        else "k1; Escaliers" if position % 5 == 0 else notice.keyword
+        for position, notice in enumerate(notices)
+    ]
+    assert deduplicated.column('idweb') == [notice.idweb for notice in notices]
+    assert deduplicated.column('keyword') == expected
+    assert [notice.source for notice in deduplicated.to_notices()] == [notice.source for notice in notices]
+
+
+def test_keyword_filter_agrees_with_the_search_index(build_table, notices):
+    keywords = main.get_predefined_keywords()
+    expected = [
+        (notice.idweb, keyword) for notice in notices
+        for keyword in ['; '.join(main.NoticeSearchIndex([notice.search_text], [notice.cpv_codes]).search(keywords)[0])]
+        if keyword
+    ]
+    matched = main.filter_by_keywords(build_table(notices), keywords)
+    assert expected
+    assert list(zip(matched.column('idweb'), matched.column('keyword'))) == expected
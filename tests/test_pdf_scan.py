@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip("fitz")
+
+import main
+import synthetic
+
+LINK = "https://www.achatpublic.com/sdm/ent/gen/ent_detail.do?PCSLID=CSL_2024_1"
+
+
+def pdf_link(idweb):
+    return f"{main.BOAMP_PDF_BASE_URL}/telechargements/FILES/PDF/2024/06/{idweb}.pdf"
+
+
+def full_results(pdf_bytes, keywords):
+    analysis, analyzer = main.extract_pdf_analysis(pdf_bytes, "x")
+    return analysis['visite_obligatoire'], analysis['extracted_links'], main.find_lot_numbers(analyzer, keywords)
+
+
+def lazy_results(pdf_bytes, keywords):
+    analysis, analyzer = main.scan_pdf_lazily(pdf_bytes, "x", keywords)
+    return analysis['visite_obligatoire'], analysis['extracted_links'], main.find_lot_numbers(analyzer, keywords)
+
+
+def test_lazy_scan_matches_full_extraction_on_synthetic_notices():
+    records = [record for record in synthetic.generate_day("2024-06-03", 200)
+               if record["descripteur_code"][0] in synthetic.MATCHING_CPV][:10]
+    assert records
+    for record in records:
+        pdf_bytes = synthetic.notice_pdf(record)
+        keywords = "; ".join(record["descripteur_libelle"])
+        assert lazy_results(pdf_bytes, keywords) == full_results(pdf_bytes, keywords)
+
+
+def test_lazy_scan_reads_on_until_every_keyword_is_seen():
+    pages = [f"Visite obligatoire. Documents de marché : {LINK}\nLot 1 - menuiserie"]
+    pages += ["Clauses administratives"] * 20 + ["Lot 7 - peinture"] + ["Annexes"] * 5
+    pdf_bytes = synthetic.make_pdf(pages)
+    
+    assert lazy_results(pdf_bytes, "menuiserie; peinture") == full_results(pdf_bytes, "menuiserie; peinture")
+    analysis, _ = main.scan_pdf_lazily(pdf_bytes, "x", "menuiserie")
+    assert analysis['pages_extracted'] == 1 and not analysis['scan_complete']
+
+
+def test_lazy_scan_stops_at_the_page_limit(monkeypatch):
+    monkeypatch.setattr(main, "PDF_LAZY_MAX_PAGES", 5)
+    pdf_bytes = synthetic.make_pdf(["Lot 1 - menuiserie"] + ["Annexes"] * 9)
+    
+    analysis, analyzer = main.scan_pdf_lazily(pdf_bytes, "x", "menuiserie; peinture")
+    assert analysis['pages_extracted'] == 5 and analysis['scan_complete']
+    assert main.find_lot_numbers(analyzer, "menuiserie; peinture") == "lot-1"
+
+
+def test_cached_lazy_scan_is_reused_or_extended(monkeypatch):
+    pages = [f"Visite obligatoire. Documents de marché : {LINK}\nLot 1 - menuiserie"]
+    pages += ["Clauses administratives"] * 10 + ["Lot 7 - peinture"]
+    pdf_bytes = synthetic.make_pdf(pages)
+    link = pdf_link("24-TEST1")
+    
+    monkeypatch.setattr(main, "PDF_LAZY", True)
+    main.analyze_pdf(pdf_bytes, link, "menuiserie")
+    cached = main.analysis_cache.get("24-TEST1", main.PDF_EXTRACTOR_VERSION)
+    assert main.analyze_cached_pdf(cached, "menuiserie")['lot_numbers'] == "lot-1"
+    # peinture is beyond the pages read: the PDF has to be scanned further
+    assert main.analyze_cached_pdf(cached, "menuiserie; peinture") is None
+    
+    second = main.analyze_pdf(pdf_bytes, link, "menuiserie; peinture", cached)
+    assert second['lot_numbers'] == "lot-1, lot-7"
+    assert second['pages_extracted'] == 12
+
+
+def test_a_new_scan_gets_a_new_text_ref(monkeypatch):
+    pages = [f"Visite obligatoire. Documents de marché : {LINK}\nLot 1 - menuiserie"]
+    pages += ["Clauses administratives"] * 3 + ["Lot 7 - peinture"]
+    pdf_bytes = synthetic.make_pdf(pages)
+    link = pdf_link("24-TEST2")
+    
+    monkeypatch.setattr(main, "PDF_LAZY", True)
+    first = main.analyze_pdf(pdf_bytes, link, "menuiserie")
+    cached = main.analysis_cache.get("24-TEST2", main.PDF_EXTRACTOR_VERSION)
+    second = main.analyze_pdf(pdf_bytes, link, "menuiserie; peinture", cached)
+    # Rows of the first scan still get the text they were stored with
+    assert second['pdf_text_ref'] != first['pdf_text_ref']
+    assert main.text_store.get(first['pdf_text_ref']).count("Page ") == 1
+    assert main.text_store.get(second['pdf_text_ref']).count("Page ") == 5
@@ -0,0 +1,60 @@
+import itertools
+import os
+
+import pytest
+
+import pdf_store
+from pdf_store import PDFStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Make every time.time() call in pdf_store one second later than the last"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(pdf_store.time, "time", lambda: float(next(ticks)))
+
+
+def test_put_and_get_keep_content_and_validators(tmp_path):
+    store = PDFStore(str(tmp_path), max_bytes=1000)
+    store.put("24-1", b"%PDF-1", etag='"abc"', last_modified="Mon, 03 Jun 2024 10:00:00 GMT")
+    cached = store.get("24-1")
+    assert (cached.content, cached.etag, cached.last_modified) == (
+        b"%PDF-1", '"abc"', "Mon, 03 Jun 2024 10:00:00 GMT"
+    )
+    assert store.get("24-2") is None
+
+
+def test_identical_pdfs_share_one_blob(tmp_path):
+    store = PDFStore(str(tmp_path), max_bytes=1000)
+    store.put("24-1", b"%PDF-same")
+    store.put("24-2", b"%PDF-same")
+    blobs = [name for _, _, names in os.walk(store.blob_dir) for name in names]
+    assert len(blobs) == 1
+
+
+def test_least_recently_used_pdfs_are_evicted_past_the_cap(tmp_path, clock):
+    store = PDFStore(str(tmp_path), max_bytes=25)
+    store.put("24-1", b"a" * 10)
+    store.put("24-2", b"b" * 10)
+    assert store.get("24-1") is not None
+    store.put("24-3", b"c" * 10)
+    assert store.get("24-2") is None
+    assert store.get("24-1").content == b"a" * 10
+    assert store.get("24-3").content == b"c" * 10
+
+
+def test_touch_records_a_revalidation(tmp_path, clock):
+    store = PDFStore(str(tmp_path), max_bytes=1000)
+    store.put("24-1", b"%PDF-1")
+    fetched_at = store.get("24-1").fetched_at
+    store.touch("24-1")
+    assert store.get("24-1").fetched_at > fetched_at
+
+
+def test_missing_blob_is_a_miss(tmp_path):
+    store = PDFStore(str(tmp_path), max_bytes=1000)
+    store.put("24-1", b"%PDF-1")
+    for directory, _, names in os.walk(store.blob_dir):
+        for name in names:
+            os.unlink(os.path.join(directory, name))
+    assert store.get("24-1") is None
@@ -0,0 +1,50 @@
+import main
+
+
+def notice(idweb, departments=(), keyword=""):
+    record = {"idweb": idweb, "objet": f"Avis {idweb}", "code_departement": list(departments)}
+    built = main.build_notice_record(record)
+    built.keyword = keyword
+    return built
+
+
+def test_department_filter_keeps_notices_listing_a_target(build_table):
+    table = build_table([
+        notice("24-1", ["75"]),
+        notice("24-2", ["92", "93"]),
+        notice("24-3", []),
+        notice("24-4", ["2A", "75"]),
+    ])
+    filtered = main.filter_by_departments(table, ["93", "75"])
+    assert filtered.column('idweb') == ["24-1", "24-2", "24-4"]
+    # The first of the notice's departments that is a target
+    assert filtered.column('department_found') == ["75", "93", "75"]
+
+
+def test_department_filter_without_targets_keeps_everything(build_table):
+    table = build_table([notice("24-1", ["75"]), notice("24-2", [])])
+    assert main.filter_by_departments(table, []).column('idweb') == ["24-1", "24-2"]
+
+
+def test_department_filter_can_keep_nothing(build_table):
+    table = build_table([notice("24-1", ["75"])])
+    assert len(main.filter_by_departments(table, ["13"])) == 0
+
+
+def test_duplicates_merge_their_keywords_into_the_first_notice(build_table):
+    table = build_table([
+        notice("24-1", keyword="miroiterie"),
+        notice("24-2", keyword="métallerie"),
+        notice("24-1", keyword="métallerie; miroiterie"),
+        notice("24-1", keyword="Escaliers"),
+    ])
+    deduplicated = main.remove_duplicates(table)
+    assert deduplicated.column('idweb') == ["24-1", "24-2"]
+    assert deduplicated.column('keyword') == ["miroiterie; métallerie; Escaliers", "métallerie"]
+
+
+def test_tables_without_duplicates_are_kept_as_they_are(build_table):
+    table = build_table([notice("24-1", keyword="miroiterie"), notice("24-2", keyword="")])
+    deduplicated = main.remove_duplicates(table)
+    assert deduplicated.column('idweb') == ["24-1", "24-2"]
+    assert deduplicated.column('keyword') == ["miroiterie", ""]
@@ -0,0 +1,28 @@
+import pytest
+
+import main
+
+
+def test_where_clause_selects_date_departments_and_type():
+    where = main.build_records_where("2024-06-03", ["75", "2A"], "Travaux")
+    assert where == (
+        "dateparution = date'2024-06-03' AND (code_departement = \"75\" OR code_departement = \"2A\") "
+        "AND type_marche = \"Travaux\""
+    )
+
+
+def test_where_clause_escapes_quotes_and_backslashes():
+    where = main.build_records_where("2024-06-03", type_marche='Travaux" OR "1"="1\\')
+    assert where.endswith('type_marche = "Travaux\\" OR \\"1\\"=\\"1\\\\"')
+
+
+@pytest.mark.parametrize("target_date", ["2024-6-3", "2024-06-03' OR 1=1", ""])
+def test_where_clause_rejects_malformed_dates(target_date):
+    with pytest.raises(ValueError):
+        main.build_records_where(target_date)
+
+
+@pytest.mark.parametrize("department", ['75" OR "1"="1', "", "1234"])
+def test_where_clause_rejects_malformed_departments(department):
+    with pytest.raises(ValueError):
+        main.build_records_where("2024-06-03", [department])
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+from text_store import TextStore
+
+
+def test_refs_name_one_text_each(tmp_path):
+    store = TextStore(str(tmp_path))
+    first = store.put("24-1", "Page 1\nVisite obligatoire")
+    assert store.put("24-1", "Page 1\nVisite obligatoire") == first
+    second = store.put("24-1", "Page 1\nVisite obligatoire\nPage 2\nLot 7")
+    assert second != first and second.startswith("24-1-")
+    assert store.get(first) == "Page 1\nVisite obligatoire"
+    assert store.get(second).endswith("Lot 7")
+    assert store.get("24-2-0000000000000000") is None
+
+
+def test_invalid_refs_are_refused(tmp_path):
+    store = TextStore(str(tmp_path))
+    for ref in ("../jobs", "24-1/..", ""):
+        with pytest.raises(ValueError):
+            store.get(ref)
+
+
+def test_unused_texts_are_evicted(tmp_path):
+    store = TextStore(str(tmp_path))
+    old = store.put("24-1", "ancien")
+    recent = store.put("24-2", "récent")
+    kept = store.put("24-3", "réutilisé")
+    past = time.time() - 3600
+    for ref in (old, kept):
+        for directory, _, names in os.walk(tmp_path):
+            for name in names:
+                if name.startswith(ref):
+                    os.utime(os.path.join(directory, name), (past, past))
+    assert store.touch(kept)
+    
+    assert store.evict_expired(60) == 1
+    assert not store.exists(old) and not store.touch(old)
+    assert store.get(recent) == "récent" and store.get(kept) == "réutilisé"
@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is used instead
+    zstandard = None
+
+
+class TextStore:
+    """On-disk store of extracted PDF texts, one compressed blob per text
+
+    A text is stored under a ref made of the notice key (idweb, or the URL
+    hash used for non-BOAMP PDFs) and a hash of its content, so a ref always
+    names the same text and a new extraction gets a new ref instead of
+    replacing what older results point to. Blobs are written atomically and
+    deleted by evict_expired once unused for the TTL. New blobs are compressed
+    with zstd when the zstandard package is installed and with gzip otherwise;
+    gzip blobs stay readable after zstandard is installed.
+    """
+
+    KEY_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        if not self.KEY_RE.match(key):
+            raise ValueError(f"Invalid text key '{key}'")
+        shard = hashlib.sha256(key.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.root, shard, f"{key}.txt{suffix}")
+
+    def put(self, key: str, text: str) -> str:
+        """Store a text of a notice and return its ref (an identical text keeps its existing blob)"""
+        data = text.encode('utf-8')
+        ref = f"{key}-{hashlib.sha256(data).hexdigest()[:16]}"
+        if self.touch(ref):
+            return ref
+        if zstandard is not None:
+            suffix, blob = ".zst", zstandard.ZstdCompressor(level=6).compress(data)
+        else:
+            suffix, blob = ".gz", gzip.compress(data, compresslevel=6, mtime=0)
+        path = self._path(ref, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(suffix=".part", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(blob)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """Return the text stored under a ref, or None"""
+        for suffix in (".zst", ".gz"):
+            try:
+                with open(self._path(ref, suffix), "rb") as blob_file:
+                    blob = blob_file.read()
+            except FileNotFoundError:
+                continue
+            if suffix == ".gz":
+                return gzip.decompress(blob).decode('utf-8')
+            if zstandard is None:
+                raise RuntimeError(f"Text '{ref}' is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+        return None
+
+    def exists(self, ref: str) -> bool:
+        """Whether a text is stored under this ref"""
+        return any(os.path.exists(self._path(ref, suffix)) for suffix in (".zst", ".gz"))
+
+    def touch(self, ref: str) -> bool:
+        """Mark a stored text as used now, delaying its eviction; False if it isn't stored"""
+        for suffix in (".zst", ".gz"):
+            try:
+                os.utime(self._path(ref, suffix))
+                return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def evict_expired(self, ttl_seconds: float) -> int:
+        """Delete texts (and leftover partial writes) unused for ttl_seconds; returns how many"""
+        cutoff = time.time() - ttl_seconds
+        evicted = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        evicted += 1
+                except FileNotFoundError:
+                    continue
+        return evicted